@@ -11,6 +11,44 @@ from .utils import *
 from .graphql import *
 from .models import *
 from ._client import Client
+from ._transport import (
+    Transport,
+    RequestsTransport,
+    ConnectionStats,
+    CassetteTransport,
+)
+from ._batch import GraphQLBatcher
+from ._cache import EntityCache
+from ._listen import ThreadedListener
+from ._buffer import BufferPolicy, EventBuffer
+from ._presence import PresenceStore
+from ._inbox import Inbox
+from ._delta import DeltaRegistry
+from ._forced import ForcedFetchResolver
+from ._ping import PingScheduler
+from ._reconnect import ReconnectPolicy
+from ._retry import RetryPolicy
+from ._ratelimit import RateLimiter, TokenBucket
+from ._flight import SingleFlight
+from ._checkpoint import CheckpointStore, MemoryCheckpointStore, JSONCheckpointStore
+from ._replay import PullRecorder, PullReplayer, ReplayStats
+from ._events import (
+    Event,
+    ThreadEvent,
+    MessageEvent,
+    MessageUnsentEvent,
+    ReactionEvent,
+    TypingEvent,
+    ReadReceiptEvent,
+    DeliveryReceiptEvent,
+)
+from ._export import HistoryExporter
+from ._sync import SyncStore, MemorySyncStore, JSONSyncStore, ThreadSync
+
+try:
+    from ._async import AsyncClient
+except SyntaxError:  # Python 2 doesn't support `async def`
+    AsyncClient = None
 
 __title__ = "fbchat"
 __version__ = "1.6.4"
@@ -22,4 +60,45 @@ __license__ = "BSD 3-Clause"
 __author__ = "Taehoon Kim; Moreels Pieter-Jan; Mads Marquart"
 __email__ = "carpedm20@gmail.com"
 
-__all__ = ["Client"]
+__all__ = [
+    "Client",
+    "AsyncClient",
+    "Transport",
+    "RequestsTransport",
+    "ConnectionStats",
+    "CassetteTransport",
+    "RetryPolicy",
+    "RateLimiter",
+    "TokenBucket",
+    "SingleFlight",
+    "GraphQLBatcher",
+    "EntityCache",
+    "ThreadedListener",
+    "BufferPolicy",
+    "EventBuffer",
+    "PresenceStore",
+    "Inbox",
+    "DeltaRegistry",
+    "ForcedFetchResolver",
+    "PingScheduler",
+    "ReconnectPolicy",
+    "CheckpointStore",
+    "MemoryCheckpointStore",
+    "JSONCheckpointStore",
+    "PullRecorder",
+    "PullReplayer",
+    "ReplayStats",
+    "Event",
+    "ThreadEvent",
+    "MessageEvent",
+    "MessageUnsentEvent",
+    "ReactionEvent",
+    "TypingEvent",
+    "ReadReceiptEvent",
+    "DeliveryReceiptEvent",
+    "HistoryExporter",
+    "SyncStore",
+    "MemorySyncStore",
+    "JSONSyncStore",
+    "ThreadSync",
+]
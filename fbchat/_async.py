@@ -0,0 +1,638 @@
+# -*- coding: UTF-8 -*-
+"""asyncio support for fbchat. Requires Python 3.5+ and `aiohttp`"""
+
+from __future__ import unicode_literals
+
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from http.cookies import SimpleCookie
+
+import requests
+from requests.models import RequestEncodingMixin
+
+from ._util import *
+from ._client import Client
+from ._events import EventStream
+from ._transport import Transport, make_response
+from ._retry import RetryState
+from ._graphql import graphql_queries_to_json, graphql_response_to_json
+from ._fetch import (
+    thread_list_query,
+    graphql_to_thread_list,
+    thread_messages_query,
+    graphql_to_thread_messages,
+)
+
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
+
+class _LoopTransport(Transport):
+    """Performs the requests of a :class:`Client` with `aiohttp` on an event loop
+
+    :func:`get_async` and :func:`post_async` are awaited on the loop. :func:`get` and
+    :func:`post` are meant to be called from worker threads, and block the calling
+    thread until the loop has received the response.
+    """
+
+    def __init__(self, loop, limit=100):
+        self._loop = loop
+        self._limit = limit
+        self._session = None
+
+    def _run(self, coro):
+        return asyncio.run_coroutine_threadsafe(coro, self._loop).result()
+
+    def _get_session(self):
+        if self._session is None:
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=self._limit)
+            )
+        return self._session
+
+    def _load_cookies(self, jar):
+        cookies = SimpleCookie()
+        for cookie in jar:
+            cookies[cookie.name] = cookie.value
+            cookies[cookie.name]["domain"] = cookie.domain
+            cookies[cookie.name]["path"] = cookie.path
+        self._session.cookie_jar.update_cookies(cookies)
+
+    async def _dump_cookies(self):
+        jar = requests.cookies.RequestsCookieJar()
+        for morsel in self._get_session().cookie_jar:
+            jar.set(
+                morsel.key,
+                morsel.value,
+                domain=morsel["domain"],
+                path=morsel["path"] or "/",
+            )
+        return jar
+
+    async def _set_cookies(self, jar):
+        self._get_session().cookie_jar.clear()
+        self._load_cookies(jar)
+
+    @property
+    def cookies(self):
+        return self._run(self._dump_cookies())
+
+    @cookies.setter
+    def cookies(self, jar):
+        self._run(self._set_cookies(jar))
+
+    async def _request(
+        self, method, url, headers=None, body=None, timeout=30, verify=True, **kwargs
+    ):
+        try:
+            async with self._get_session().request(
+                method,
+                url,
+                headers=headers,
+                data=body,
+                timeout=aiohttp.ClientTimeout(total=timeout),
+                ssl=None if verify else False,
+                **kwargs
+            ) as resp:
+                content = await resp.read()
+        except asyncio.TimeoutError as e:
+            raise requests.Timeout(e)
+        except aiohttp.ClientConnectionError as e:
+            raise requests.ConnectionError(e)
+
+        return make_response(
+            resp.status,
+            content,
+            url=str(resp.url),
+            headers=resp.headers,
+            reason=resp.reason,
+        )
+
+    async def get_async(
+        self, url, headers=None, params=None, allow_redirects=True, **kwargs
+    ):
+        """Like :func:`get`, but a coroutine, to be awaited on the loop"""
+        query = RequestEncodingMixin._encode_params(params or {})
+        if query:
+            url = "{}{}{}".format(url, "&" if "?" in url else "?", query)
+        return await self._request(
+            "GET", url, headers=headers, allow_redirects=allow_redirects, **kwargs
+        )
+
+    async def post_async(self, url, headers=None, data=None, files=None, **kwargs):
+        """Like :func:`post`, but a coroutine, to be awaited on the loop"""
+        headers = dict(headers or {})
+        if files:
+            body, headers["Content-Type"] = RequestEncodingMixin._encode_files(
+                files, data or {}
+            )
+        else:
+            body = RequestEncodingMixin._encode_params(data or {})
+        return await self._request("POST", url, headers=headers, body=body, **kwargs)
+
+    def get(self, url, **kwargs):
+        return self._run(self.get_async(url, **kwargs))
+
+    def post(self, url, **kwargs):
+        return self._run(self.post_async(url, **kwargs))
+
+    async def _close(self):
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    def reset(self):
+        self._run(self._close())
+
+    def close(self):
+        self._run(self._close())
+
+
+class _SyncClient(Client):
+    """The blocking :class:`Client` that does the work for an :class:`AsyncClient`
+
+    Events are forwarded to the :class:`AsyncClient`, and awaited if they're coroutines.
+    """
+
+    def __init__(self, async_client, *args, **kwargs):
+        self._async_client = async_client
+        super(_SyncClient, self).__init__(*args, **kwargs)
+
+    def _findHandledEvents(self):
+        async_class = type(self._async_client)
+        return set(
+            name
+            for name in dir(Client)
+            if name.startswith("on") and hasattr(async_class, name)
+        )
+
+
+def _parse_response(r, as_json, parse):
+    content = check_request(r, as_json=as_json)
+    return content if parse is None else parse(content)
+
+
+def _forward_event(name):
+    default = getattr(Client, name)
+
+    @functools.wraps(default)
+    def forward(self, *args, **kwargs):
+        handler = getattr(type(self._async_client), name, None)
+        if handler is None:
+            return default(self, *args, **kwargs)
+        result = handler(self._async_client, *args, **kwargs)
+        if asyncio.iscoroutine(result):
+            result = asyncio.run_coroutine_threadsafe(
+                result, self._async_client._loop
+            ).result()
+        return result
+
+    return forward
+
+
+for _name in dir(Client):
+    if _name.startswith("on") and callable(getattr(Client, _name)):
+        setattr(_SyncClient, _name, _forward_event(_name))
+
+
+class AsyncClient(object):
+    """An asyncio version of :class:`Client`
+
+    Create and log in with :func:`AsyncClient.create`. All methods doing network
+    requests are coroutines with the same arguments as on :class:`Client`.
+
+    The methods in :any:`LOOP_METHODS`, e.g. :func:`fetchThreadList` and
+    :func:`graphql_requests`, send their requests on the event loop, and only parse
+    the responses on worker threads, so hundreds of them can be in flight at once.
+    The others share their logic with :class:`Client`, and run it on a pool of worker
+    threads. A worker thread is held until the method returns, so at most
+    `max_workers` of them run at the same time.
+
+    Events are handled by subclassing, just like with :class:`Client`. Event methods
+    may be either normal functions or coroutines::
+
+        class EchoBot(AsyncClient):
+            async def onMessage(self, author_id, message_object, thread_id, thread_type, **kwargs):
+                if author_id != self.uid:
+                    await self.send(message_object, thread_id=thread_id, thread_type=thread_type)
+
+        client = await EchoBot.create("<email>", "<password>")
+        await client.listen()
+    """
+
+    def __init__(self, max_workers=32, limit=100):
+        """Use :func:`AsyncClient.create` instead
+
+        :param max_workers: Number of worker threads. Caps how many methods not in :any:`LOOP_METHODS` run at the same time
+        :param limit: Maximum number of simultaneous connections
+        """
+        if aiohttp is None:
+            raise FBchatUserError("`aiohttp` is required to use AsyncClient")
+        self._executor = ThreadPoolExecutor(max_workers=max_workers)
+        self._limit = limit
+        self._loop = None
+        self._client = None
+
+    @classmethod
+    async def create(
+        cls,
+        email,
+        password,
+        user_agent=None,
+        max_tries=5,
+        session_cookies=None,
+        logging_level=logging.INFO,
+        transport=None,
+        **kwargs
+    ):
+        """Initializes and logs in the client
+
+        Takes the same arguments as :class:`Client`, and additionally `max_workers`
+        and `limit`, see :func:`AsyncClient.__init__`. If `transport` is not given,
+        requests are done with `aiohttp` on the running event loop
+
+        :return: The logged in client
+        :rtype: AsyncClient
+        :raises: FBchatException on failed login
+        """
+        self = cls(**kwargs)
+        self._loop = asyncio.get_event_loop()
+        self._client = await self._loop.run_in_executor(
+            self._executor,
+            functools.partial(
+                _SyncClient,
+                self,
+                email,
+                password,
+                user_agent=user_agent,
+                max_tries=max_tries,
+                session_cookies=session_cookies,
+                logging_level=logging_level,
+                transport=transport or _LoopTransport(self._loop, limit=self._limit),
+            ),
+        )
+        return self
+
+    async def _call(self, func, *args, **kwargs):
+        return await self._loop.run_in_executor(
+            self._executor, functools.partial(func, *args, **kwargs)
+        )
+
+    async def _send(self, method, url, **kwargs):
+        transport = self._client._transport
+        if isinstance(transport, _LoopTransport):
+            if method == "GET":
+                return await transport.get_async(url, **kwargs)
+            return await transport.post_async(url, **kwargs)
+        # Other transports block, so they're used from a worker thread
+        func = transport.get if method == "GET" else transport.post
+        return await self._call(func, url, **kwargs)
+
+    async def _request(
+        self,
+        method,
+        url,
+        query=None,
+        timeout=30,
+        fix_request=False,
+        as_json=False,
+        error_retries=3,
+        parse=None,
+    ):
+        """Like :func:`Client._request`, but sends the request on the event loop
+
+        Only parsing the response, and renewing the session, is done on a worker thread
+        """
+        client = self._client
+        retry = RetryState(client.retry_policy, url, error_retries)
+        while True:
+            if client.rate_limiter is not None:
+                await asyncio.sleep(client.rate_limiter.reserve(url))
+            generation = client._session_generation
+            payload = client._generatePayload(query)
+            kwargs = dict(
+                headers=client._header, timeout=timeout, verify=client.ssl_verify
+            )
+            kwargs["params" if method == "GET" else "data"] = payload
+            try:
+                r = await self._send(method, url, **kwargs)
+                if not fix_request:
+                    if not retry.retries_status(r.status_code):
+                        return r
+                else:
+                    return await self._call(_parse_response, r, as_json, parse)
+            except (
+                FBchatFacebookError,
+                requests.Timeout,
+                requests.ConnectionError,
+            ) as e:
+                if retry.renews_session(e):
+                    await self._call(client._fix_fb_errors, e.fb_error_code, generation)
+                    continue
+                if not retry.retries(e):
+                    raise
+            await asyncio.sleep(retry.next())
+
+    async def graphql_requests(self, *queries):
+        """Like :func:`Client.graphql_requests`
+
+        Sent on the event loop, unless a :any:`Client.graphql_batcher` is set
+        """
+        if self._client.graphql_batcher is not None:
+            return await self._call(self._client.graphql_requests, *queries)
+        payload = {
+            "method": "GET",
+            "response_format": "json",
+            "queries": graphql_queries_to_json(*queries),
+        }
+        return tuple(
+            await self._request(
+                "POST",
+                self._client.req_url.GRAPHQL,
+                query=payload,
+                fix_request=True,
+                parse=graphql_response_to_json,
+            )
+        )
+
+    async def graphql_request(self, query):
+        """Like :func:`Client.graphql_request`"""
+        return (await self.graphql_requests(query))[0]
+
+    async def fetchThreadList(
+        self, offset=None, limit=20, thread_location=ThreadLocation.INBOX, before=None
+    ):
+        """Like :func:`Client.fetchThreadList`"""
+        if offset is not None:
+            log.warning("Using `offset` in `fetchThreadList` is no longer supported")
+        j = await self.graphql_request(
+            thread_list_query(limit, thread_location, before)
+        )
+        return await self._call(graphql_to_thread_list, j)
+
+    async def fetchThreadMessages(self, thread_id=None, limit=20, before=None):
+        """Like :func:`Client.fetchThreadMessages`"""
+        thread_id, thread_type = self._client._getThread(thread_id, None)
+        j = await self.graphql_request(thread_messages_query(thread_id, limit, before))
+        return await self._call(graphql_to_thread_messages, thread_id, j)
+
+    async def close(self):
+        """Closes the connections and worker threads. The client is unusable afterwards"""
+        await self._call(self._client._transport.close)
+        self._executor.shutdown(wait=False)
+
+    @property
+    def uid(self):
+        """The ID of the client. See :any:`Client.uid`"""
+        return self._client.uid
+
+    @property
+    def listening(self):
+        """Whether the client is listening"""
+        return self._client.listening
+
+    def setDefaultThread(self, thread_id, thread_type):
+        return self._client.setDefaultThread(thread_id, thread_type)
+
+    def resetDefaultThread(self):
+        return self._client.resetDefaultThread()
+
+    def getUserActiveStatus(self, user_id):
+        return self._client.getUserActiveStatus(user_id)
+
+    def getFromUserUrl(self, theUserUrl):
+        return self._client.getFromUserUrl(theUserUrl)
+
+    def getFromGroupUrl(self, theGroupUrl):
+        return self._client.getFromGroupUrl(theGroupUrl)
+
+    def setActiveStatus(self, markAlive):
+        return self._client.setActiveStatus(markAlive)
+
+    def startListening(self):
+        return self._client.startListening()
+
+    def stopListening(self):
+        return self._client.stopListening()
+
+    async def searchForMessageIDs(self, query, offset=0, limit=5, thread_id=None):
+        """Like :func:`Client.searchForMessageIDs`, but returns a list"""
+        return await self._call(
+            lambda: list(
+                self._client.searchForMessageIDs(query, offset, limit, thread_id)
+            )
+        )
+
+    async def searchForMessages(self, query, offset=0, limit=5, thread_id=None):
+        """Like :func:`Client.searchForMessages`, but returns a list"""
+        return await self._call(
+            lambda: list(
+                self._client.searchForMessages(query, offset, limit, thread_id)
+            )
+        )
+
+    async def search(
+        self, query, fetch_messages=False, thread_limit=5, message_limit=5
+    ):
+        """Like :func:`Client.search`, but the values are lists instead of generators"""
+
+        def search():
+            result = self._client.search(
+                query, fetch_messages, thread_limit, message_limit
+            )
+            return {thread_id: list(value) for thread_id, value in result.items()}
+
+        return await self._call(search)
+
+    async def listen(self, markAlive=None):
+        """
+        Initializes and runs the listening loop continually
+
+        :param markAlive: Whether this should ping the Facebook server each time the loop runs
+        :type markAlive: bool
+        """
+        if markAlive is not None:
+            self.setActiveStatus(markAlive)
+
+        self.startListening()
+        await self._call(self._client.onListening)
+
+        while self.listening and await self.doOneListen():
+            pass
+
+        self.stopListening()
+
+    def events(self, types=None, buffer_size=1000, keep_raw=False, markAlive=None):
+        """Like :func:`Client.events`, but returns an async iterator::
+
+            async with client.events(types=[MessageEvent]) as events:
+                async for event in events:
+                    print(event.message_object)
+
+        Listening stops when the iterator is closed with :func:`_AsyncEvents.close`,
+        or when the `async with` block is exited
+        """
+        if markAlive is not None:
+            self.setActiveStatus(markAlive)
+        stream = EventStream(self._client, types, buffer_size, keep_raw)
+        return _AsyncEvents(self, stream)
+
+
+class _AsyncEvents(object):
+    """The async iterator returned by :func:`AsyncClient.events`"""
+
+    def __init__(self, client, stream):
+        self._client = client
+        self._stream = stream
+        self._started = False
+        self._closed = False
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        if self._closed:
+            raise StopAsyncIteration
+        if not self._started:
+            self._started = True
+            self._client.startListening()
+            await self._client._call(self._client._client.onListening)
+        while True:
+            event = self._stream.pop()
+            if event is not None:
+                return event
+            if not (self._client.listening and await self._client.doOneListen()):
+                self.close()
+                raise StopAsyncIteration
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        """Stops listening, and restores the event methods"""
+        if self._closed:
+            return
+        self._closed = True
+        self._stream.close()
+        if self._started:
+            self._client.stopListening()
+
+
+def _coroutine_method(name):
+    method = getattr(Client, name)
+
+    @functools.wraps(method)
+    async def wrapper(self, *args, **kwargs):
+        return await self._call(getattr(self._client, name), *args, **kwargs)
+
+    return wrapper
+
+
+#: Methods of :class:`AsyncClient` that send their requests on the event loop
+LOOP_METHODS = [
+    "graphql_requests",
+    "graphql_request",
+    "fetchThreadList",
+    "fetchThreadMessages",
+]
+
+#: Methods of :class:`Client` that do network requests, and are coroutines on :class:`AsyncClient`
+ASYNC_METHODS = [
+    "graphql_requests",
+    "graphql_request",
+    "isLoggedIn",
+    "getSession",
+    "setSession",
+    "login",
+    "logout",
+    "fetchThreads",
+    "fetchAllUsersFromThreads",
+    "fetchAllUsers",
+    "searchForUsers",
+    "searchForPages",
+    "searchForGroups",
+    "searchForThreads",
+    "fetchUserInfo",
+    "fetchPageInfo",
+    "fetchGroupInfo",
+    "fetchThreadInfo",
+    "fetchThreadMessages",
+    "fetchThreadList",
+    "fetchUnread",
+    "fetchUnseen",
+    "fetchImageUrl",
+    "fetchVideoUrl",
+    "fetchJSON",
+    "fetchMessageInfo",
+    "fetchPollOptions",
+    "fetchPlanInfo",
+    "getPhoneNumbers",
+    "getEmails",
+    "send",
+    "sendMessage",
+    "sendEmoji",
+    "wave",
+    "quickReply",
+    "unsend",
+    "sendLocation",
+    "sendPinnedLocation",
+    "sendRemoteFiles",
+    "sendLocalFiles",
+    "sendRemoteVoiceClips",
+    "sendLocalVoiceClips",
+    "sendImage",
+    "sendRemoteImage",
+    "sendLocalImage",
+    "createGroup",
+    "addUsersToGroup",
+    "removeUserFromGroup",
+    "addGroupAdmins",
+    "removeGroupAdmins",
+    "changeGroupApprovalMode",
+    "acceptUsersToGroup",
+    "denyUsersFromGroup",
+    "changeGroupImageRemote",
+    "changeGroupImageLocal",
+    "changeThreadTitle",
+    "changeNickname",
+    "changeThreadColor",
+    "changeThreadEmoji",
+    "reactToMessage",
+    "createPlan",
+    "editPlan",
+    "deletePlan",
+    "changePlanParticipation",
+    "eventReminder",
+    "createPoll",
+    "updatePollVote",
+    "setTypingStatus",
+    "markAsDelivered",
+    "markAsRead",
+    "markAsUnread",
+    "markAsSeen",
+    "friendConnect",
+    "removeFriend",
+    "blockUser",
+    "unblockUser",
+    "moveThreads",
+    "deleteThreads",
+    "markAsSpam",
+    "deleteMessages",
+    "muteThread",
+    "unmuteThread",
+    "muteThreadReactions",
+    "unmuteThreadReactions",
+    "muteThreadMentions",
+    "unmuteThreadMentions",
+    "doOneListen",
+]
+
+for _name in ASYNC_METHODS:
+    if _name not in LOOP_METHODS:
+        setattr(AsyncClient, _name, _coroutine_method(_name))
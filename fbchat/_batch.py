@@ -0,0 +1,101 @@
+# -*- coding: UTF-8 -*-
+
+from __future__ import unicode_literals
+
+import threading
+from concurrent.futures import Future
+
+from ._util import *
+
+
+class GraphQLBatcher(object):
+    """Collects GraphQL queries, and sends the ones made close together in one request
+
+    Enable it on a client with::
+
+        client.graphql_batcher = GraphQLBatcher(client)
+
+    After that, every :func:`Client.graphql_request` and :func:`Client.graphql_requests`
+    call goes through the batcher, no matter which thread it's made from.
+    Note that every query will wait up to `window` seconds before being sent, so this
+    only pays off when many queries are made at once.
+    """
+
+    def __init__(self, client, window=0.01, max_size=50):
+        """
+        :param client: The client to send the batches with
+        :param window: Seconds to wait for more queries before sending a batch
+        :param max_size: Max. number of queries in a batch. A full batch is sent right away
+        :type window: float
+        :type max_size: int
+        """
+        self.client = client
+        self.window = window
+        self.max_size = max_size
+        #: Number of batches sent
+        self.batches_sent = 0
+        #: Number of queries sent
+        self.queries_sent = 0
+        self._lock = threading.Lock()
+        self._pending = []
+        self._timer = None
+
+    def submit(self, query):
+        """Adds a query to the next batch
+
+        :param query: The query to send
+        :type query: GraphQL
+        :return: A future, which resolves to the json response of the query
+        :rtype: concurrent.futures.Future
+        """
+        future = Future()
+        with self._lock:
+            self._pending.append((query, future))
+            if len(self._pending) >= self.max_size:
+                batch = self._take()
+            else:
+                batch = None
+                if self._timer is None:
+                    self._timer = threading.Timer(self.window, self.flush)
+                    self._timer.daemon = True
+                    self._timer.start()
+        if batch:
+            self._send(batch)
+        return future
+
+    def flush(self):
+        """Sends the pending queries right away"""
+        with self._lock:
+            batch = self._take()
+        if batch:
+            self._send(batch)
+
+    def _take(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, []
+        return batch
+
+    def _send(self, batch):
+        queries, futures = zip(*batch)
+        try:
+            # Errors of single queries are returned, so they only fail their caller
+            results = self.client._graphqlResults(*queries)
+            if len(results) != len(queries):
+                raise FBchatException(
+                    "Got {} results for {} queries".format(len(results), len(queries))
+                )
+        except Exception as e:
+            for future in futures:
+                future.set_exception(e)
+            return
+        finally:
+            with self._lock:
+                self.batches_sent += 1
+                self.queries_sent += len(queries)
+        for future, result in zip(futures, results):
+            if isinstance(result, Exception):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
@@ -0,0 +1,179 @@
+# -*- coding: UTF-8 -*-
+
+from __future__ import unicode_literals
+
+import threading
+from collections import deque
+
+from ._core import Enum
+from ._util import *
+import time
+
+
+class BufferPolicy(Enum):
+    """What an :class:`EventBuffer` does when an event is added while it's full"""
+
+    #: Wait until an event has been taken
+    BLOCK = "block"
+    #: Drop the oldest event
+    DROP_OLDEST = "drop_oldest"
+    #: Drop the oldest event of the first droppable type, e.g. typing, that is queued.
+    #: A new droppable event is dropped if none is queued, and others wait
+    DROP_BY_TYPE = "drop_by_type"
+    #: Replace the queued event with the same key, even if the buffer isn't full.
+    #: Other events wait
+    COALESCE = "coalesce"
+
+
+#: The event types dropped first by :attr:`BufferPolicy.DROP_BY_TYPE`, in order
+DROPPABLE_TYPES = ("typ", "ttyp", "chatproxy-presence", "buddylist_overlay", "inbox")
+
+
+def event_type(m):
+    """The type of a pulled message, or the class of its delta"""
+    if m.get("type") == "delta":
+        return (m.get("delta") or {}).get("class")
+    return m.get("type")
+
+
+def coalesce_key(m):
+    """The key of the events that only matter if they're the latest with that key
+
+    Typing events are keyed on their thread and author, and the full buddy lists
+    sent as `chatproxy-presence` on their type.
+    """
+    mtype = m.get("type")
+    if mtype in ("typ", "ttyp"):
+        return (mtype, m.get("thread_fbid"), m.get("to"), m.get("from"))
+    if mtype == "chatproxy-presence":
+        return (mtype,)
+    return None
+
+
+class EventBuffer(object):
+    """A bounded, thread-safe queue of pulled messages, with a policy for when it's full
+
+    Used by :class:`ThreadedListener` between pulling and handling the events, so
+    handlers that fall behind don't make the events pile up without bounds::
+
+        listener = ThreadedListener(client, policy=BufferPolicy.DROP_BY_TYPE)
+    """
+
+    def __init__(
+        self,
+        max_size=1000,
+        policy=BufferPolicy.BLOCK,
+        droppable=DROPPABLE_TYPES,
+        key=coalesce_key,
+        on_drop=None,
+    ):
+        """
+        :param max_size: Max. number of queued events
+        :param policy: What to do when an event is added while the buffer is full
+        :param droppable: With :attr:`BufferPolicy.DROP_BY_TYPE`, the event types that may be dropped, in the order they're dropped. See :func:`event_type`
+        :param key: With :attr:`BufferPolicy.COALESCE`, a function returning the key of an event, or `None` if it must not be coalesced
+        :param on_drop: Called with each queued message that is dropped or replaced
+        :type max_size: int
+        :type policy: BufferPolicy
+        """
+        self.max_size = max_size
+        self.policy = policy
+        self.droppable = tuple(droppable)
+        self.key = key
+        self.on_drop = on_drop
+        #: Number of events queued
+        self.enqueued = 0
+        #: Number of events dropped
+        self.dropped = 0
+        #: Number of events that replaced a queued event
+        self.coalesced = 0
+        self._items = deque()
+        self._keys = {}
+        self._closed = False
+        self._cond = threading.Condition()
+
+    def __len__(self):
+        return len(self._items)
+
+    def _is_full(self):
+        return len(self._items) >= self.max_size
+
+    def _forget(self, item):
+        if item[0] is not None and self._keys.get(item[0]) is item:
+            del self._keys[item[0]]
+
+    def _drop(self, m):
+        self.dropped += 1
+        if self.on_drop is not None:
+            self.on_drop(m)
+
+    def _drop_by_type(self, m):
+        for mtype in self.droppable:
+            for i, item in enumerate(self._items):
+                if event_type(item[2]) == mtype:
+                    del self._items[i]
+                    self._forget(item)
+                    self._drop(item[2])
+                    return True
+        if event_type(m) in self.droppable:
+            self.dropped += 1
+            return False
+        return None
+
+    def put(self, m):
+        """Queues a pulled message, as the policy says
+
+        :return: Whether the message was queued, or replaced a queued message
+        :rtype: bool
+        """
+        with self._cond:
+            key = None
+            if self.policy == BufferPolicy.COALESCE:
+                key = self.key(m)
+                queued = self._keys.get(key) if key is not None else None
+                if queued is not None:
+                    replaced, queued[2] = queued[2], m
+                    self.coalesced += 1
+                    if self.on_drop is not None:
+                        self.on_drop(replaced)
+                    return True
+
+            if self._is_full():
+                if self.policy == BufferPolicy.DROP_OLDEST:
+                    item = self._items.popleft()
+                    self._forget(item)
+                    self._drop(item[2])
+                elif self.policy == BufferPolicy.DROP_BY_TYPE:
+                    if self._drop_by_type(m) is False:
+                        return False
+            while self._is_full() and not self._closed:
+                self._cond.wait()
+
+            item = [key, time.time(), m]
+            self._items.append(item)
+            if key is not None:
+                self._keys[key] = item
+            self.enqueued += 1
+            self._cond.notify_all()
+            return True
+
+    def get(self):
+        """Takes the oldest message, waiting until there is one
+
+        :return: A tuple of the time it was queued and the message, or `None` if the buffer is closed and empty
+        """
+        with self._cond:
+            while not self._items:
+                if self._closed:
+                    return None
+                self._cond.wait()
+            item = self._items.popleft()
+            self._forget(item)
+            self._cond.notify_all()
+            return item[1], item[2]
+
+    def close(self):
+        """Makes :func:`get` return `None` once the queued messages are taken"""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
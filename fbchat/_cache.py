@@ -0,0 +1,85 @@
+# -*- coding: UTF-8 -*-
+
+from __future__ import unicode_literals
+
+import threading
+from collections import OrderedDict
+
+from ._util import *
+import time
+
+
+class EntityCache(object):
+    """An LRU cache of users, pages and groups, whose entries expire after `ttl` seconds
+
+    Enable it on a client with::
+
+        client.entity_cache = EntityCache()
+
+    After that, :func:`Client.fetchThreadInfo`, and thereby :func:`Client.fetchUserInfo`,
+    :func:`Client.fetchPageInfo` and :func:`Client.fetchGroupInfo`, only fetch the IDs
+    that aren't cached. While listening, events changing a thread update or remove its
+    entry. Cached objects are shared, so don't modify them.
+    """
+
+    def __init__(self, max_size=1000, ttl=600):
+        """
+        :param max_size: Max. number of entries. The least recently used ones are dropped first
+        :param ttl: Seconds after which an entry is fetched again. If `None`, entries never expire
+        :type max_size: int
+        :type ttl: float
+        """
+        self.max_size = max_size
+        self.ttl = ttl
+        #: Number of lookups answered from the cache
+        self.hits = 0
+        #: Number of lookups not answered from the cache
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, uid):
+        """
+        :return: The cached :class:`models.Thread` object, or `None`
+        """
+        with self._lock:
+            entry = self._entries.pop(uid, None)
+            if entry is not None and (entry[1] is None or entry[1] > time.time()):
+                self._entries[uid] = entry
+                self.hits += 1
+                return entry[0]
+            self.misses += 1
+            return None
+
+    def put(self, thread):
+        """Caches a :class:`models.Thread` object"""
+        expires = None if self.ttl is None else time.time() + self.ttl
+        with self._lock:
+            self._entries.pop(thread.uid, None)
+            self._entries[thread.uid] = (thread, expires)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def patch(self, uid, **attributes):
+        """Sets attributes of a cached entry, if it's cached and has them"""
+        with self._lock:
+            entry = self._entries.get(uid)
+            if entry is None:
+                return
+            for name, value in attributes.items():
+                if hasattr(entry[0], name):
+                    setattr(entry[0], name, value)
+
+    def invalidate(self, *uids):
+        """Removes entries from the cache"""
+        with self._lock:
+            for uid in uids:
+                self._entries.pop(uid, None)
+
+    def clear(self):
+        """Removes all entries from the cache"""
+        with self._lock:
+            self._entries.clear()
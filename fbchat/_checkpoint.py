@@ -0,0 +1,99 @@
+# -*- coding: UTF-8 -*-
+
+from __future__ import unicode_literals
+
+import json
+import os
+from collections import deque
+
+from ._util import *
+
+
+class DedupWindow(object):
+    """Remembers the last `size` message IDs, to recognize replayed deltas"""
+
+    def __init__(self, size=1000, ids=None):
+        self._order = deque(maxlen=size)
+        self._ids = set()
+        for mid in ids or []:
+            self.add(mid)
+
+    def __contains__(self, mid):
+        return mid in self._ids
+
+    def __iter__(self):
+        return iter(self._order)
+
+    def add(self, mid):
+        """Adds a message ID. Returns `False` if it was already seen"""
+        if mid in self._ids:
+            return False
+        if len(self._order) == self._order.maxlen:
+            self._ids.discard(self._order[0])
+        self._order.append(mid)
+        self._ids.add(mid)
+        return True
+
+
+class CheckpointStore(object):
+    """Persists the listening state of a client, so it can resume after a restart
+
+    Set it on a client with::
+
+        client.checkpoint_store = JSONCheckpointStore("checkpoint.json")
+
+    The state is saved after every pull has been handled, and loaded by
+    :func:`Client.startListening`. Subclass this to keep it e.g. in a database.
+
+    With a :class:`ThreadedListener`, the state after a pull is only saved once its
+    events have been handled, so events still queued when the process is killed are
+    pulled again after the restart.
+    """
+
+    def load(self):
+        """
+        :return: The saved state, or `None`
+        :rtype: dict
+        """
+        raise NotImplementedError
+
+    def save(self, state):
+        """Saves the state, a json-serializable dict"""
+        raise NotImplementedError
+
+
+class MemoryCheckpointStore(CheckpointStore):
+    """Keeps the state in memory, e.g. to resume after :func:`Client.stopListening`"""
+
+    def __init__(self):
+        self._state = None
+
+    def load(self):
+        return self._state
+
+    def save(self, state):
+        self._state = state
+
+
+class JSONCheckpointStore(CheckpointStore):
+    """Keeps the state in a JSON file, which is replaced atomically on every save"""
+
+    def __init__(self, filename):
+        self.filename = filename
+
+    def load(self):
+        if not os.path.exists(self.filename):
+            return None
+        with open(self.filename) as f:
+            return json.load(f)
+
+    def save(self, state):
+        tmp = "{}.tmp".format(self.filename)
+        with open(tmp, "w") as f:
+            json.dump(state, f)
+        if hasattr(os, "replace"):
+            os.replace(tmp, self.filename)
+        else:
+            if os.path.exists(self.filename):
+                os.remove(self.filename)
+            os.rename(tmp, self.filename)
@@ -2,6 +2,7 @@
 
 from __future__ import unicode_literals
 import requests
+import threading
 import urllib
 from ._fetch import Fetcher
 from uuid import uuid1
@@ -12,7 +13,20 @@ from collections import OrderedDict
 from ._util import *
 from .models import *
 from .graphql import *
+from ._graphql import graphql_response_to_results
 from ._send import Sender
+from ._transport import Transport, RequestsTransport
+from ._listen import ThreadedListener
+from ._buffer import BufferPolicy
+from ._forced import ForcedFetchResolver
+from ._ping import PingScheduler
+from ._reconnect import ReconnectPolicy
+from ._retry import IDEMPOTENT_URLS, RetryPolicy, RetryState
+from ._flight import SingleFlight
+from ._checkpoint import DedupWindow
+from ._events import EventStream
+from ._presence import PresenceStore
+from ._delta import DEFAULT_DELTA_PARSERS, CACHE_PARSERS, INBOX_PARSERS
 import time
 
 try:
@@ -21,16 +35,118 @@ except ImportError:
     from urlparse import urlparse, parse_qs
 
 
+#: Event methods called for the message types that don't change any state
+_MESSAGE_EVENTS = {
+    "inbox": "onInbox",
+    "typ": "onTyping",
+    "ttyp": "onTyping",
+    "jewel_requests_add": "onFriendRequest",
+    "qprimer": "onQprimer",
+}
+
+#: Event methods called for the message types that update :any:`Client.presence`
+_PRESENCE_EVENTS = {
+    "chatproxy-presence": "onChatTimestamp",
+    "buddylist_overlay": "onBuddylistOverlay",
+}
+
+
 class Client(object):
     """A client for the Facebook Chat (Messenger).
 
     See https://fbchat.readthedocs.io for complete documentation of the API.
+
+    The requests of a client can be made from several threads at once, e.g. from a
+    `ThreadPoolExecutor`, so one session can be shared by all of them.
     """
 
     ssl_verify = True
     """Verify ssl certificate, set to False to allow debugging with a proxy"""
     listening = False
     """Whether the client is listening. Used when creating an external event loop to determine when to stop listening"""
+    graphql_batcher = None
+    """
+    A :class:`GraphQLBatcher`. If set, GraphQL queries made close together, e.g. from
+    multiple threads, are sent in the same request
+    """
+    delta_parsers = None
+    """
+    The :class:`DeltaRegistry` used to parse the deltas received while listening.
+    Each client has its own copy, so parsers can be registered on it freely
+    """
+    skip_unhandled_events = True
+    """
+    Whether to skip parsing events whose methods aren't overridden. The default event
+    methods only log the events. Methods assigned to the client, e.g.
+    `client.onMessage = func`, count as overridden. Other handlers, e.g. methods
+    patched on the class after the client was created, should be marked as handled
+    with :func:`Client.subscribe`
+    """
+    background_forced_fetch = True
+    """
+    Whether the messages of `ForcedFetch` deltas, e.g. thread image changes, are
+    fetched on a background thread while listening, instead of before the next pull.
+    See :class:`ForcedFetchResolver`
+    """
+    _forced_fetch_resolver = None
+    ping_interval = 60
+    """
+    Seconds between the presence pings sent while listening, if the client is marked
+    as active. See :class:`PingScheduler`
+    """
+    _ping_scheduler = None
+    checkpoint_store = None
+    """
+    A :class:`CheckpointStore`. If set, the listening state is saved after every
+    pull, and :func:`Client.startListening` resumes from it
+    """
+    dedup_window_size = 1000
+    """
+    Number of recent message IDs remembered while listening, so deltas that are
+    received twice, e.g. after resuming from a checkpoint, are only handled once
+    """
+    pull_recorder = None
+    """
+    A :class:`PullRecorder`. If set, every pull received while listening is recorded
+    """
+    retry_policy = None
+    """
+    The :class:`RetryPolicy` deciding which failed requests are retried. By default,
+    pulls and pings aren't retried, since listening reconnects by itself, and only the
+    requests that just read, see :any:`IDEMPOTENT_URLS`, are retried after network
+    errors, so e.g. messages aren't sent twice
+    """
+    rate_limiter = None
+    """
+    A :class:`RateLimiter`. If set, requests to the limited endpoints, e.g. sent
+    messages, are paced so they stay below the rates Facebook allows
+    """
+    single_flight = None
+    """
+    The :class:`SingleFlight` making identical calls of :func:`Client.fetchThreadInfo`
+    (and so :func:`Client.fetchUserInfo`, etc.) and :func:`Client.fetchImageUrl`,
+    made at the same time from several threads, share one request. Set to `None`
+    to disable it
+    """
+    reconnect_policy = None
+    """
+    The :class:`ReconnectPolicy` deciding how to retry failed pulls while listening
+    """
+    _dispatcher = None
+    inbox = None
+    """
+    An :class:`Inbox`. If set, it's updated by the events received while listening,
+    and by moving, deleting and marking threads as read
+    """
+    presence = None
+    """
+    The :class:`PresenceStore` with the active status of users, updated while listening
+    """
+    entity_cache = None
+    """
+    An :class:`EntityCache`. If set, the info of users, pages and groups is cached,
+    and updated by the events received while listening
+    """
     uid = None
     """
     The ID of the client.
@@ -47,6 +163,7 @@ class Client(object):
             max_tries=5,
             session_cookies=None,
             logging_level=logging.INFO,
+            transport=None,
     ):
         """Initializes and logs in the client
 
@@ -56,15 +173,21 @@ class Client(object):
         :param max_tries: Maximum number of times to try logging in
         :param session_cookies: Cookies from a previous session (Will default to login if these are invalid)
         :param logging_level: Configures the `logging level <https://docs.python.org/3/library/logging.html#logging-levels>`_. Defaults to `INFO`
+        :param transport: How to send the HTTP requests. Defaults to :class:`RequestsTransport`
         :type max_tries: int
         :type session_cookies: dict
         :type logging_level: int
+        :type transport: Transport
         :raises: FBchatException on failed login
         """
 
         self.sticky, self.pool = (None, None)
-        self._session = requests.session()
+        self._transport = transport or RequestsTransport()
         self.req_counter = 1
+        self._req_counter_lock = threading.Lock()
+        # Held while the session is replaced, see `_fix_fb_errors`
+        self._session_lock = threading.RLock()
+        self._session_generation = 0
         self.seq = "0"
         # See `createPoll` for the reason for using `OrderedDict` here
         self.payloadDefault = OrderedDict()
@@ -72,8 +195,20 @@ class Client(object):
         self.default_thread_id = None
         self.default_thread_type = None
         self.req_url = ReqUrl()
+        self.delta_parsers = DEFAULT_DELTA_PARSERS.copy()
+        endpoints = dict(
+            (url, RetryPolicy(retry_network_errors=True)) for url in IDEMPOTENT_URLS
+        )
+        endpoints[ReqUrl.STICKY] = endpoints[ReqUrl.PING] = RetryPolicy(attempts=1)
+        self.retry_policy = RetryPolicy(endpoints=endpoints)
+        self.single_flight = SingleFlight()
+        self.reconnect_policy = ReconnectPolicy()
+        self._seen_mids = DedupWindow(self.dedup_window_size)
+        self._overridden_events = self._findHandledEvents()
+        self._handled_events = set(self._overridden_events)
+        self._subscriptions = {}
         self._markAlive = True
-        self._buddylist = dict()
+        self.presence = PresenceStore()
 
         self.DaFetch = Fetcher(4)
         self.Sender = Sender()
@@ -106,30 +241,107 @@ class Client(object):
     INTERNAL REQUEST METHODS
     """
 
-    def _generatePayload(self, query):
+    def _nextRequestCounter(self):
+        with self._req_counter_lock:
+            counter = self.req_counter
+            self.req_counter += 1
+        return counter
+
+    def _generatePayload(self, query, defaults=None):
         """Adds the following defaults to the payload:
           __rev, __user, __a, ttstamp, fb_dtsg, __req
+
+        `payloadDefault` is never modified, only replaced, so it can be copied while
+        other threads update it
         """
-        payload = self.payloadDefault.copy()
+        payload = (self.payloadDefault if defaults is None else defaults).copy()
         if query:
             payload.update(query)
-        payload["__req"] = str_base(self.req_counter, 36)
+        payload["__req"] = str_base(self._nextRequestCounter(), 36)
         payload["seq"] = self.seq
-        self.req_counter += 1
         return payload
 
-    def _fix_fb_errors(self, error_code):
+    def _updatePayloadDefault(self, **values):
+        """Replaces `payloadDefault` with a copy updated with `values`"""
+        with self._session_lock:
+            payload_default = self.payloadDefault.copy()
+            payload_default.update(values)
+            self.payloadDefault = payload_default
+
+    def _fix_fb_errors(self, error_code, generation=None):
         """
         This fixes "Please try closing and re-opening your browser window" errors (1357004)
         This error usually happens after 1-2 days of inactivity
         It may be a bad idea to do this in an exception handler, if you have a better method, please suggest it!
+
+        :param generation: The `_session_generation` when the failed request was made. If the session was renewed since, e.g. by another thread, it's not renewed again
         """
         if error_code == "1357004":
-            log.warning("Got error #1357004. Doing a _postLogin, and resending request")
-            self._postLogin()
+            with self._session_lock:
+                if generation is None or generation == self._session_generation:
+                    log.warning(
+                        "Got error #1357004. Doing a _postLogin, and resending request"
+                    )
+                    self._postLogin()
             return True
         return False
 
+    def _request(
+            self,
+            method,
+            url,
+            query=None,
+            timeout=30,
+            fix_request=False,
+            as_json=False,
+            error_retries=3,
+            files=None,
+            parse=None,
+    ):
+        """Sends a request, and retries it as :any:`Client.retry_policy` says
+
+        :param error_retries: How many times to renew the session, if it has expired
+        :param parse: If `fix_request` is set, applied to the content. Errors it raises are retried like the request's
+        """
+        retry = RetryState(self.retry_policy, url, error_retries)
+        if files is None:
+            headers = self._header
+        else:
+            # Removes 'Content-Type' from the header
+            headers = dict(
+                (i, self._header[i]) for i in self._header if i != "Content-Type"
+            )
+        while True:
+            generation = self._session_generation
+            if self.rate_limiter is not None:
+                self.rate_limiter.acquire(url)
+            payload = self._generatePayload(query)
+            kwargs = dict(headers=headers, timeout=timeout, verify=self.ssl_verify)
+            try:
+                if method == "GET":
+                    r = self._transport.get(url, params=payload, **kwargs)
+                elif files is None:
+                    r = self._transport.post(url, data=payload, **kwargs)
+                else:
+                    r = self._transport.post(url, data=payload, files=files, **kwargs)
+                if not fix_request:
+                    if not retry.retries_status(r.status_code):
+                        return r
+                else:
+                    content = check_request(r, as_json=as_json)
+                    return content if parse is None else parse(content)
+            except (
+                FBchatFacebookError,
+                requests.Timeout,
+                requests.ConnectionError,
+            ) as e:
+                if retry.renews_session(e):
+                    self._fix_fb_errors(e.fb_error_code, generation)
+                    continue
+                if not retry.retries(e):
+                    raise
+            time.sleep(retry.next())
+
     def _get(
             self,
             url,
@@ -139,29 +351,15 @@ class Client(object):
             as_json=False,
             error_retries=3,
     ):
-        payload = self._generatePayload(query)
-        r = self._session.get(
+        return self._request(
+            "GET",
             url,
-            headers=self._header,
-            params=payload,
+            query=query,
             timeout=timeout,
-            verify=self.ssl_verify,
+            fix_request=fix_request,
+            as_json=as_json,
+            error_retries=error_retries,
         )
-        if not fix_request:
-            return r
-        try:
-            return check_request(r, as_json=as_json)
-        except FBchatFacebookError as e:
-            if error_retries > 0 and self._fix_fb_errors(e.fb_error_code):
-                return self._get(
-                    url,
-                    query=query,
-                    timeout=timeout,
-                    fix_request=fix_request,
-                    as_json=as_json,
-                    error_retries=error_retries - 1,
-                )
-            raise e
 
     def _post(
             self,
@@ -172,43 +370,29 @@ class Client(object):
             as_json=False,
             error_retries=3,
     ):
-        payload = self._generatePayload(query)
-        r = self._session.post(
+        return self._request(
+            "POST",
             url,
-            headers=self._header,
-            data=payload,
+            query=query,
             timeout=timeout,
-            verify=self.ssl_verify,
+            fix_request=fix_request,
+            as_json=as_json,
+            error_retries=error_retries,
         )
-        if not fix_request:
-            return r
-        try:
-            return check_request(r, as_json=as_json)
-        except FBchatFacebookError as e:
-            if error_retries > 0 and self._fix_fb_errors(e.fb_error_code):
-                return self._post(
-                    url,
-                    query=query,
-                    timeout=timeout,
-                    fix_request=fix_request,
-                    as_json=as_json,
-                    error_retries=error_retries - 1,
-                )
-            raise e
 
-    def _graphql(self, payload, error_retries=3):
-        content = self._post(
-            self.req_url.GRAPHQL, payload, fix_request=True, as_json=False
+    def _graphql(self, payload, error_retries=3, parse=graphql_response_to_json):
+        return self._request(
+            "POST",
+            self.req_url.GRAPHQL,
+            query=payload,
+            fix_request=True,
+            as_json=False,
+            error_retries=error_retries,
+            parse=parse,
         )
-        try:
-            return graphql_response_to_json(content)
-        except FBchatFacebookError as e:
-            if error_retries > 0 and self._fix_fb_errors(e.fb_error_code):
-                return self._graphql(payload, error_retries=error_retries - 1)
-            raise e
 
     def _cleanGet(self, url, query=None, timeout=30, allow_redirects=True):
-        return self._session.get(
+        return self._transport.get(
             url,
             headers=self._header,
             params=query,
@@ -218,8 +402,8 @@ class Client(object):
         )
 
     def _cleanPost(self, url, query=None, timeout=30):
-        self.req_counter += 1
-        return self._session.post(
+        self._nextRequestCounter()
+        return self._transport.post(
             url,
             headers=self._header,
             data=query,
@@ -237,46 +421,18 @@ class Client(object):
             as_json=False,
             error_retries=3,
     ):
-        payload = self._generatePayload(query)
-        # Removes 'Content-Type' from the header
-        headers = dict(
-            (i, self._header[i]) for i in self._header if i != "Content-Type"
-        )
-        r = self._session.post(
+        return self._request(
+            "POST",
             url,
-            headers=headers,
-            data=payload,
+            query=query,
             timeout=timeout,
+            fix_request=fix_request,
+            as_json=as_json,
+            error_retries=error_retries,
             files=files,
-            verify=self.ssl_verify,
         )
-        if not fix_request:
-            return r
-        try:
-            return check_request(r, as_json=as_json)
-        except FBchatFacebookError as e:
-            if error_retries > 0 and self._fix_fb_errors(e.fb_error_code):
-                return self._postFile(
-                    url,
-                    files=files,
-                    query=query,
-                    timeout=timeout,
-                    fix_request=fix_request,
-                    as_json=as_json,
-                    error_retries=error_retries - 1,
-                )
-            raise e
-
-    def graphql_requests(self, *queries):
-        """
-        :param queries: Zero or more GraphQL objects
-        :type queries: GraphQL
-
-        :raises: FBchatException if request failed
-        :return: A tuple containing json graphql queries
-        :rtype: tuple
-        """
 
+    def _graphqlRequests(self, *queries):
         return tuple(
             self._graphql(
                 {
@@ -287,6 +443,31 @@ class Client(object):
             )
         )
 
+    def _graphqlResults(self, *queries):
+        """Like `_graphqlRequests`, but the error of a query is returned in its place"""
+        return self._graphql(
+            {
+                "method": "GET",
+                "response_format": "json",
+                "queries": graphql_queries_to_json(*queries),
+            },
+            parse=graphql_response_to_results,
+        )
+
+    def graphql_requests(self, *queries):
+        """
+        :param queries: Zero or more GraphQL objects
+        :type queries: GraphQL
+
+        :raises: FBchatException if request failed
+        :return: A tuple containing json graphql queries
+        :rtype: tuple
+        """
+        if self.graphql_batcher is not None:
+            futures = [self.graphql_batcher.submit(query) for query in queries]
+            return tuple(future.result() for future in futures)
+        return self._graphqlRequests(*queries)
+
     def graphql_request(self, query):
         """
         Shorthand for `graphql_requests(query)[0]`
@@ -304,24 +485,33 @@ class Client(object):
     """
 
     def _resetValues(self):
-        self.payloadDefault = OrderedDict()
-        self._session = requests.session()
-        self.req_counter = 1
-        self.seq = "0"
-        self.uid = None
+        with self._session_lock:
+            self.payloadDefault = OrderedDict()
+            self._transport.reset()
+            with self._req_counter_lock:
+                self.req_counter = 1
+            self.seq = "0"
+            self.uid = None
+            self._session_generation += 1
 
     def _postLogin(self):
-        self.payloadDefault = OrderedDict()
+        with self._session_lock:
+            self._loadSessionValues()
+            self._session_generation += 1
+
+    def _loadSessionValues(self):
         self.client_id = hex(int(random() * 2147483648))[2:]
         self.start_time = now()
-        self.uid = self._session.cookies.get_dict().get("c_user")
+        self.uid = self._transport.cookies.get_dict().get("c_user")
         if self.uid is None:
             raise FBchatException("Could not find c_user cookie")
         self.uid = str(self.uid)
         self.user_channel = "p_" + self.uid
         self.ttstamp = ""
 
-        r = self._get(self.req_url.BASE)
+        r = self._cleanGet(
+            self.req_url.BASE, self._generatePayload(None, defaults=OrderedDict())
+        )
         soup = bs(r.text, "html.parser")
 
         fb_dtsg_element = soup.find("input", {"name": "fb_dtsg"})
@@ -338,13 +528,15 @@ class Client(object):
             self.ttstamp += str(ord(i))
         self.ttstamp += "2"
         # Set default payload
-        self.payloadDefault["__rev"] = int(
+        payload_default = OrderedDict()
+        payload_default["__rev"] = int(
             r.text.split('"client_revision":', 1)[1].split(",", 1)[0]
         )
-        self.payloadDefault["__user"] = self.uid
-        self.payloadDefault["__a"] = "1"
-        self.payloadDefault["ttstamp"] = self.ttstamp
-        self.payloadDefault["fb_dtsg"] = self.fb_dtsg
+        payload_default["__user"] = self.uid
+        payload_default["__a"] = "1"
+        payload_default["ttstamp"] = self.ttstamp
+        payload_default["fb_dtsg"] = self.fb_dtsg
+        self.payloadDefault = payload_default
 
     def _login(self):
         if not (self.email and self.password):
@@ -453,7 +645,7 @@ class Client(object):
         :return: A dictionay containing session cookies
         :rtype: dict
         """
-        return self._session.cookies.get_dict()
+        return self._transport.cookies.get_dict()
 
     def setSession(self, session_cookies):
         """Loads session cookies
@@ -470,8 +662,8 @@ class Client(object):
 
         try:
             # Load cookies into current session
-            self._session.cookies = requests.cookies.merge_cookies(
-                self._session.cookies, session_cookies
+            self._transport.cookies = requests.cookies.merge_cookies(
+                self._transport.cookies, session_cookies
             )
             self._postLogin()
         except Exception as e:
@@ -502,7 +694,8 @@ class Client(object):
         self.password = password
 
         for i in range(1, max_tries + 1):
-            login_successful, login_url = self._login()
+            with self._session_lock:
+                login_successful, login_url = self._login()
             if not login_successful:
                 log.warning(
                     "Attempt #{} failed{}".format(
@@ -603,9 +796,12 @@ class Client(object):
     def _forcedFetch(self, thread_id, mid):
         return self.DaFetch.FET__forcedFetch(self, thread_id, mid)
 
-    def fetchThreads(self, thread_location, before=None, after=None, limit=None):
+    def fetchThreads(self, thread_location=ThreadLocation.INBOX, before=None, after=None, limit=None):
         return self.DaFetch.FET_fetchThreads(self, thread_location, before, after, limit)
 
+    def iterThreads(self, thread_location=ThreadLocation.INBOX, before=None, after=None, prefetch=1):
+        return self.DaFetch.FET_iterThreads(self, thread_location, before, after, prefetch)
+
     def fetchAllUsersFromThreads(self, threads):
         return self.DaFetch.FET_fetchAllUsersFromThreads(self, threads)
 
@@ -633,6 +829,11 @@ class Client(object):
     def search(self, query, fetch_messages=False, thread_limit=5, message_limit=5):
         return self.DaFetch.FET_search(self, query, fetch_messages, thread_limit, message_limit)
 
+    def _singleFlight(self, key, func, *args):
+        if self.single_flight is None:
+            return func(*args)
+        return self.single_flight.do(key, func, *args)
+
     def _fetchInfo(self, *ids):
         return self.DaFetch.FET__fetchInfo(self, *ids)
 
@@ -646,11 +847,18 @@ class Client(object):
         return self.DaFetch.FET_fetchGroupInfo(self, *group_ids)
 
     def fetchThreadInfo(self, *thread_ids):
-        return self.DaFetch.FET_fetchThreadInfo(self, *thread_ids)
+        thread_ids = tuple(sorted(set(str(thread_id) for thread_id in thread_ids)))
+        key = (self.req_url.GRAPHQL, "fetchThreadInfo", thread_ids)
+        return dict(
+            self._singleFlight(key, self.DaFetch.FET_fetchThreadInfo, self, *thread_ids)
+        )
 
     def fetchThreadMessages(self, thread_id=None, limit=20, before=None):
         return self.DaFetch.FET_fetchThreadMessages(self, thread_id, limit, before)
 
+    def iterThreadMessages(self, thread_id=None, after=None, page_size=100, prefetch=1):
+        return self.DaFetch.FET_iterThreadMessages(self, thread_id, after, page_size, prefetch)
+
     def fetchUnreadFromThreadMessages(self, thread_id=None):
         #gets all the unread messages from the Client and prints their messages on screen in order to view it
         return self.DaFetch.FET_fetchUnreadFromThreadMessages(self, thread_id)
@@ -666,7 +874,8 @@ class Client(object):
 
 
     def fetchImageUrl(self, image_id):
-        return self.DaFetch.FET_fetchImageUrl(self, image_id)
+        key = (self.req_url.ATTACHMENT_PHOTO, str(image_id))
+        return self._singleFlight(key, self.DaFetch.FET_fetchImageUrl, self, image_id)
 
     def fetchVideoUrl(self, video_id):
         return self.DaFetch.FET_fetchVideoUrl(self, video_id)
@@ -723,7 +932,7 @@ class Client(object):
         :return: :ref:`Message ID <intro_message_ids>` of the sent message
         :raises: FBchatException if request failed
         """
-        return Sender.s_send(self, message, thread_id, thread_type)
+        return Sender.s_send(self.Sender, self, message, thread_id, thread_type)
 
     def sendMessage(self, message, thread_id=None, thread_type=ThreadType.USER):
         """
@@ -1158,6 +1367,8 @@ class Client(object):
             data["ids[{}]".format(thread_id)] = "true" if read else "false"
 
         r = self._post(self.req_url.READ_STATUS, data)
+        if r.ok:
+            self._updateInbox("mark_read", thread_ids, read)
         return r.ok
 
     def markAsRead(self, thread_ids=None):
@@ -1251,6 +1462,7 @@ class Client(object):
         :raises: FBchatException if request failed
         """
         thread_ids = require_list(thread_ids)
+        moved_to = location
 
         if location == ThreadLocation.PENDING:
             location = ThreadLocation.OTHER
@@ -1263,13 +1475,19 @@ class Client(object):
                 data_unpin["ids[{}]".format(thread_id)] = "false"
             r_archive = self._post(self.req_url.ARCHIVED_STATUS, data_archive)
             r_unpin = self._post(self.req_url.PINNED_STATUS, data_unpin)
-            return r_archive.ok and r_unpin.ok
+            ok = r_archive.ok and r_unpin.ok
         else:
             data = dict()
             for i, thread_id in enumerate(thread_ids):
                 data["{}[{}]".format(location.name.lower(), i)] = thread_id
             r = self._post(self.req_url.MOVE_THREAD, data)
-            return r.ok
+            ok = r.ok
+        if ok and self.inbox is not None:
+            if moved_to == self.inbox.location:
+                self.inbox.refresh(self, thread_ids)
+            else:
+                self.inbox.remove(thread_ids)
+        return ok
 
     def deleteThreads(self, thread_ids):
         """
@@ -1288,6 +1506,8 @@ class Client(object):
             data_delete["ids[{}]".format(i)] = thread_id
         r_unpin = self._post(self.req_url.PINNED_STATUS, data_unpin)
         r_delete = self._post(self.req_url.DELETE_THREAD, data_delete)
+        if r_unpin.ok and r_delete.ok:
+            self._updateInbox("remove", thread_ids)
         return r_unpin.ok and r_delete.ok
 
     def markAsSpam(self, thread_id=None):
@@ -1406,740 +1626,271 @@ class Client(object):
             "state": "active" if self._markAlive else "offline",
         }
 
-        j = self._get(self.req_url.STICKY, data, fix_request=True, as_json=True)
+        scheduler = self._ping_scheduler
+        if scheduler is not None:
+            scheduler.pull_started()
+        try:
+            j = self._get(self.req_url.STICKY, data, fix_request=True, as_json=True)
+        finally:
+            if scheduler is not None:
+                scheduler.pull_ended()
 
         self.seq = j.get("seq", "0")
         return j
 
-    def _parseDelta(self, m):
-        def getThreadIdAndThreadType(msg_metadata):
-            """Returns a tuple consisting of thread ID and thread type"""
-            id_thread = None
-            type_thread = None
-            if "threadFbId" in msg_metadata["threadKey"]:
-                id_thread = str(msg_metadata["threadKey"]["threadFbId"])
-                type_thread = ThreadType.GROUP
-            elif "otherUserFbId" in msg_metadata["threadKey"]:
-                id_thread = str(msg_metadata["threadKey"]["otherUserFbId"])
-                type_thread = ThreadType.USER
-            return id_thread, type_thread
+    def _invalidateEntities(self, *thread_ids):
+        if self.entity_cache is not None:
+            self.entity_cache.invalidate(*thread_ids)
 
-        delta = m["delta"]
-        delta_type = delta.get("type")
-        delta_class = delta.get("class")
-        metadata = delta.get("messageMetadata")
-
-        if metadata:
-            mid = metadata["messageId"]
-            author_id = str(metadata["actorFbId"])
-            ts = int(metadata.get("timestamp"))
-
-        # Added participants
-        if "addedParticipants" in delta:
-            added_ids = [str(x["userFbId"]) for x in delta["addedParticipants"]]
-            thread_id = str(metadata["threadKey"]["threadFbId"])
-            self.onPeopleAdded(
-                mid=mid,
-                added_ids=added_ids,
-                author_id=author_id,
-                thread_id=thread_id,
-                ts=ts,
-                msg=m,
-            )
+    def _patchEntity(self, thread_id, **attributes):
+        if self.entity_cache is not None:
+            self.entity_cache.patch(thread_id, **attributes)
 
-        # Left/removed participants
-        elif "leftParticipantFbId" in delta:
-            removed_id = str(delta["leftParticipantFbId"])
-            thread_id = str(metadata["threadKey"]["threadFbId"])
-            self.onPersonRemoved(
-                mid=mid,
-                removed_id=removed_id,
-                author_id=author_id,
-                thread_id=thread_id,
-                ts=ts,
-                msg=m,
-            )
+    def _updateInbox(self, method, *args):
+        if self.inbox is not None:
+            getattr(self.inbox, method)(*args)
 
-        # Color change
-        elif delta_type == "change_thread_theme":
-            new_color = graphql_color_to_enum(delta["untypedData"]["theme_color"])
-            thread_id, thread_type = getThreadIdAndThreadType(metadata)
-            self.onColorChange(
-                mid=mid,
-                author_id=author_id,
-                new_color=new_color,
-                thread_id=thread_id,
-                thread_type=thread_type,
-                ts=ts,
-                metadata=metadata,
-                msg=m,
-            )
+    def _keepsState(self, parser):
+        """Whether a parser must run to keep the entity cache or the inbox up to date"""
+        return (self.entity_cache is not None and parser in CACHE_PARSERS) or (
+            self.inbox is not None and parser in INBOX_PARSERS
+        )
 
-        # Emoji change
-        elif delta_type == "change_thread_icon":
-            new_emoji = delta["untypedData"]["thread_icon"]
-            thread_id, thread_type = getThreadIdAndThreadType(metadata)
-            self.onEmojiChange(
-                mid=mid,
-                author_id=author_id,
-                new_emoji=new_emoji,
-                thread_id=thread_id,
-                thread_type=thread_type,
-                ts=ts,
-                metadata=metadata,
-                msg=m,
-            )
+    def _findHandledEvents(self):
+        """Returns the names of the event methods overridden by a subclass or instance"""
+        handled = set()
+        for name in dir(Client):
+            default = getattr(Client, name)
+            if not name.startswith("on") or not callable(default):
+                continue
+            method = getattr(type(self), name)
+            if name in vars(self) or getattr(method, "__func__", method) is not getattr(
+                default, "__func__", default
+            ):
+                handled.add(name)
+        return handled
+
+    def _refreshHandledEvents(self):
+        if "_subscriptions" not in vars(self):  # Still in `__init__`
+            return
+        self._overridden_events = self._findHandledEvents()
+        self._handled_events = self._overridden_events | set(self._subscriptions)
 
-        # Thread title change
-        elif delta_class == "ThreadName":
-            new_title = delta["name"]
-            thread_id, thread_type = getThreadIdAndThreadType(metadata)
-            self.onTitleChange(
-                mid=mid,
-                author_id=author_id,
-                new_title=new_title,
-                thread_id=thread_id,
-                thread_type=thread_type,
-                ts=ts,
-                metadata=metadata,
-                msg=m,
-            )
+    def __setattr__(self, name, value):
+        super(Client, self).__setattr__(name, value)
+        # Event methods assigned to the instance, e.g. `client.onMessage = func`
+        if name.startswith("on"):
+            self._refreshHandledEvents()
 
-        # Forced fetch
-        elif delta_class == "ForcedFetch":
-            mid = delta.get("messageId")
-            if mid is None:
-                self.onUnknownMesssageType(msg=m)
+    def __delattr__(self, name):
+        super(Client, self).__delattr__(name)
+        if name.startswith("on"):
+            self._refreshHandledEvents()
+
+    def _isHandled(self, event):
+        return not self.skip_unhandled_events or event in self._handled_events
+
+    def subscribe(self, *events):
+        """
+        Marks event methods as handled, so their events are parsed even though the
+        methods aren't overridden. See :any:`Client.skip_unhandled_events`
+
+        :param events: Names of event methods, e.g. `"onMessage"`
+        """
+        for event in events:
+            self._subscriptions[event] = self._subscriptions.get(event, 0) + 1
+        self._refreshHandledEvents()
+
+    def unsubscribe(self, *events):
+        """Undoes one :func:`Client.subscribe` call"""
+        for event in events:
+            count = self._subscriptions.get(event, 0) - 1
+            if count > 0:
+                self._subscriptions[event] = count
             else:
-                thread_id = str(delta["threadKey"]["threadFbId"])
-                fetch_info = self._forcedFetch(thread_id, mid)
-                fetch_data = fetch_info["message"]
-                author_id = fetch_data["message_sender"]["id"]
-                ts = fetch_data["timestamp_precise"]
-                if fetch_data.get("__typename") == "ThreadImageMessage":
-                    # Thread image change
-                    image_metadata = fetch_data.get("image_with_metadata")
-                    image_id = (
-                        int(image_metadata["legacy_attachment_id"])
-                        if image_metadata
-                        else None
-                    )
-                    self.onImageChange(
-                        mid=mid,
-                        author_id=author_id,
-                        new_image=image_id,
-                        thread_id=thread_id,
-                        thread_type=ThreadType.GROUP,
-                        ts=ts,
-                        msg=m,
-                    )
+                self._subscriptions.pop(event, None)
+        self._refreshHandledEvents()
 
-        # Nickname change
-        elif delta_type == "change_thread_nickname":
-            changed_for = str(delta["untypedData"]["participant_id"])
-            new_nickname = delta["untypedData"]["nickname"]
-            thread_id, thread_type = getThreadIdAndThreadType(metadata)
-            self.onNicknameChange(
-                mid=mid,
-                author_id=author_id,
-                changed_for=changed_for,
-                new_nickname=new_nickname,
-                thread_id=thread_id,
-                thread_type=thread_type,
-                ts=ts,
-                metadata=metadata,
-                msg=m,
-            )
+    def _resolveForcedFetch(self, thread_id, mid, callback, m=None):
+        resolver = self._forced_fetch_resolver
+        if resolver is None:
+            callback(self._forcedFetch(thread_id, mid))
+        else:
+            resolver.submit(thread_id, mid, callback, m)
 
-        # Admin added or removed in a group thread
-        elif delta_type == "change_thread_admins":
-            thread_id, thread_type = getThreadIdAndThreadType(metadata)
-            target_id = delta["untypedData"]["TARGET_ID"]
-            admin_event = delta["untypedData"]["ADMIN_EVENT"]
-            if admin_event == "add_admin":
-                self.onAdminAdded(
-                    mid=mid,
-                    added_id=target_id,
-                    author_id=author_id,
-                    thread_id=thread_id,
-                    thread_type=thread_type,
-                    ts=ts,
-                    msg=m,
-                )
-            elif admin_event == "remove_admin":
-                self.onAdminRemoved(
-                    mid=mid,
-                    removed_id=target_id,
-                    author_id=author_id,
-                    thread_id=thread_id,
-                    thread_type=thread_type,
-                    ts=ts,
-                    msg=m,
-                )
+    def _parseDelta(self, m):
+        delta = m["delta"]
+        entry = self.delta_parsers._lookup(delta)
+        if entry is None:
+            self.onUnknownMesssageType(msg=m)
+            return
+        parser, handlers = entry
+        if self._skipsDelta(parser, handlers):
+            return
+        parser(self, m, delta)
+
+    def _skipsDelta(self, parser, handlers):
+        return (
+            self.skip_unhandled_events
+            and handlers is not None
+            and handlers.isdisjoint(self._handled_events)
+            and not self._keepsState(parser)
+        )
 
-        # Group approval mode change
-        elif delta_type == "change_thread_approval_mode":
-            thread_id, thread_type = getThreadIdAndThreadType(metadata)
-            approval_mode = bool(int(delta["untypedData"]["APPROVAL_MODE"]))
-            self.onApprovalModeChange(
-                mid=mid,
-                approval_mode=approval_mode,
-                author_id=author_id,
-                thread_id=thread_id,
-                thread_type=thread_type,
-                ts=ts,
-                msg=m,
-            )
+    def _isWanted(self, m):
+        """Whether parsing a pulled message calls a handled event, or updates the inbox"""
+        mtype = m.get("type")
+        if mtype == "delta":
+            entry = self.delta_parsers._lookup(m["delta"])
+            return entry is None or not self._skipsDelta(*entry)
+        event = _MESSAGE_EVENTS.get(mtype) or _PRESENCE_EVENTS.get(mtype)
+        if event is None or self._isHandled(event):
+            return True
+        return mtype == "inbox" and self.inbox is not None
 
-        # Message delivered
-        elif delta_class == "DeliveryReceipt":
-            message_ids = delta["messageIds"]
-            delivered_for = str(
-                delta.get("actorFbId") or delta["threadKey"]["otherUserFbId"]
-            )
-            ts = int(delta["deliveredWatermarkTimestampMs"])
-            thread_id, thread_type = getThreadIdAndThreadType(delta)
-            self.onMessageDelivered(
-                msg_ids=message_ids,
-                delivered_for=delivered_for,
-                thread_id=thread_id,
-                thread_type=thread_type,
-                ts=ts,
-                metadata=metadata,
-                msg=m,
-            )
+    def _updatePresence(self, m):
+        """Keeps the presence up to date from a message whose event isn't handled"""
+        try:
+            if m.get("type") == "chatproxy-presence":
+                self.presence.update_from_buddylist(m)
+            elif m.get("type") == "buddylist_overlay":
+                self.presence.update_from_overlay(m)
+        except Exception as e:
+            self.onMessageError(exception=e, msg=m)
 
-        # Message seen
-        elif delta_class == "ReadReceipt":
-            seen_by = str(delta.get("actorFbId") or delta["threadKey"]["otherUserFbId"])
-            seen_ts = int(delta["actionTimestampMs"])
-            delivered_ts = int(delta["watermarkTimestampMs"])
-            thread_id, thread_type = getThreadIdAndThreadType(delta)
-            self.onMessageSeen(
-                seen_by=seen_by,
-                thread_id=thread_id,
-                thread_type=thread_type,
-                seen_ts=seen_ts,
-                ts=delivered_ts,
-                metadata=metadata,
-                msg=m,
-            )
+    def _parseMessage(self, content):
+        """Get message and author name from content. May contain multiple messages in the content."""
 
-        # Messages marked as seen
-        elif delta_class == "MarkRead":
-            seen_ts = int(
-                delta.get("actionTimestampMs") or delta.get("actionTimestamp")
-            )
-            delivered_ts = int(
-                delta.get("watermarkTimestampMs") or delta.get("watermarkTimestamp")
-            )
+        if "lb_info" in content:
+            self.sticky = content["lb_info"]["sticky"]
+            self.pool = content["lb_info"]["pool"]
 
-            threads = []
-            if "folders" not in delta:
-                threads = [
-                    getThreadIdAndThreadType({"threadKey": thr})
-                    for thr in delta.get("threadKeys")
-                ]
+        if "batches" in content:
+            for batch in content["batches"]:
+                self._parseMessage(batch)
 
-            # thread_id, thread_type = getThreadIdAndThreadType(delta)
-            self.onMarkedSeen(
-                threads=threads, seen_ts=seen_ts, ts=delivered_ts, metadata=delta, msg=m
-            )
+        if "ms" not in content:
+            return
 
-        # Game played
-        elif delta_type == "instant_game_update":
-            game_id = delta["untypedData"]["game_id"]
-            game_name = delta["untypedData"]["game_name"]
-            score = delta["untypedData"].get("score")
-            if score is not None:
-                score = int(score)
-            leaderboard = delta["untypedData"].get("leaderboard")
-            if leaderboard is not None:
-                leaderboard = json.loads(leaderboard)["scores"]
-            thread_id, thread_type = getThreadIdAndThreadType(metadata)
-            self.onGamePlayed(
-                mid=mid,
-                author_id=author_id,
-                game_id=game_id,
-                game_name=game_name,
-                score=score,
-                leaderboard=leaderboard,
-                thread_id=thread_id,
-                thread_type=thread_type,
-                ts=ts,
-                metadata=metadata,
-                msg=m,
-            )
+        for m in content["ms"]:
+            if self._isDuplicate(m):
+                continue
+            if self._dispatcher is None:
+                self._parseMessageItem(m)
+            # Only the messages that make work for the workers are queued
+            elif self._isWanted(m):
+                self._dispatcher.put(m)
+            else:
+                self._updatePresence(m)
 
-        # Group call started/ended
-        elif delta_type == "rtc_call_log":
-            thread_id, thread_type = getThreadIdAndThreadType(metadata)
-            call_status = delta["untypedData"]["event"]
-            call_duration = int(delta["untypedData"]["call_duration"])
-            is_video_call = bool(int(delta["untypedData"]["is_video_call"]))
-            if call_status == "call_started":
-                self.onCallStarted(
-                    mid=mid,
-                    caller_id=author_id,
-                    is_video_call=is_video_call,
-                    thread_id=thread_id,
-                    thread_type=thread_type,
-                    ts=ts,
-                    metadata=metadata,
-                    msg=m,
-                )
-            elif call_status == "call_ended":
-                self.onCallEnded(
-                    mid=mid,
-                    caller_id=author_id,
-                    is_video_call=is_video_call,
-                    call_duration=call_duration,
-                    thread_id=thread_id,
-                    thread_type=thread_type,
-                    ts=ts,
-                    metadata=metadata,
-                    msg=m,
-                )
+    def _isDuplicate(self, m):
+        metadata = (m.get("delta") or {}).get("messageMetadata")
+        if not metadata or "messageId" not in metadata:
+            return False
+        return not self._seen_mids.add(metadata["messageId"])
 
-        # User joined to group call
-        elif delta_type == "participant_joined_group_call":
-            thread_id, thread_type = getThreadIdAndThreadType(metadata)
-            is_video_call = bool(int(delta["untypedData"]["group_call_type"]))
-            self.onUserJoinedCall(
-                mid=mid,
-                joined_id=author_id,
-                is_video_call=is_video_call,
-                thread_id=thread_id,
-                thread_type=thread_type,
-                ts=ts,
-                metadata=metadata,
-                msg=m,
-            )
+    def _loadCheckpoint(self):
+        state = self.checkpoint_store.load()
+        if not state:
+            return
+        self.seq = state.get("seq", self.seq)
+        self.sticky = state.get("sticky_token")
+        self.pool = state.get("sticky_pool")
+        self._seen_mids = DedupWindow(self.dedup_window_size, state.get("message_ids"))
+
+    def _checkpointState(self):
+        return {
+            "seq": self.seq,
+            "sticky_token": self.sticky,
+            "sticky_pool": self.pool,
+            "message_ids": list(self._seen_mids),
+        }
 
-        # Group poll event
-        elif delta_type == "group_poll":
-            thread_id, thread_type = getThreadIdAndThreadType(metadata)
-            event_type = delta["untypedData"]["event_type"]
-            poll_json = json.loads(delta["untypedData"]["question_json"])
-            poll = graphql_to_poll(poll_json)
-            if event_type == "question_creation":
-                # User created group poll
-                self.onPollCreated(
-                    mid=mid,
-                    poll=poll,
-                    author_id=author_id,
-                    thread_id=thread_id,
-                    thread_type=thread_type,
-                    ts=ts,
-                    metadata=metadata,
+    def _saveCheckpoint(self):
+        if self._dispatcher is not None:
+            # Saved by the dispatcher, once the queued messages are handled
+            self._dispatcher.checkpoint(self._checkpointState())
+        else:
+            self.checkpoint_store.save(self._checkpointState())
+
+    def _parseMessageItem(self, m):
+        """Parses and handles one of the messages in the content of a pull"""
+        mtype = m.get("type")
+        event = _MESSAGE_EVENTS.get(mtype)
+        if event is not None and not self._isHandled(event):
+            if not (mtype == "inbox" and self.inbox is not None):
+                return
+        try:
+            # Things that directly change chat
+            if mtype == "delta":
+                self._parseDelta(m)
+            # Inbox
+            elif mtype == "inbox":
+                self._updateInbox("set_counts", m["unseen"], m["unread"])
+                self.onInbox(
+                    unseen=m["unseen"],
+                    unread=m["unread"],
+                    recent_unread=m["recent_unread"],
                     msg=m,
                 )
-            elif event_type == "update_vote":
-                # User voted on group poll
-                added_options = json.loads(delta["untypedData"]["added_option_ids"])
-                removed_options = json.loads(delta["untypedData"]["removed_option_ids"])
-                self.onPollVoted(
-                    mid=mid,
-                    poll=poll,
-                    added_options=added_options,
-                    removed_options=removed_options,
+
+            # Typing
+            elif mtype == "typ" or mtype == "ttyp":
+                author_id = str(m.get("from"))
+                thread_id = m.get("thread_fbid")
+                if thread_id:
+                    thread_type = ThreadType.GROUP
+                    thread_id = str(thread_id)
+                else:
+                    thread_type = ThreadType.USER
+                    if author_id == self.uid:
+                        thread_id = m.get("to")
+                    else:
+                        thread_id = author_id
+                typing_status = TypingStatus(m.get("st"))
+                self.onTyping(
                     author_id=author_id,
+                    status=typing_status,
                     thread_id=thread_id,
                     thread_type=thread_type,
-                    ts=ts,
-                    metadata=metadata,
                     msg=m,
                 )
 
-        # Plan created
-        elif delta_type == "lightweight_event_create":
-            thread_id, thread_type = getThreadIdAndThreadType(metadata)
-            plan = graphql_to_plan(delta["untypedData"])
-            self.onPlanCreated(
-                mid=mid,
-                plan=plan,
-                author_id=author_id,
-                thread_id=thread_id,
-                thread_type=thread_type,
-                ts=ts,
-                metadata=metadata,
-                msg=m,
-            )
-
-        # Plan ended
-        elif delta_type == "lightweight_event_notify":
-            thread_id, thread_type = getThreadIdAndThreadType(metadata)
-            plan = graphql_to_plan(delta["untypedData"])
-            self.onPlanEnded(
-                mid=mid,
-                plan=plan,
-                thread_id=thread_id,
-                thread_type=thread_type,
-                ts=ts,
-                metadata=metadata,
-                msg=m,
-            )
-
-        # Plan edited
-        elif delta_type == "lightweight_event_update":
-            thread_id, thread_type = getThreadIdAndThreadType(metadata)
-            plan = graphql_to_plan(delta["untypedData"])
-            self.onPlanEdited(
-                mid=mid,
-                plan=plan,
-                author_id=author_id,
-                thread_id=thread_id,
-                thread_type=thread_type,
-                ts=ts,
-                metadata=metadata,
-                msg=m,
-            )
-
-        # Plan deleted
-        elif delta_type == "lightweight_event_delete":
-            thread_id, thread_type = getThreadIdAndThreadType(metadata)
-            plan = graphql_to_plan(delta["untypedData"])
-            self.onPlanDeleted(
-                mid=mid,
-                plan=plan,
-                author_id=author_id,
-                thread_id=thread_id,
-                thread_type=thread_type,
-                ts=ts,
-                metadata=metadata,
-                msg=m,
-            )
-
-        # Plan participation change
-        elif delta_type == "lightweight_event_rsvp":
-            thread_id, thread_type = getThreadIdAndThreadType(metadata)
-            plan = graphql_to_plan(delta["untypedData"])
-            take_part = delta["untypedData"]["guest_status"] == "GOING"
-            self.onPlanParticipation(
-                mid=mid,
-                plan=plan,
-                take_part=take_part,
-                author_id=author_id,
-                thread_id=thread_id,
-                thread_type=thread_type,
-                ts=ts,
-                metadata=metadata,
-                msg=m,
-            )
-
-        # Client payload (that weird numbers)
-        elif delta_class == "ClientPayload":
-            payload = json.loads("".join(chr(z) for z in delta["payload"]))
-            ts = m.get("ofd_ts")
-            for d in payload.get("deltas", []):
-
-                # Message reaction
-                if d.get("deltaMessageReaction"):
-                    i = d["deltaMessageReaction"]
-                    thread_id, thread_type = getThreadIdAndThreadType(i)
-                    mid = i["messageId"]
-                    author_id = str(i["userId"])
-                    reaction = (
-                        MessageReaction(i["reaction"]) if i.get("reaction") else None
-                    )
-                    add_reaction = not bool(i["action"])
-                    if add_reaction:
-                        self.onReactionAdded(
-                            mid=mid,
-                            reaction=reaction,
-                            author_id=author_id,
-                            thread_id=thread_id,
-                            thread_type=thread_type,
-                            ts=ts,
-                            msg=m,
-                        )
-                    else:
-                        self.onReactionRemoved(
-                            mid=mid,
-                            author_id=author_id,
-                            thread_id=thread_id,
-                            thread_type=thread_type,
-                            ts=ts,
-                            msg=m,
-                        )
-
-                # Viewer status change
-                elif d.get("deltaChangeViewerStatus"):
-                    i = d["deltaChangeViewerStatus"]
-                    thread_id, thread_type = getThreadIdAndThreadType(i)
-                    author_id = str(i["actorFbid"])
-                    reason = i["reason"]
-                    can_reply = i["canViewerReply"]
-                    if reason == 2:
-                        if can_reply:
-                            self.onUnblock(
-                                author_id=author_id,
-                                thread_id=thread_id,
-                                thread_type=thread_type,
-                                ts=ts,
-                                msg=m,
-                            )
-                        else:
-                            self.onBlock(
-                                author_id=author_id,
-                                thread_id=thread_id,
-                                thread_type=thread_type,
-                                ts=ts,
-                                msg=m,
-                            )
-
-                # Live location info
-                elif d.get("liveLocationData"):
-                    i = d["liveLocationData"]
-                    thread_id, thread_type = getThreadIdAndThreadType(i)
-                    for l in i["messageLiveLocations"]:
-                        mid = l["messageId"]
-                        author_id = str(l["senderId"])
-                        location = graphql_to_live_location(l)
-                        self.onLiveLocation(
-                            mid=mid,
-                            location=location,
-                            author_id=author_id,
-                            thread_id=thread_id,
-                            thread_type=thread_type,
-                            ts=ts,
-                            msg=m,
-                        )
-
-                # Message deletion
-                elif d.get("deltaRecallMessageData"):
-                    i = d["deltaRecallMessageData"]
-                    thread_id, thread_type = getThreadIdAndThreadType(i)
-                    mid = i["messageID"]
-                    ts = i["deletionTimestamp"]
-                    author_id = str(i["senderID"])
-                    self.onMessageUnsent(
-                        mid=mid,
-                        author_id=author_id,
-                        thread_id=thread_id,
-                        thread_type=thread_type,
-                        ts=ts,
-                        msg=m,
-                    )
-
-        # New message
-        elif delta.get("class") == "NewMessage":
-            mentions = []
-            if delta.get("data") and delta["data"].get("prng"):
-                try:
-                    mentions = [
-                        Mention(
-                            str(mention.get("i")),
-                            offset=mention.get("o"),
-                            length=mention.get("l"),
-                        )
-                        for mention in parse_json(delta["data"]["prng"])
-                    ]
-                except Exception:
-                    log.exception("An exception occured while reading attachments")
-
-            sticker = None
-            attachments = []
-            unsent = False
-            if delta.get("attachments"):
-                try:
-                    for a in delta["attachments"]:
-                        mercury = a["mercury"]
-                        if mercury.get("blob_attachment"):
-                            image_metadata = a.get("imageMetadata", {})
-                            attach_type = mercury["blob_attachment"]["__typename"]
-                            attachment = graphql_to_attachment(
-                                mercury["blob_attachment"]
-                            )
-
-                            if attach_type in [
-                                "MessageFile",
-                                "MessageVideo",
-                                "MessageAudio",
-                            ]:
-                                # TODO: Add more data here for audio files
-                                attachment.size = int(a["fileSize"])
-                            attachments.append(attachment)
-
-                        elif mercury.get("sticker_attachment"):
-                            sticker = graphql_to_sticker(mercury["sticker_attachment"])
-
-                        elif mercury.get("extensible_attachment"):
-                            attachment = graphql_to_extensible_attachment(
-                                mercury["extensible_attachment"]
-                            )
-                            if isinstance(attachment, UnsentMessage):
-                                unsent = True
-                            elif attachment:
-                                attachments.append(attachment)
-
-                except Exception:
-                    log.exception(
-                        "An exception occured while reading attachments: {}".format(
-                            delta["attachments"]
-                        )
-                    )
-
-            if metadata and metadata.get("tags"):
-                emoji_size = get_emojisize_from_tags(metadata.get("tags"))
-
-            message = Message(
-                text=delta.get("body"),
-                mentions=mentions,
-                emoji_size=emoji_size,
-                sticker=sticker,
-                attachments=attachments,
-            )
-            message.uid = mid
-            message.author = author_id
-            message.timestamp = ts
-            # message.reactions = {}
-            message.unsent = unsent
-            thread_id, thread_type = getThreadIdAndThreadType(metadata)
-            self.onMessage(
-                mid=mid,
-                author_id=author_id,
-                message=delta.get("body", ""),
-                message_object=message,
-                thread_id=thread_id,
-                thread_type=thread_type,
-                ts=ts,
-                metadata=metadata,
-                msg=m,
-            )
-
-        # Unknown message type
-        else:
-            self.onUnknownMesssageType(msg=m)
+            # Delivered
 
-    def _parseMessage(self, content):
-        """Get message and author name from content. May contain multiple messages in the content."""
+            # Seen
+            # elif mtype == "m_read_receipt":
+            #
+            #     self.onSeen(m.get('realtime_viewer_fbid'), m.get('reader'), m.get('time'))
 
-        if "lb_info" in content:
-            self.sticky = content["lb_info"]["sticky"]
-            self.pool = content["lb_info"]["pool"]
+            elif mtype in ["jewel_requests_add"]:
+                from_id = m["from"]
+                self.onFriendRequest(from_id=from_id, msg=m)
 
-        if "batches" in content:
-            for batch in content["batches"]:
-                self._parseMessage(batch)
+            # Happens on every login
+            elif mtype == "qprimer":
+                self.onQprimer(ts=m.get("made"), msg=m)
 
-        if "ms" not in content:
-            return
+            # Is sent before any other message
+            elif mtype == "deltaflow":
+                pass
 
-        for m in content["ms"]:
-            mtype = m.get("type")
-            try:
-                # Things that directly change chat
-                if mtype == "delta":
-                    self._parseDelta(m)
-                # Inbox
-                elif mtype == "inbox":
-                    self.onInbox(
-                        unseen=m["unseen"],
-                        unread=m["unread"],
-                        recent_unread=m["recent_unread"],
-                        msg=m,
-                    )
+            # Chat timestamp
+            elif mtype == "chatproxy-presence":
+                buddylist = self.presence.update_from_buddylist(m)
+                self.onChatTimestamp(buddylist=buddylist, msg=m)
 
-                # Typing
-                elif mtype == "typ" or mtype == "ttyp":
-                    author_id = str(m.get("from"))
-                    thread_id = m.get("thread_fbid")
-                    if thread_id:
-                        thread_type = ThreadType.GROUP
-                        thread_id = str(thread_id)
-                    else:
-                        thread_type = ThreadType.USER
-                        if author_id == self.uid:
-                            thread_id = m.get("to")
-                        else:
-                            thread_id = author_id
-                    typing_status = TypingStatus(m.get("st"))
-                    self.onTyping(
-                        author_id=author_id,
-                        status=typing_status,
-                        thread_id=thread_id,
-                        thread_type=thread_type,
-                        msg=m,
-                    )
+            # Buddylist overlay
+            elif mtype == "buddylist_overlay":
+                statuses = self.presence.update_from_overlay(m)
+                self.onBuddylistOverlay(statuses=statuses, msg=m)
 
-                # Delivered
-
-                # Seen
-                # elif mtype == "m_read_receipt":
-                #
-                #     self.onSeen(m.get('realtime_viewer_fbid'), m.get('reader'), m.get('time'))
-
-                elif mtype in ["jewel_requests_add"]:
-                    from_id = m["from"]
-                    self.onFriendRequest(from_id=from_id, msg=m)
-
-                # Happens on every login
-                elif mtype == "qprimer":
-                    self.onQprimer(ts=m.get("made"), msg=m)
-
-                # Is sent before any other message
-                elif mtype == "deltaflow":
-                    pass
-
-                # Chat timestamp
-                elif mtype == "chatproxy-presence":
-                    buddylist = dict()
-                    for _id in m.get("buddyList", {}):
-                        payload = m["buddyList"][_id]
-
-                        last_active = payload.get("lat")
-                        active = payload.get("p") in [2, 3]
-                        in_game = int(_id) in m.get("gamers", {})
-
-                        buddylist[_id] = last_active
-
-                        if self._buddylist.get(_id):
-                            self._buddylist[_id].last_active = last_active
-                            self._buddylist[_id].active = active
-                            self._buddylist[_id].in_game = in_game
-                        else:
-                            self._buddylist[_id] = ActiveStatus(
-                                active=active, last_active=last_active, in_game=in_game
-                            )
-
-                    self.onChatTimestamp(buddylist=buddylist, msg=m)
-
-                # Buddylist overlay
-                elif mtype == "buddylist_overlay":
-                    statuses = dict()
-                    for _id in m.get("overlay", {}):
-                        payload = m["overlay"][_id]
-
-                        last_active = payload.get("la")
-                        active = payload.get("a") in [2, 3]
-                        in_game = (
-                            self._buddylist[_id].in_game
-                            if self._buddylist.get(_id)
-                            else False
-                        )
-
-                        status = ActiveStatus(
-                            active=active, last_active=last_active, in_game=in_game
-                        )
-
-                        if self._buddylist.get(_id):
-                            self._buddylist[_id].last_active = last_active
-                            self._buddylist[_id].active = active
-                            self._buddylist[_id].in_game = in_game
-                        else:
-                            self._buddylist[_id] = status
-
-                        statuses[_id] = status
-
-                    self.onBuddylistOverlay(statuses=statuses, msg=m)
-
-                # Unknown message type
-                else:
-                    self.onUnknownMesssageType(msg=m)
+            # Unknown message type
+            else:
+                self.onUnknownMesssageType(msg=m)
 
-            except Exception as e:
-                self.onMessageError(exception=e, msg=m)
+        except Exception as e:
+            self.onMessageError(exception=e, msg=m)
 
     def startListening(self):
         """
@@ -2148,6 +1899,23 @@ class Client(object):
         :raises: FBchatException if request failed
         """
         self.listening = True
+        if self.checkpoint_store is not None:
+            self._loadCheckpoint()
+        if self.background_forced_fetch and self._forced_fetch_resolver is None:
+            self._forced_fetch_resolver = ForcedFetchResolver(self)
+        if self._ping_scheduler is None:
+            self._ping_scheduler = PingScheduler(self, self.ping_interval)
+            self._ping_scheduler.start()
+
+    def _reconnect(self):
+        """Moves to the healthiest pull channel, and waits as the policy says"""
+        channel = self.req_url.pull_channel
+        delay = self.reconnect_policy.failure(channel)
+        best = self.reconnect_policy.best_channel(channel)
+        if best != channel:
+            self.req_url.change_pull_channel(best)
+        if delay > 0:
+            time.sleep(delay)
 
     def doOneListen(self, markAlive=None):
         """
@@ -2164,22 +1932,28 @@ class Client(object):
         if markAlive is not None:
             self._markAlive = markAlive
         try:
-            if self._markAlive:
+            # When listening was started, the pings are sent by a PingScheduler
+            if self._markAlive and self._ping_scheduler is None:
                 self._ping()
             content = self._pullMessage()
+            self.reconnect_policy.success(self.req_url.pull_channel)
+            if self.pull_recorder is not None:
+                self.pull_recorder.record(content)
             if content:
                 self._parseMessage(content)
+                if self.checkpoint_store is not None:
+                    self._saveCheckpoint()
         except KeyboardInterrupt:
             return False
         except requests.Timeout:
             pass
         except requests.ConnectionError:
-            # If the client has lost their internet connection, keep trying every 30 seconds
-            time.sleep(30)
+            # If the client has lost their internet connection, keep trying with backoff
+            self._reconnect()
         except FBchatFacebookError as e:
             # Fix 502 and 503 pull errors
             if e.request_status_code in [502, 503]:
-                self.req_url.change_pull_channel()
+                self._reconnect()
                 self.startListening()
             else:
                 raise e
@@ -2192,14 +1966,44 @@ class Client(object):
         """Cleans up the variables from startListening"""
         self.listening = False
         self.sticky, self.pool = (None, None)
-
-    def listen(self, markAlive=None):
+        if self._forced_fetch_resolver is not None:
+            self._forced_fetch_resolver.close()
+            self._forced_fetch_resolver = None
+        if self._ping_scheduler is not None:
+            self._ping_scheduler.stop()
+            self._ping_scheduler = None
+
+    def listen(
+        self,
+        markAlive=None,
+        workers=None,
+        queue_size=1000,
+        policy=BufferPolicy.BLOCK,
+        **kwargs
+    ):
         """
         Initializes and runs the listening loop continually
 
         :param markAlive: Whether this should ping the Facebook server each time the loop runs
+        :param workers: If set, events are handled by this many threads while pulling continues. See :class:`ThreadedListener`
+        :param queue_size: With `workers`, max. number of events waiting for each worker
+        :param policy: With `workers`, what to do with an event when its worker's queue is full
+        :param kwargs: With `workers`, passed to each worker's :class:`EventBuffer`, e.g. `droppable`
         :type markAlive: bool
+        :type workers: int
+        :type queue_size: int
+        :type policy: BufferPolicy
         """
+        if workers:
+            listener = ThreadedListener(
+                self, workers=workers, queue_size=queue_size, policy=policy, **kwargs
+            )
+            return listener.listen(markAlive)
+        if kwargs:
+            raise FBchatUserError(
+                "{} can only be given with `workers`".format(", ".join(kwargs))
+            )
+
         if markAlive is not None:
             self.setActiveStatus(markAlive)
 
@@ -2211,6 +2015,42 @@ class Client(object):
 
         self.stopListening()
 
+    def events(self, types=None, buffer_size=1000, keep_raw=False, markAlive=None):
+        """
+        Listens, and yields the events received as :class:`Event` objects,
+        e.g. :class:`MessageEvent`. Listening stops when the loop is exited::
+
+            for event in client.events(types=[MessageEvent, TypingEvent]):
+                print(event.thread_id, event)
+
+        The event methods are still called for the events
+
+        :param types: :class:`Event` classes or names of event methods to yield. All events are yielded by default
+        :param buffer_size: Max. number of events waiting to be yielded. When there are more, the oldest are dropped
+        :param keep_raw: Whether the events keep the pulled json in `msg` and `metadata`
+        :param markAlive: Whether to show the client as active while listening
+        :type buffer_size: int
+        :type keep_raw: bool
+        :type markAlive: bool
+        :rtype: typing.Iterable[Event]
+        """
+        stream = EventStream(self, types, buffer_size, keep_raw)
+        if markAlive is not None:
+            self.setActiveStatus(markAlive)
+
+        self.startListening()
+        self.onListening()
+        try:
+            while True:
+                event = stream.pop()
+                if event is not None:
+                    yield event
+                elif not (self.listening and self.doOneListen()):
+                    break
+        finally:
+            stream.close()
+            self.stopListening()
+
     def setActiveStatus(self, markAlive):
         """
         Changes client active status while listening
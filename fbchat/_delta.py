@@ -0,0 +1,771 @@
+# -*- coding: UTF-8 -*-
+
+from __future__ import unicode_literals
+
+from ._util import *
+from .models import *
+from .graphql import *
+
+
+class DeltaRegistry(object):
+    """Maps the `class` and `type` of the deltas received while listening to parsers
+
+    A parser is called with the client, the pulled message and its delta, and calls
+    the client's event methods. Register your own to handle deltas fbchat doesn't
+    know about, or to replace the built-in ones::
+
+        def parse_custom(client, m, delta):
+            client.onCustom(data=delta["untypedData"], msg=m)
+
+        client.delta_parsers.register(parse_custom, delta_type="custom_type", handlers=["onCustom"])
+
+    A delta is parsed by the parser registered for its class and type, or else the one
+    for just its class, or else the one for just its type.
+    """
+
+    def __init__(self, parsers=None):
+        self._parsers = dict(parsers or {})
+
+    def register(self, parser, delta_class=None, delta_type=None, handlers=None):
+        """Registers a parser, replacing the one registered for the same class and type
+
+        :param parser: Function taking the client, the pulled message, and the delta
+        :param delta_class: The `class` of the deltas to parse, or `None` to match any
+        :param delta_type: The `type` of the deltas to parse, or `None` to match any
+        :param handlers: Names of the event methods the parser calls. If given, the delta is skipped when none of them are handled, see :any:`Client.skip_unhandled_events`
+        """
+        if delta_class is None and delta_type is None:
+            raise FBchatUserError("Either `delta_class` or `delta_type` must be given")
+        handlers = frozenset(handlers) if handlers is not None else None
+        self._parsers[(delta_class, delta_type)] = (parser, handlers)
+
+    def unregister(self, delta_class=None, delta_type=None):
+        """Removes the parser registered for the class and type"""
+        self._parsers.pop((delta_class, delta_type), None)
+
+    def _lookup(self, delta):
+        delta_class = delta.get("class")
+        delta_type = delta.get("type")
+        parsers = self._parsers
+        return (
+            parsers.get((delta_class, delta_type))
+            or parsers.get((delta_class, None))
+            or parsers.get((None, delta_type))
+        )
+
+    def lookup(self, delta):
+        """
+        :return: The parser of the delta, or `None`
+        """
+        entry = self._lookup(delta)
+        return None if entry is None else entry[0]
+
+    def handlers(self):
+        """
+        :return: The names of all event methods called by the registered parsers
+        :rtype: set
+        """
+        return set().union(*(h for _, h in self._parsers.values() if h is not None))
+
+    def copy(self):
+        return DeltaRegistry(self._parsers)
+
+
+def get_thread_id_and_thread_type(msg_metadata):
+    """Returns a tuple consisting of thread ID and thread type"""
+    id_thread = None
+    type_thread = None
+    if "threadFbId" in msg_metadata["threadKey"]:
+        id_thread = str(msg_metadata["threadKey"]["threadFbId"])
+        type_thread = ThreadType.GROUP
+    elif "otherUserFbId" in msg_metadata["threadKey"]:
+        id_thread = str(msg_metadata["threadKey"]["otherUserFbId"])
+        type_thread = ThreadType.USER
+    return id_thread, type_thread
+
+
+def get_metadata(delta):
+    """Returns the metadata, the message ID, the author ID and the timestamp of a delta"""
+    metadata = delta["messageMetadata"]
+    return (
+        metadata,
+        metadata["messageId"],
+        str(metadata["actorFbId"]),
+        int(metadata.get("timestamp")),
+    )
+
+
+def parse_people_added(client, m, delta):
+    metadata, mid, author_id, ts = get_metadata(delta)
+    added_ids = [str(x["userFbId"]) for x in delta["addedParticipants"]]
+    thread_id = str(metadata["threadKey"]["threadFbId"])
+    client._invalidateEntities(thread_id)
+    client.onPeopleAdded(
+        mid=mid,
+        added_ids=added_ids,
+        author_id=author_id,
+        thread_id=thread_id,
+        ts=ts,
+        msg=m,
+    )
+
+
+def parse_person_removed(client, m, delta):
+    metadata, mid, author_id, ts = get_metadata(delta)
+    removed_id = str(delta["leftParticipantFbId"])
+    thread_id = str(metadata["threadKey"]["threadFbId"])
+    client._invalidateEntities(thread_id)
+    client.onPersonRemoved(
+        mid=mid,
+        removed_id=removed_id,
+        author_id=author_id,
+        thread_id=thread_id,
+        ts=ts,
+        msg=m,
+    )
+
+
+def parse_color_change(client, m, delta):
+    metadata, mid, author_id, ts = get_metadata(delta)
+    new_color = graphql_color_to_enum(delta["untypedData"]["theme_color"])
+    thread_id, thread_type = get_thread_id_and_thread_type(metadata)
+    client._patchEntity(thread_id, color=new_color)
+    client.onColorChange(
+        mid=mid,
+        author_id=author_id,
+        new_color=new_color,
+        thread_id=thread_id,
+        thread_type=thread_type,
+        ts=ts,
+        metadata=metadata,
+        msg=m,
+    )
+
+
+def parse_emoji_change(client, m, delta):
+    metadata, mid, author_id, ts = get_metadata(delta)
+    new_emoji = delta["untypedData"]["thread_icon"]
+    thread_id, thread_type = get_thread_id_and_thread_type(metadata)
+    client._patchEntity(thread_id, emoji=new_emoji)
+    client.onEmojiChange(
+        mid=mid,
+        author_id=author_id,
+        new_emoji=new_emoji,
+        thread_id=thread_id,
+        thread_type=thread_type,
+        ts=ts,
+        metadata=metadata,
+        msg=m,
+    )
+
+
+def parse_title_change(client, m, delta):
+    metadata, mid, author_id, ts = get_metadata(delta)
+    new_title = delta["name"]
+    thread_id, thread_type = get_thread_id_and_thread_type(metadata)
+    client._patchEntity(thread_id, name=new_title)
+    client._updateInbox("rename", thread_id, new_title)
+    client.onTitleChange(
+        mid=mid,
+        author_id=author_id,
+        new_title=new_title,
+        thread_id=thread_id,
+        thread_type=thread_type,
+        ts=ts,
+        metadata=metadata,
+        msg=m,
+    )
+
+
+def parse_forced_fetch(client, m, delta):
+    mid = delta.get("messageId")
+    if mid is None:
+        client.onUnknownMesssageType(msg=m)
+        return
+    thread_id = str(delta["threadKey"]["threadFbId"])
+
+    def callback(fetch_info):
+        parse_forced_fetch_info(client, m, thread_id, mid, fetch_info)
+
+    client._resolveForcedFetch(thread_id, mid, callback, m)
+
+
+def parse_forced_fetch_info(client, m, thread_id, mid, fetch_info):
+    fetch_data = fetch_info["message"]
+    author_id = fetch_data["message_sender"]["id"]
+    ts = fetch_data["timestamp_precise"]
+    if fetch_data.get("__typename") == "ThreadImageMessage":
+        # Thread image change
+        image_metadata = fetch_data.get("image_with_metadata")
+        image_id = (
+            int(image_metadata["legacy_attachment_id"]) if image_metadata else None
+        )
+        client._invalidateEntities(thread_id)
+        client.onImageChange(
+            mid=mid,
+            author_id=author_id,
+            new_image=image_id,
+            thread_id=thread_id,
+            thread_type=ThreadType.GROUP,
+            ts=ts,
+            msg=m,
+        )
+
+
+def parse_nickname_change(client, m, delta):
+    metadata, mid, author_id, ts = get_metadata(delta)
+    changed_for = str(delta["untypedData"]["participant_id"])
+    new_nickname = delta["untypedData"]["nickname"]
+    thread_id, thread_type = get_thread_id_and_thread_type(metadata)
+    client._invalidateEntities(thread_id)
+    client.onNicknameChange(
+        mid=mid,
+        author_id=author_id,
+        changed_for=changed_for,
+        new_nickname=new_nickname,
+        thread_id=thread_id,
+        thread_type=thread_type,
+        ts=ts,
+        metadata=metadata,
+        msg=m,
+    )
+
+
+def parse_admins_change(client, m, delta):
+    metadata, mid, author_id, ts = get_metadata(delta)
+    thread_id, thread_type = get_thread_id_and_thread_type(metadata)
+    target_id = delta["untypedData"]["TARGET_ID"]
+    admin_event = delta["untypedData"]["ADMIN_EVENT"]
+    client._invalidateEntities(thread_id)
+    if admin_event == "add_admin":
+        client.onAdminAdded(
+            mid=mid,
+            added_id=target_id,
+            author_id=author_id,
+            thread_id=thread_id,
+            thread_type=thread_type,
+            ts=ts,
+            msg=m,
+        )
+    elif admin_event == "remove_admin":
+        client.onAdminRemoved(
+            mid=mid,
+            removed_id=target_id,
+            author_id=author_id,
+            thread_id=thread_id,
+            thread_type=thread_type,
+            ts=ts,
+            msg=m,
+        )
+
+
+def parse_approval_mode_change(client, m, delta):
+    metadata, mid, author_id, ts = get_metadata(delta)
+    thread_id, thread_type = get_thread_id_and_thread_type(metadata)
+    approval_mode = bool(int(delta["untypedData"]["APPROVAL_MODE"]))
+    client._patchEntity(thread_id, approval_mode=approval_mode)
+    client.onApprovalModeChange(
+        mid=mid,
+        approval_mode=approval_mode,
+        author_id=author_id,
+        thread_id=thread_id,
+        thread_type=thread_type,
+        ts=ts,
+        msg=m,
+    )
+
+
+def parse_delivery_receipt(client, m, delta):
+    message_ids = delta["messageIds"]
+    delivered_for = str(delta.get("actorFbId") or delta["threadKey"]["otherUserFbId"])
+    ts = int(delta["deliveredWatermarkTimestampMs"])
+    thread_id, thread_type = get_thread_id_and_thread_type(delta)
+    client.onMessageDelivered(
+        msg_ids=message_ids,
+        delivered_for=delivered_for,
+        thread_id=thread_id,
+        thread_type=thread_type,
+        ts=ts,
+        metadata=delta.get("messageMetadata"),
+        msg=m,
+    )
+
+
+def parse_read_receipt(client, m, delta):
+    seen_by = str(delta.get("actorFbId") or delta["threadKey"]["otherUserFbId"])
+    seen_ts = int(delta["actionTimestampMs"])
+    delivered_ts = int(delta["watermarkTimestampMs"])
+    thread_id, thread_type = get_thread_id_and_thread_type(delta)
+    client.onMessageSeen(
+        seen_by=seen_by,
+        thread_id=thread_id,
+        thread_type=thread_type,
+        seen_ts=seen_ts,
+        ts=delivered_ts,
+        metadata=delta.get("messageMetadata"),
+        msg=m,
+    )
+
+
+def parse_mark_read(client, m, delta):
+    seen_ts = int(delta.get("actionTimestampMs") or delta.get("actionTimestamp"))
+    delivered_ts = int(
+        delta.get("watermarkTimestampMs") or delta.get("watermarkTimestamp")
+    )
+
+    threads = []
+    if "folders" not in delta:
+        threads = [
+            get_thread_id_and_thread_type({"threadKey": thr})
+            for thr in delta.get("threadKeys")
+        ]
+    # With `folders`, every thread in the folders was marked
+    thread_ids = None if "folders" in delta else [thread_id for thread_id, _ in threads]
+    client._updateInbox("mark_read", thread_ids)
+
+    client.onMarkedSeen(
+        threads=threads, seen_ts=seen_ts, ts=delivered_ts, metadata=delta, msg=m
+    )
+
+
+def parse_game_played(client, m, delta):
+    metadata, mid, author_id, ts = get_metadata(delta)
+    game_id = delta["untypedData"]["game_id"]
+    game_name = delta["untypedData"]["game_name"]
+    score = delta["untypedData"].get("score")
+    if score is not None:
+        score = int(score)
+    leaderboard = delta["untypedData"].get("leaderboard")
+    if leaderboard is not None:
+        leaderboard = json.loads(leaderboard)["scores"]
+    thread_id, thread_type = get_thread_id_and_thread_type(metadata)
+    client.onGamePlayed(
+        mid=mid,
+        author_id=author_id,
+        game_id=game_id,
+        game_name=game_name,
+        score=score,
+        leaderboard=leaderboard,
+        thread_id=thread_id,
+        thread_type=thread_type,
+        ts=ts,
+        metadata=metadata,
+        msg=m,
+    )
+
+
+def parse_call_log(client, m, delta):
+    metadata, mid, author_id, ts = get_metadata(delta)
+    thread_id, thread_type = get_thread_id_and_thread_type(metadata)
+    call_status = delta["untypedData"]["event"]
+    call_duration = int(delta["untypedData"]["call_duration"])
+    is_video_call = bool(int(delta["untypedData"]["is_video_call"]))
+    if call_status == "call_started":
+        client.onCallStarted(
+            mid=mid,
+            caller_id=author_id,
+            is_video_call=is_video_call,
+            thread_id=thread_id,
+            thread_type=thread_type,
+            ts=ts,
+            metadata=metadata,
+            msg=m,
+        )
+    elif call_status == "call_ended":
+        client.onCallEnded(
+            mid=mid,
+            caller_id=author_id,
+            is_video_call=is_video_call,
+            call_duration=call_duration,
+            thread_id=thread_id,
+            thread_type=thread_type,
+            ts=ts,
+            metadata=metadata,
+            msg=m,
+        )
+
+
+def parse_user_joined_call(client, m, delta):
+    metadata, mid, author_id, ts = get_metadata(delta)
+    thread_id, thread_type = get_thread_id_and_thread_type(metadata)
+    is_video_call = bool(int(delta["untypedData"]["group_call_type"]))
+    client.onUserJoinedCall(
+        mid=mid,
+        joined_id=author_id,
+        is_video_call=is_video_call,
+        thread_id=thread_id,
+        thread_type=thread_type,
+        ts=ts,
+        metadata=metadata,
+        msg=m,
+    )
+
+
+def parse_poll(client, m, delta):
+    metadata, mid, author_id, ts = get_metadata(delta)
+    thread_id, thread_type = get_thread_id_and_thread_type(metadata)
+    event_type = delta["untypedData"]["event_type"]
+    poll_json = json.loads(delta["untypedData"]["question_json"])
+    poll = graphql_to_poll(poll_json)
+    if event_type == "question_creation":
+        # User created group poll
+        client.onPollCreated(
+            mid=mid,
+            poll=poll,
+            author_id=author_id,
+            thread_id=thread_id,
+            thread_type=thread_type,
+            ts=ts,
+            metadata=metadata,
+            msg=m,
+        )
+    elif event_type == "update_vote":
+        # User voted on group poll
+        added_options = json.loads(delta["untypedData"]["added_option_ids"])
+        removed_options = json.loads(delta["untypedData"]["removed_option_ids"])
+        client.onPollVoted(
+            mid=mid,
+            poll=poll,
+            added_options=added_options,
+            removed_options=removed_options,
+            author_id=author_id,
+            thread_id=thread_id,
+            thread_type=thread_type,
+            ts=ts,
+            metadata=metadata,
+            msg=m,
+        )
+
+
+def parse_plan_created(client, m, delta):
+    metadata, mid, author_id, ts = get_metadata(delta)
+    thread_id, thread_type = get_thread_id_and_thread_type(metadata)
+    plan = graphql_to_plan(delta["untypedData"])
+    client.onPlanCreated(
+        mid=mid,
+        plan=plan,
+        author_id=author_id,
+        thread_id=thread_id,
+        thread_type=thread_type,
+        ts=ts,
+        metadata=metadata,
+        msg=m,
+    )
+
+
+def parse_plan_ended(client, m, delta):
+    metadata, mid, author_id, ts = get_metadata(delta)
+    thread_id, thread_type = get_thread_id_and_thread_type(metadata)
+    plan = graphql_to_plan(delta["untypedData"])
+    client.onPlanEnded(
+        mid=mid,
+        plan=plan,
+        thread_id=thread_id,
+        thread_type=thread_type,
+        ts=ts,
+        metadata=metadata,
+        msg=m,
+    )
+
+
+def parse_plan_edited(client, m, delta):
+    metadata, mid, author_id, ts = get_metadata(delta)
+    thread_id, thread_type = get_thread_id_and_thread_type(metadata)
+    plan = graphql_to_plan(delta["untypedData"])
+    client.onPlanEdited(
+        mid=mid,
+        plan=plan,
+        author_id=author_id,
+        thread_id=thread_id,
+        thread_type=thread_type,
+        ts=ts,
+        metadata=metadata,
+        msg=m,
+    )
+
+
+def parse_plan_deleted(client, m, delta):
+    metadata, mid, author_id, ts = get_metadata(delta)
+    thread_id, thread_type = get_thread_id_and_thread_type(metadata)
+    plan = graphql_to_plan(delta["untypedData"])
+    client.onPlanDeleted(
+        mid=mid,
+        plan=plan,
+        author_id=author_id,
+        thread_id=thread_id,
+        thread_type=thread_type,
+        ts=ts,
+        metadata=metadata,
+        msg=m,
+    )
+
+
+def parse_plan_participation(client, m, delta):
+    metadata, mid, author_id, ts = get_metadata(delta)
+    thread_id, thread_type = get_thread_id_and_thread_type(metadata)
+    plan = graphql_to_plan(delta["untypedData"])
+    take_part = delta["untypedData"]["guest_status"] == "GOING"
+    client.onPlanParticipation(
+        mid=mid,
+        plan=plan,
+        take_part=take_part,
+        author_id=author_id,
+        thread_id=thread_id,
+        thread_type=thread_type,
+        ts=ts,
+        metadata=metadata,
+        msg=m,
+    )
+
+
+def parse_client_payload(client, m, delta):
+    payload = json.loads("".join(chr(z) for z in delta["payload"]))
+    ts = m.get("ofd_ts")
+    for d in payload.get("deltas", []):
+
+        # Message reaction
+        if d.get("deltaMessageReaction"):
+            i = d["deltaMessageReaction"]
+            thread_id, thread_type = get_thread_id_and_thread_type(i)
+            mid = i["messageId"]
+            author_id = str(i["userId"])
+            reaction = MessageReaction(i["reaction"]) if i.get("reaction") else None
+            add_reaction = not bool(i["action"])
+            if add_reaction:
+                client.onReactionAdded(
+                    mid=mid,
+                    reaction=reaction,
+                    author_id=author_id,
+                    thread_id=thread_id,
+                    thread_type=thread_type,
+                    ts=ts,
+                    msg=m,
+                )
+            else:
+                client.onReactionRemoved(
+                    mid=mid,
+                    author_id=author_id,
+                    thread_id=thread_id,
+                    thread_type=thread_type,
+                    ts=ts,
+                    msg=m,
+                )
+
+        # Viewer status change
+        elif d.get("deltaChangeViewerStatus"):
+            i = d["deltaChangeViewerStatus"]
+            thread_id, thread_type = get_thread_id_and_thread_type(i)
+            author_id = str(i["actorFbid"])
+            reason = i["reason"]
+            can_reply = i["canViewerReply"]
+            if reason == 2:
+                if can_reply:
+                    client.onUnblock(
+                        author_id=author_id,
+                        thread_id=thread_id,
+                        thread_type=thread_type,
+                        ts=ts,
+                        msg=m,
+                    )
+                else:
+                    client.onBlock(
+                        author_id=author_id,
+                        thread_id=thread_id,
+                        thread_type=thread_type,
+                        ts=ts,
+                        msg=m,
+                    )
+
+        # Live location info
+        elif d.get("liveLocationData"):
+            i = d["liveLocationData"]
+            thread_id, thread_type = get_thread_id_and_thread_type(i)
+            for l in i["messageLiveLocations"]:
+                mid = l["messageId"]
+                author_id = str(l["senderId"])
+                location = graphql_to_live_location(l)
+                client.onLiveLocation(
+                    mid=mid,
+                    location=location,
+                    author_id=author_id,
+                    thread_id=thread_id,
+                    thread_type=thread_type,
+                    ts=ts,
+                    msg=m,
+                )
+
+        # Message deletion
+        elif d.get("deltaRecallMessageData"):
+            i = d["deltaRecallMessageData"]
+            thread_id, thread_type = get_thread_id_and_thread_type(i)
+            mid = i["messageID"]
+            ts = i["deletionTimestamp"]
+            author_id = str(i["senderID"])
+            client.onMessageUnsent(
+                mid=mid,
+                author_id=author_id,
+                thread_id=thread_id,
+                thread_type=thread_type,
+                ts=ts,
+                msg=m,
+            )
+
+
+def parse_new_message(client, m, delta):
+    metadata, mid, author_id, ts = get_metadata(delta)
+    mentions = []
+    if delta.get("data") and delta["data"].get("prng"):
+        try:
+            mentions = [
+                Mention(
+                    str(mention.get("i")),
+                    offset=mention.get("o"),
+                    length=mention.get("l"),
+                )
+                for mention in parse_json(delta["data"]["prng"])
+            ]
+        except Exception:
+            log.exception("An exception occured while reading attachments")
+
+    sticker = None
+    attachments = []
+    unsent = False
+    if delta.get("attachments"):
+        try:
+            for a in delta["attachments"]:
+                mercury = a["mercury"]
+                if mercury.get("blob_attachment"):
+                    image_metadata = a.get("imageMetadata", {})
+                    attach_type = mercury["blob_attachment"]["__typename"]
+                    attachment = graphql_to_attachment(mercury["blob_attachment"])
+
+                    if attach_type in ["MessageFile", "MessageVideo", "MessageAudio"]:
+                        # TODO: Add more data here for audio files
+                        attachment.size = int(a["fileSize"])
+                    attachments.append(attachment)
+
+                elif mercury.get("sticker_attachment"):
+                    sticker = graphql_to_sticker(mercury["sticker_attachment"])
+
+                elif mercury.get("extensible_attachment"):
+                    attachment = graphql_to_extensible_attachment(
+                        mercury["extensible_attachment"]
+                    )
+                    if isinstance(attachment, UnsentMessage):
+                        unsent = True
+                    elif attachment:
+                        attachments.append(attachment)
+
+        except Exception:
+            log.exception(
+                "An exception occured while reading attachments: {}".format(
+                    delta["attachments"]
+                )
+            )
+
+    emoji_size = None
+    if metadata.get("tags"):
+        emoji_size = get_emojisize_from_tags(metadata.get("tags"))
+
+    message = Message(
+        text=delta.get("body"),
+        mentions=mentions,
+        emoji_size=emoji_size,
+        sticker=sticker,
+        attachments=attachments,
+    )
+    message.uid = mid
+    message.author = author_id
+    message.timestamp = ts
+    # message.reactions = {}
+    message.unsent = unsent
+    thread_id, thread_type = get_thread_id_and_thread_type(metadata)
+    client._updateInbox(
+        "message_received", thread_id, thread_type, ts, author_id != client.uid
+    )
+    client.onMessage(
+        mid=mid,
+        author_id=author_id,
+        message=delta.get("body", ""),
+        message_object=message,
+        thread_id=thread_id,
+        thread_type=thread_type,
+        ts=ts,
+        metadata=metadata,
+        msg=m,
+    )
+
+
+#: The parsers of the deltas fbchat knows about
+DEFAULT_DELTA_PARSERS = DeltaRegistry()
+for _key, _parser, _handlers in [
+    (("NewMessage", None), parse_new_message, ["onMessage"]),
+    (("ParticipantsAddedToGroupThread", None), parse_people_added, ["onPeopleAdded"]),
+    (("ParticipantLeftGroupThread", None), parse_person_removed, ["onPersonRemoved"]),
+    (("ThreadName", None), parse_title_change, ["onTitleChange"]),
+    (("ForcedFetch", None), parse_forced_fetch, ["onImageChange"]),
+    (("DeliveryReceipt", None), parse_delivery_receipt, ["onMessageDelivered"]),
+    (("ReadReceipt", None), parse_read_receipt, ["onMessageSeen"]),
+    (("MarkRead", None), parse_mark_read, ["onMarkedSeen"]),
+    (
+        ("ClientPayload", None),
+        parse_client_payload,
+        [
+            "onReactionAdded",
+            "onReactionRemoved",
+            "onBlock",
+            "onUnblock",
+            "onLiveLocation",
+            "onMessageUnsent",
+        ],
+    ),
+    ((None, "change_thread_theme"), parse_color_change, ["onColorChange"]),
+    ((None, "change_thread_icon"), parse_emoji_change, ["onEmojiChange"]),
+    ((None, "change_thread_nickname"), parse_nickname_change, ["onNicknameChange"]),
+    (
+        (None, "change_thread_admins"),
+        parse_admins_change,
+        ["onAdminAdded", "onAdminRemoved"],
+    ),
+    (
+        (None, "change_thread_approval_mode"),
+        parse_approval_mode_change,
+        ["onApprovalModeChange"],
+    ),
+    ((None, "instant_game_update"), parse_game_played, ["onGamePlayed"]),
+    ((None, "rtc_call_log"), parse_call_log, ["onCallStarted", "onCallEnded"]),
+    (
+        (None, "participant_joined_group_call"),
+        parse_user_joined_call,
+        ["onUserJoinedCall"],
+    ),
+    ((None, "group_poll"), parse_poll, ["onPollCreated", "onPollVoted"]),
+    ((None, "lightweight_event_create"), parse_plan_created, ["onPlanCreated"]),
+    ((None, "lightweight_event_notify"), parse_plan_ended, ["onPlanEnded"]),
+    ((None, "lightweight_event_update"), parse_plan_edited, ["onPlanEdited"]),
+    ((None, "lightweight_event_delete"), parse_plan_deleted, ["onPlanDeleted"]),
+    (
+        (None, "lightweight_event_rsvp"),
+        parse_plan_participation,
+        ["onPlanParticipation"],
+    ),
+]:
+    DEFAULT_DELTA_PARSERS.register(_parser, *_key, handlers=_handlers)
+
+#: Parsers which keep :any:`Client.entity_cache` up to date, so they run even when their events aren't handled
+CACHE_PARSERS = frozenset(
+    [
+        parse_people_added,
+        parse_person_removed,
+        parse_title_change,
+        parse_color_change,
+        parse_emoji_change,
+        parse_nickname_change,
+        parse_admins_change,
+        parse_approval_mode_change,
+        parse_forced_fetch,
+    ]
+)
+
+#: Parsers which keep :any:`Client.inbox` up to date, so they run even when their events aren't handled
+INBOX_PARSERS = frozenset([parse_new_message, parse_title_change, parse_mark_read])
@@ -0,0 +1,223 @@
+# -*- coding: UTF-8 -*-
+
+from __future__ import unicode_literals
+
+import functools
+import threading
+from collections import deque
+
+from ._util import *
+
+#: Event methods that aren't called for events received while listening
+_NOT_LISTEN_EVENTS = frozenset(
+    [
+        "onLoggingIn",
+        "on2FACode",
+        "onLoggedIn",
+        "onListening",
+        "onListenError",
+        "onMessageError",
+        "onUnknownMesssageType",
+    ]
+)
+
+#: Arguments of the event methods that reference the received json
+_RAW_ARGUMENTS = frozenset(["msg", "metadata"])
+
+
+class Event(object):
+    """An event received while listening, as yielded by :func:`Client.events`
+
+    `name` is the event method that handles it, e.g. `"onPollCreated"`. The other
+    arguments of the method are available as attributes, or in `data`.
+    """
+
+    __slots__ = ("name", "data", "msg")
+
+    def __init__(self, name, kwargs, msg=None):
+        self.name = name
+        #: The pulled json, if :func:`Client.events` was called with `keep_raw`
+        self.msg = msg
+        for attr in self._fields():
+            setattr(self, attr, kwargs.pop(attr, None))
+        #: The arguments of the event method that aren't attributes
+        self.data = kwargs
+
+    @classmethod
+    def _fields(cls):
+        return [
+            attr
+            for klass in cls.__mro__[:-2]
+            for attr in klass.__dict__.get("__slots__", ())
+        ]
+
+    def __getattr__(self, attr):
+        # Only called for attributes that aren't slots
+        try:
+            return object.__getattribute__(self, "data")[attr]
+        except (KeyError, AttributeError):
+            raise AttributeError(attr)
+
+    def __repr__(self):
+        fields = ", ".join(
+            "{}={!r}".format(attr, getattr(self, attr)) for attr in self._fields()
+        )
+        return "<{} {}: {}>".format(type(self).__name__, self.name, fields or self.data)
+
+
+class ThreadEvent(Event):
+    """An event in a thread"""
+
+    __slots__ = ("thread_id", "thread_type", "ts")
+
+
+class MessageEvent(ThreadEvent):
+    """Somebody sent a message. See :func:`Client.onMessage`"""
+
+    __slots__ = ("mid", "author_id", "message_object")
+
+
+class MessageUnsentEvent(ThreadEvent):
+    """Somebody unsent a message. See :func:`Client.onMessageUnsent`"""
+
+    __slots__ = ("mid", "author_id")
+
+
+class ReactionEvent(ThreadEvent):
+    """Somebody reacted to a message, or removed their reaction
+
+    See :func:`Client.onReactionAdded` and :func:`Client.onReactionRemoved`.
+    `reaction` is `None` when the reaction was removed.
+    """
+
+    __slots__ = ("mid", "author_id", "reaction")
+
+
+class TypingEvent(ThreadEvent):
+    """Somebody started or stopped typing. See :func:`Client.onTyping`"""
+
+    __slots__ = ("author_id", "status")
+
+
+class ReadReceiptEvent(ThreadEvent):
+    """Somebody saw the messages in a thread. See :func:`Client.onMessageSeen`"""
+
+    __slots__ = ("seen_by", "seen_ts")
+
+
+class DeliveryReceiptEvent(ThreadEvent):
+    """Messages were delivered. See :func:`Client.onMessageDelivered`"""
+
+    __slots__ = ("msg_ids", "delivered_for")
+
+
+#: The event classes of the event methods, for the events that don't use :class:`Event`
+EVENT_CLASSES = {
+    "onMessage": MessageEvent,
+    "onMessageUnsent": MessageUnsentEvent,
+    "onReactionAdded": ReactionEvent,
+    "onReactionRemoved": ReactionEvent,
+    "onTyping": TypingEvent,
+    "onMessageSeen": ReadReceiptEvent,
+    "onMessageDelivered": DeliveryReceiptEvent,
+}
+
+
+def listen_event_names(client):
+    """The names of the event methods called for events received while listening"""
+    return sorted(
+        name
+        for name in dir(type(client))
+        if name.startswith("on")
+        and name not in _NOT_LISTEN_EVENTS
+        and callable(getattr(type(client), name))
+    )
+
+
+def make_event(name, kwargs, keep_raw=False):
+    """Creates the event object of a call of an event method"""
+    kwargs = dict(kwargs)
+    msg = kwargs.get("msg") if keep_raw else None
+    for attr in _RAW_ARGUMENTS:
+        if not keep_raw or attr == "msg":
+            kwargs.pop(attr, None)
+    # `message` is deprecated, and the same as `message_object.text`
+    if name == "onMessage":
+        kwargs.pop("message", None)
+    return EVENT_CLASSES.get(name, Event)(name, kwargs, msg=msg)
+
+
+class EventStream(object):
+    """Collects the events of a client as :class:`Event` objects
+
+    The client's event methods are wrapped while the stream is open, so events are
+    still handled by them as well. Used by :func:`Client.events`.
+    """
+
+    def __init__(self, client, types=None, buffer_size=1000, keep_raw=False):
+        """
+        :param client: The client to collect the events of
+        :param types: :class:`Event` classes or names of event methods to collect. All events are collected by default
+        :param buffer_size: Max. number of collected events. When it's full, the oldest events are dropped
+        :param keep_raw: Whether the events keep the pulled json in `msg`
+        """
+        self.client = client
+        self.keep_raw = keep_raw
+        #: Number of events dropped because the buffer was full
+        self.dropped = 0
+        self._buffer = deque(maxlen=buffer_size)
+        self._lock = threading.Lock()
+        self._names = [
+            name
+            for name in listen_event_names(client)
+            if types is None or self._matches(name, tuple(types))
+        ]
+        self._overridden = dict(
+            (name, vars(client)[name]) for name in self._names if name in vars(client)
+        )
+        for name in self._names:
+            setattr(client, name, self._wrap(name, getattr(client, name)))
+        client.subscribe(*self._names)
+
+    @staticmethod
+    def _matches(name, types):
+        klass = EVENT_CLASSES.get(name, Event)
+        return name in types or any(
+            isinstance(t, type) and issubclass(klass, t) for t in types
+        )
+
+    def _wrap(self, name, method):
+        @functools.wraps(method)
+        def collect(*args, **kwargs):
+            self.put(make_event(name, kwargs, self.keep_raw))
+            return method(*args, **kwargs)
+
+        return collect
+
+    def put(self, event):
+        with self._lock:
+            if len(self._buffer) == self._buffer.maxlen:
+                self.dropped += 1
+            self._buffer.append(event)
+
+    def pop(self):
+        """
+        :return: The oldest collected event, or `None`
+        :rtype: Event
+        """
+        with self._lock:
+            return self._buffer.popleft() if self._buffer else None
+
+    def __len__(self):
+        return len(self._buffer)
+
+    def close(self):
+        """Restores the event methods of the client"""
+        client = self.client
+        for name in self._names:
+            if name in self._overridden:
+                setattr(client, name, self._overridden[name])
+            else:
+                delattr(client, name)
+        client.unsubscribe(*self._names)
+        self._names = []
@@ -30,3 +30,14 @@ class FBchatFacebookError(FBchatException):
 
 class FBchatUserError(FBchatException):
     """Thrown by fbchat when wrong values are entered"""
+
+
+class FBchatRateLimitError(FBchatException):
+    """Thrown by fbchat when a :class:`RateLimiter` doesn't allow a request to be sent"""
+
+    #: The url of the request
+    url = None
+
+    def __init__(self, message, url=None):
+        super(FBchatRateLimitError, self).__init__(message)
+        self.url = url
@@ -0,0 +1,103 @@
+# -*- coding: UTF-8 -*-
+
+from __future__ import unicode_literals
+
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from ._util import *
+from ._batch import GraphQLBatcher
+from ._fetch import iter_message_pages
+from ._ratelimit import TokenBucket
+import time
+
+
+class HistoryExporter(object):
+    """Fetches the history of many threads concurrently
+
+    The pages of each thread are handed to a sink in order, from newest to oldest::
+
+        def sink(thread_id, messages):
+            for message in messages:
+                archive.write(thread_id, message)
+
+        exporter = HistoryExporter(client, workers=8, max_rate=5)
+        exporter.export(sink)
+
+    While exporting, the pages of different threads requested at the same time are
+    sent together, in one GraphQL batch request, see :class:`GraphQLBatcher`. The
+    client's :any:`Client.graphql_batcher` is used if set, otherwise the exporter
+    uses its own, so other requests of the client aren't batched.
+    """
+
+    def __init__(self, client, workers=8, max_rate=None, page_size=100, after=None):
+        """
+        :param client: The client to fetch the messages with
+        :param workers: Number of threads fetched at the same time
+        :param max_rate: Max. number of pages fetched per second, for all threads combined (default unlimited)
+        :param page_size: Number of messages fetched per page
+        :param after: Fetch only messages after this epoch (in ms) (default all messages)
+        :type workers: int
+        :type max_rate: float
+        :type page_size: int
+        """
+        self.client = client
+        self.workers = workers
+        self.page_size = page_size
+        self.after = after
+        self.max_rate = max_rate
+        self._sink_lock = threading.Lock()
+
+    @property
+    def max_rate(self):
+        """Max. number of pages fetched per second"""
+        return None if self._bucket is None else self._bucket.rate
+
+    @max_rate.setter
+    def max_rate(self, rate):
+        self._bucket = TokenBucket(rate) if rate else None
+
+    def _export_thread(self, thread_id, sink, batcher):
+        pages = iter_message_pages(
+            self.client, thread_id, self.after, self.page_size, batcher
+        )
+        count = 0
+        while True:
+            if self._bucket is not None:
+                time.sleep(self._bucket.reserve())
+            page = next(pages, None)
+            if page is None:
+                return count
+            if self.after is not None:
+                page = [m for m in page if int(m.timestamp) >= self.after]
+            if page:
+                with self._sink_lock:
+                    sink(thread_id, page)
+                count += len(page)
+
+    def export(self, sink, thread_ids=None):
+        """Fetches the history of the threads, and passes it to `sink`
+
+        `sink` is called with a thread ID and a list of :class:`models.Message`
+        objects, newest first. The pages of a thread are passed in order, but pages of
+        different threads are interleaved. `sink` is never called concurrently.
+
+        :param sink: Function receiving the messages
+        :param thread_ids: IDs of the threads to export. If `None`, all threads from :func:`Client.fetchThreads` are exported
+        :return: The number of messages exported, per thread ID
+        :rtype: dict
+        :raises: FBchatException if a request failed
+        """
+        if thread_ids is None:
+            thread_ids = [thread.uid for thread in self.client.iterThreads()]
+
+        batcher = self.client.graphql_batcher or GraphQLBatcher(self.client)
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            futures = [
+                (
+                    thread_id,
+                    executor.submit(self._export_thread, thread_id, sink, batcher),
+                )
+                for thread_id in thread_ids
+            ]
+            return {thread_id: future.result() for thread_id, future in futures}
@@ -1,7 +1,120 @@
 from .models import *
 from .graphql import *
+from ._util import iter_prefetched
+import itertools
 import time
 
+
+def forced_fetch_query(thread_id, mid):
+    """The query fetching the message of a `ForcedFetch` delta"""
+    return GraphQL(
+        doc_id="1768656253222505",
+        params={"thread_and_message_id": {"thread_id": thread_id, "message_id": mid}},
+    )
+
+
+def thread_list_query(limit, thread_location, before):
+    """The query of :func:`Client.fetchThreadList`"""
+    if limit > 20 or limit < 1:
+        raise FBchatUserError("`limit` should be between 1 and 20")
+
+    if thread_location in ThreadLocation:
+        loc_str = thread_location.value
+    else:
+        raise FBchatUserError('"thread_location" must be a value of ThreadLocation')
+
+    return GraphQL(
+        doc_id="1349387578499440",
+        params={
+            "limit": limit,
+            "tags": [loc_str],
+            "before": before,
+            "includeDeliveryReceipts": True,
+            "includeSeqID": False,
+        },
+    )
+
+
+def graphql_to_thread_list(j):
+    """The threads of a :func:`thread_list_query` response"""
+    return [graphql_to_thread(node) for node in j["viewer"]["message_threads"]["nodes"]]
+
+
+def thread_messages_query(thread_id, limit, before):
+    """The query of :func:`Client.fetchThreadMessages`"""
+    return GraphQL(
+        doc_id="1386147188135407",
+        params={
+            "id": thread_id,
+            "message_limit": limit,
+            "load_messages": True,
+            "load_read_receipts": True,
+            "before": before,
+        },
+    )
+
+
+def graphql_to_thread_messages(thread_id, j):
+    """The messages of a :func:`thread_messages_query` response, newest first"""
+    if j.get("message_thread") is None:
+        raise FBchatException("Could not fetch thread {}: {}".format(thread_id, j))
+
+    messages = list(
+        reversed(
+            [
+                graphql_to_message(message)
+                for message in j["message_thread"]["messages"]["nodes"]
+            ]
+        )
+    )
+    read_receipts = j["message_thread"]["read_receipts"]["nodes"]
+
+    for message in messages:
+        for receipt in read_receipts:
+            if int(receipt["watermark"]) >= int(message.timestamp):
+                message.read_by.append(receipt["actor"]["id"])
+
+    return messages
+
+
+def fetch_thread_messages(client, thread_id, limit=20, before=None, batcher=None):
+    """Like :func:`Client.fetchThreadMessages`, but sent with `batcher`, if given"""
+    if batcher is None:
+        return client.fetchThreadMessages(
+            thread_id=thread_id, limit=limit, before=before
+        )
+    query = thread_messages_query(thread_id, limit, before)
+    return graphql_to_thread_messages(thread_id, batcher.submit(query).result())
+
+
+def iter_message_pages(client, thread_id, after=None, page_size=100, batcher=None):
+    """Yields the history of a thread as lists of messages, from newest to oldest
+
+    The message at the page boundary, which is returned again since `before` is
+    inclusive, is skipped.
+
+    :param batcher: A :class:`GraphQLBatcher` to send the queries with. By default, they're sent with :func:`Client.fetchThreadMessages`
+    """
+    before = None
+    seen = set()
+    while True:
+        candidates = fetch_thread_messages(client, thread_id, page_size, before, batcher)
+        page = [m for m in candidates if m.uid not in seen]
+        if not page:
+            return
+        yield page
+
+        timestamp = int(page[-1].timestamp)
+        if timestamp != before:
+            seen = set()
+            before = timestamp
+        seen.update(m.uid for m in page if int(m.timestamp) == timestamp)
+
+        if len(candidates) < page_size:  # Reached the first message
+            return
+        if after is not None and timestamp < after:
+            return
+
 class Fetcher(object):
 
     def __init__(self, initial):
@@ -20,17 +133,10 @@ class Fetcher(object):
     """
 
     def FET__forcedFetch(self, Client, thread_id, mid):
-        j = Client.graphql_request(
-            GraphQL(
-                doc_id="1768656253222505",
-                params={
-                    "thread_and_message_id": {"thread_id": thread_id, "message_id": mid}
-                },
-            )
-        )
+        j = Client.graphql_request(forced_fetch_query(thread_id, mid))
         return j
 
-    def FET_fetchThreads(self, Client, thread_location, before=None, after=None, limit=None):
+    def FET_fetchThreads(self, Client, thread_location=ThreadLocation.INBOX, before=None, after=None, limit=None):
         """
         Get all threads in thread_location.
         Threads will be sorted from newest to oldest.
@@ -43,45 +149,59 @@ class Fetcher(object):
         :rtype: list
         :raises: FBchatException if request failed
         """
-        threads = []
-
-        last_thread_timestamp = None
-        while True:
-            # break if limit is exceeded
-            if limit and len(threads) >= limit:
-                break
-
-            # fetchThreadList returns at max 20 threads before last_thread_timestamp (included)
-            candidates = Client.fetchThreadList(
-                before=last_thread_timestamp, thread_location=thread_location
-            )
+        threads = Client.iterThreads(thread_location, before=before, after=after)
+        return list(itertools.islice(threads, limit))
 
-            if len(candidates) > 1:
-                threads += candidates[1:]
-            else:  # End of threads
-                break
+    def FET_iterThreads(self, Client, thread_location=ThreadLocation.INBOX, before=None, after=None, prefetch=1):
+        """
+        Iterate over all threads in thread_location, without keeping them in memory.
+        Threads will be sorted from newest to oldest.
 
-            last_thread_timestamp = threads[-1].last_message_timestamp
+        The threads are fetched page by page, and the next page is fetched in the
+        background while the current one is being consumed.
 
-            # FB returns a sorted list of threads
-            if (before is not None and int(last_thread_timestamp) > before) or (
-                after is not None and int(last_thread_timestamp) < after
-            ):
-                break
+        :param thread_location: models.ThreadLocation: INBOX, PENDING, ARCHIVED or OTHER
+        :param before: Fetch only thread before this epoch (in ms) (default all threads)
+        :param after: Fetch only thread after this epoch (in ms) (default all threads)
+        :param prefetch: Number of pages to fetch ahead
+        :return: :class:`models.Thread` objects
+        :rtype: generator
+        :raises: FBchatException if request failed
+        """
 
-        # Return only threads between before and after (if set)
-        if before is not None or after is not None:
-            for t in threads:
-                last_message_timestamp = int(t.last_message_timestamp)
-                if (before is not None and last_message_timestamp > before) or (
-                    after is not None and last_message_timestamp < after
-                ):
-                    threads.remove(t)
+        def pages():
+            last_thread_timestamp = before
+            # fetchThreadList includes the threads at `before`, so skip the ones seen
+            seen = set()
+            while True:
+                candidates = Client.fetchThreadList(
+                    before=last_thread_timestamp, thread_location=thread_location
+                )
+                page = [t for t in candidates if t.uid not in seen]
+                if not page:  # End of threads
+                    return
+                yield page
+
+                timestamp = int(page[-1].last_message_timestamp)
+                if timestamp != last_thread_timestamp:
+                    seen = set()
+                    last_thread_timestamp = timestamp
+                seen.update(
+                    t.uid for t in page if int(t.last_message_timestamp) == timestamp
+                )
 
-        if limit and len(threads) > limit:
-            return threads[:limit]
+                # FB returns a sorted list of threads
+                if after is not None and timestamp < after:
+                    return
 
-        return threads
+        for page in iter_prefetched(pages(), prefetch):
+            for thread in page:
+                last_message_timestamp = int(thread.last_message_timestamp)
+                if before is not None and last_message_timestamp > before:
+                    continue
+                if after is not None and last_message_timestamp < after:
+                    return
+                yield thread
 
     def FET_fetchAllUsersFromThreads(self, Client, threads):
         """
@@ -443,7 +563,26 @@ class Fetcher(object):
         :rtype: dict
         :raises: FBchatException if request failed
         """
+        cache = Client.entity_cache
+        if cache is None:
+            return self.FET__fetchThreadInfo(Client, *thread_ids)
+
+        rtn = {}
+        missing = []
+        for thread_id in thread_ids:
+            thread = cache.get(str(thread_id))
+            if thread is None:
+                missing.append(thread_id)
+            else:
+                rtn[thread.uid] = thread
+        if missing:
+            fetched = self.FET__fetchThreadInfo(Client, *missing)
+            for thread in fetched.values():
+                cache.put(thread)
+            rtn.update(fetched)
+        return rtn
 
+    def FET__fetchThreadInfo(self, Client, *thread_ids):
         queries = []
         for thread_id in thread_ids:
             queries.append(
@@ -515,39 +654,35 @@ class Fetcher(object):
         """
 
         thread_id, thread_type = Client._getThread(thread_id, None)
+        j = Client.graphql_request(thread_messages_query(thread_id, limit, before))
+        return graphql_to_thread_messages(thread_id, j)
 
-        j = Client.graphql_request(
-            GraphQL(
-                doc_id="1386147188135407",
-                params={
-                    "id": thread_id,
-                    "message_limit": limit,
-                    "load_messages": True,
-                    "load_read_receipts": True,
-                    "before": before,
-                },
-            )
-        )
+    def FET_iterThreadMessages(self, Client, thread_id=None, after=None, page_size=100, prefetch=1):
+        """
+        Iterate over the whole history of a thread, from newest to oldest message
 
-        if j.get("message_thread") is None:
-            raise FBchatException("Could not fetch thread {}: {}".format(thread_id, j))
+        The messages are fetched page by page, and the next pages are fetched in the
+        background while the current one is being consumed.
 
-        messages = list(
-            reversed(
-                [
-                    graphql_to_message(message)
-                    for message in j["message_thread"]["messages"]["nodes"]
-                ]
-            )
-        )
-        read_receipts = j["message_thread"]["read_receipts"]["nodes"]
-
-        for message in messages:
-            for receipt in read_receipts:
-                if int(receipt["watermark"]) >= int(message.timestamp):
-                    message.read_by.append(receipt["actor"]["id"])
+        :param thread_id: User/Group ID to get messages from. See :ref:`intro_threads`
+        :param after: Fetch only messages after this epoch (in ms) (default all messages)
+        :param page_size: Number of messages to fetch per request
+        :param prefetch: Number of pages to fetch ahead
+        :type page_size: int
+        :type prefetch: int
+        :return: :class:`models.Message` objects
+        :rtype: generator
+        :raises: FBchatException if request failed
+        """
+        thread_id, thread_type = Client._getThread(thread_id, None)
 
-        return messages
+        for page in iter_prefetched(
+            iter_message_pages(Client, thread_id, after, page_size), prefetch
+        ):
+            for message in page:
+                if after is not None and int(message.timestamp) < after:
+                    return
+                yield message
 
     def FET_fetchUnreadFromThreadMessages(self, Client, thread_id=None):
 
@@ -642,30 +777,8 @@ class Fetcher(object):
                 "Using `offset` in `fetchThreadList` is no longer supported, since Facebook migrated to the use of GraphQL in this request. Use `before` instead"
             )
 
-        if limit > 20 or limit < 1:
-            raise FBchatUserError("`limit` should be between 1 and 20")
-
-        if thread_location in ThreadLocation:
-            loc_str = thread_location.value
-        else:
-            raise FBchatUserError('"thread_location" must be a value of ThreadLocation')
-
-        j = Client.graphql_request(
-            GraphQL(
-                doc_id="1349387578499440",
-                params={
-                    "limit": limit,
-                    "tags": [loc_str],
-                    "before": before,
-                    "includeDeliveryReceipts": True,
-                    "includeSeqID": False,
-                },
-            )
-        )
-
-        return [
-            graphql_to_thread(node) for node in j["viewer"]["message_threads"]["nodes"]
-        ]
+        j = Client.graphql_request(thread_list_query(limit, thread_location, before))
+        return graphql_to_thread_list(j)
 
     def FET_fetchUnread(self, Client):
         """
@@ -850,7 +963,7 @@ class Fetcher(object):
         :return: Given user active status
         :rtype: models.ActiveStatus
         """
-        return Client._buddylist.get(str(user_id))
+        return Client.presence.get(user_id)
 
 
         #example for fetching a User or group from a given URL
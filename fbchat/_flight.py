@@ -0,0 +1,74 @@
+# -*- coding: UTF-8 -*-
+
+from __future__ import unicode_literals
+
+import threading
+
+from ._util import *
+
+
+class _Call(object):
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.exception = None
+
+
+class SingleFlight(object):
+    """Runs identical calls made at the same time only once
+
+    While a call with a key is running, other calls with the same key wait for it, and
+    get its result, or its exception. Nothing is kept once the call has returned, so
+    this isn't a cache::
+
+        flight = SingleFlight()
+        flight.do(("fetchImageUrl", image_id), client.fetchImageUrl, image_id)
+
+    Used by :func:`Client.fetchThreadInfo` and :func:`Client.fetchImageUrl`, see
+    :any:`Client.single_flight`
+    """
+
+    def __init__(self):
+        #: Number of calls that ran
+        self.calls = 0
+        #: Number of calls that got the result of another call
+        self.shared = 0
+        self._calls = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        """The number of calls running"""
+        return len(self._calls)
+
+    def do(self, key, func, *args, **kwargs):
+        """Calls `func`, unless a call with the same key is running
+
+        :param key: A hashable key, e.g. a tuple of the endpoint and the normalized parameters
+        :return: What `func` returned, possibly to another caller
+        :raises: What `func` raised
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+                self.calls += 1
+            else:
+                self.shared += 1
+
+        if leader:
+            try:
+                call.result = func(*args, **kwargs)
+            except BaseException as e:
+                call.exception = e
+                raise
+            finally:
+                with self._lock:
+                    del self._calls[key]
+                call.done.set()
+            return call.result
+
+        call.done.wait()
+        if call.exception is not None:
+            raise call.exception
+        return call.result
@@ -0,0 +1,97 @@
+# -*- coding: UTF-8 -*-
+
+from __future__ import unicode_literals
+
+import threading
+
+from ._util import *
+from ._fetch import forced_fetch_query
+import time
+
+
+class ForcedFetchResolver(object):
+    """Resolves the `ForcedFetch` deltas received while listening, on a background thread
+
+    Some events, like thread image changes, only arrive as a message ID, which must
+    be fetched before the event can be handled. Instead of fetching it before the next
+    pull, the fetch is queued here. Fetches queued within `window` seconds of each
+    other are sent in one GraphQL request. A fetch that fails, e.g. of a deleted
+    message, is passed to :func:`Client.onMessageError` without failing the others.
+    """
+
+    def __init__(self, client, window=0.05, max_size=50):
+        """
+        :param client: The client to fetch with
+        :param window: Seconds to wait for more fetches before sending them
+        :param max_size: Max. number of fetches sent at once
+        :type window: float
+        :type max_size: int
+        """
+        self.client = client
+        self.window = window
+        self.max_size = max_size
+        #: Number of fetches resolved, and handled without errors
+        self.resolved = 0
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run)
+        self._thread.daemon = True
+        self._thread.start()
+
+    def submit(self, thread_id, mid, callback, m=None):
+        """Queues a fetch
+
+        :param thread_id: The thread of the message
+        :param mid: The message ID
+        :param callback: Called on the background thread with the fetched json
+        :param m: The pulled message, passed to :func:`Client.onMessageError` if something fails
+        """
+        self._queue.put((thread_id, mid, callback, m))
+
+    def close(self):
+        """Stops the background thread once the queued fetches are resolved"""
+        self._queue.put(None)
+
+    def _take(self):
+        first = self._queue.get()
+        if first is None:
+            return None
+        batch = [first]
+        deadline = time.time() + self.window
+        while len(batch) < self.max_size:
+            timeout = deadline - time.time()
+            if timeout <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                break
+            if item is None:
+                self._queue.put(None)
+                break
+            batch.append(item)
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._take()
+            if batch is None:
+                return
+            queries = [
+                forced_fetch_query(thread_id, mid) for thread_id, mid, _, _ in batch
+            ]
+            try:
+                # Errors of single queries are returned, so they only fail their fetch
+                results = self.client._graphqlResults(*queries)
+            except Exception as e:
+                for _, _, _, m in batch:
+                    self.client.onMessageError(exception=e, msg=m)
+                continue
+            for (_, _, callback, m), result in zip(batch, results):
+                try:
+                    if isinstance(result, Exception):
+                        raise result
+                    callback(result)
+                except Exception as e:
+                    self.client.onMessageError(exception=e, msg=m)
+                else:
+                    self.resolved += 1
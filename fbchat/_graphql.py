@@ -570,7 +570,10 @@ def graphql_queries_to_json(*queries):
     return json.dumps(rtn)
 
 
-def graphql_response_to_json(content):
+def graphql_response_to_results(content):
+    """Like :func:`graphql_response_to_json`, but the error of a query is returned in
+    place of its result, instead of being raised
+    """
     content = strip_to_json(content)  # Usually only needed in some error cases
     try:
         j = json.loads(content, cls=ConcatJSONDecoder)
@@ -584,7 +587,11 @@ def graphql_response_to_json(content):
             continue
         check_json(x)
         [(key, value)] = x.items()
-        check_json(value)
+        try:
+            check_json(value)
+        except FBchatFacebookError as e:
+            rtn[int(key[1:])] = e
+            continue
         if "response" in value:
             rtn[int(key[1:])] = value["response"]
         else:
@@ -595,6 +602,14 @@ def graphql_response_to_json(content):
     return rtn
 
 
+def graphql_response_to_json(content):
+    rtn = graphql_response_to_results(content)
+    for result in rtn:
+        if isinstance(result, FBchatFacebookError):
+            raise result
+    return rtn
+
+
 class GraphQL(object):
     def __init__(self, query=None, doc_id=None, params=None):
         if params is None:
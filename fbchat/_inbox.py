@@ -0,0 +1,194 @@
+# -*- coding: UTF-8 -*-
+
+from __future__ import unicode_literals
+
+import bisect
+import threading
+
+from ._util import *
+from ._thread import Thread, ThreadLocation
+
+
+def _timestamp(thread):
+    return int(thread.last_message_timestamp or 0)
+
+
+class Inbox(object):
+    """A local copy of a thread list, kept up to date by the events received while listening
+
+    Seed it once, and set it on the client::
+
+        inbox = Inbox()
+        inbox.seed(client, limit=100)
+        client.inbox = inbox
+        client.listen()
+
+    After that, new messages, threads marked as read or seen, title changes, and
+    threads moved or deleted with :func:`Client.moveThreads` and
+    :func:`Client.deleteThreads` update it. The threads are kept sorted by
+    `last_message_timestamp`, so :func:`top` and :func:`unread` don't do requests.
+
+    Threads that first appear with a new message are added as plain
+    :class:`models.Thread` objects, with only the ID, type and timestamp.
+    """
+
+    def __init__(self, location=ThreadLocation.INBOX):
+        """
+        :param location: The thread list this is a copy of
+        :type location: models.ThreadLocation
+        """
+        self.location = location
+        #: The unseen count of the last `inbox` event
+        self.unseen = None
+        #: The unread count of the last `inbox` event
+        self.unread_count = None
+        self._threads = {}
+        self._order = []
+        self._unread = []
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._threads)
+
+    def __contains__(self, thread_id):
+        return str(thread_id) in self._threads
+
+    def seed(self, client, limit=100, unread=True):
+        """Replaces the threads with the latest ones fetched with :func:`Client.fetchThreads`
+
+        :param client: The client to fetch with
+        :param limit: Max. number of threads to fetch
+        :param unread: Whether to also fetch which threads are unread, with :func:`Client.fetchUnread`
+        :type limit: int
+        :type unread: bool
+        """
+        threads = client.fetchThreads(self.location, limit=limit)
+        unread_ids = set()
+        if unread:
+            unread_ids = set(str(thread_id) for thread_id in client.fetchUnread())
+        with self._lock:
+            self._threads = {}
+            self._order = []
+            self._unread = []
+            for thread in threads:
+                self._add(thread, thread.uid in unread_ids)
+
+    def refresh(self, client, thread_ids):
+        """Adds threads, or replaces them, with the ones fetched with :func:`Client.fetchThreadInfo`
+
+        Used when threads are moved to the thread list of the inbox. Threads keep
+        whether they're unread, and new threads are read
+
+        :param client: The client to fetch with
+        :param thread_ids: Thread IDs to fetch
+        """
+        threads = client.fetchThreadInfo(*thread_ids)
+        with self._lock:
+            for thread in threads.values():
+                is_unread = False
+                if thread.uid in self._threads:
+                    _, is_unread = self._remove(thread.uid)
+                self._add(thread, is_unread)
+
+    def _key(self, thread):
+        return (-_timestamp(thread), thread.uid)
+
+    def _add(self, thread, is_unread):
+        self._threads[thread.uid] = (thread, is_unread)
+        key = self._key(thread)
+        bisect.insort(self._order, key)
+        if is_unread:
+            bisect.insort(self._unread, key)
+
+    def _remove(self, thread_id):
+        thread, is_unread = self._threads.pop(thread_id)
+        key = self._key(thread)
+        del self._order[bisect.bisect_left(self._order, key)]
+        if is_unread:
+            del self._unread[bisect.bisect_left(self._unread, key)]
+        return thread, is_unread
+
+    def get(self, thread_id):
+        """
+        :return: The thread, or `None` if it isn't in the inbox
+        :rtype: models.Thread
+        """
+        with self._lock:
+            entry = self._threads.get(str(thread_id))
+            return None if entry is None else entry[0]
+
+    def is_unread(self, thread_id):
+        with self._lock:
+            entry = self._threads.get(str(thread_id))
+            return entry is not None and entry[1]
+
+    def top(self, n=20):
+        """
+        :return: The `n` threads with the latest messages, latest first
+        :rtype: list
+        """
+        with self._lock:
+            return [self._threads[uid][0] for _, uid in self._order[:n]]
+
+    def unread(self, n=None):
+        """
+        :return: The unread threads, or the `n` latest of them, latest first
+        :rtype: list
+        """
+        with self._lock:
+            return [self._threads[uid][0] for _, uid in self._unread[:n]]
+
+    def put(self, thread, unread=False):
+        """Adds a thread, or replaces it
+
+        :type thread: models.Thread
+        :type unread: bool
+        """
+        with self._lock:
+            if thread.uid in self._threads:
+                self._remove(thread.uid)
+            self._add(thread, unread)
+
+    def remove(self, thread_ids):
+        """Removes threads, e.g. when they're moved or deleted"""
+        with self._lock:
+            for thread_id in thread_ids:
+                if str(thread_id) in self._threads:
+                    self._remove(str(thread_id))
+
+    def message_received(self, thread_id, thread_type, ts, unread):
+        """Moves a thread to the top, or adds it
+
+        :param unread: Whether the message makes the thread unread. Messages sent by the client make it read
+        """
+        with self._lock:
+            if thread_id in self._threads:
+                thread, _ = self._remove(thread_id)
+                if thread.message_count is not None:
+                    thread.message_count += 1
+            else:
+                thread = Thread(thread_type, thread_id)
+            thread.last_message_timestamp = str(ts)
+            self._add(thread, unread)
+
+    def mark_read(self, thread_ids=None, read=True):
+        """Marks threads as read or unread. If `thread_ids` is `None`, all threads are marked"""
+        with self._lock:
+            if thread_ids is None:
+                thread_ids = list(self._threads)
+            for thread_id in thread_ids:
+                thread_id = str(thread_id)
+                if thread_id in self._threads:
+                    thread, _ = self._remove(thread_id)
+                    self._add(thread, not read)
+
+    def rename(self, thread_id, name):
+        with self._lock:
+            entry = self._threads.get(thread_id)
+            if entry is not None:
+                entry[0].name = name
+
+    def set_counts(self, unseen, unread):
+        """Sets the counts of an `inbox` event"""
+        self.unseen = unseen
+        self.unread_count = unread
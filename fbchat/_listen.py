@@ -0,0 +1,242 @@
+# -*- coding: UTF-8 -*-
+
+from __future__ import unicode_literals
+
+import threading
+from collections import deque
+
+from ._util import *
+from ._buffer import BufferPolicy, EventBuffer
+import time
+
+
+def _thread_id(key):
+    thread_id = key.get("threadFbId") or key.get("otherUserFbId")
+    return None if thread_id is None else str(thread_id)
+
+
+def _client_payload_thread_key(delta):
+    """The thread of the first delta in a `ClientPayload`, e.g. a reaction or unsend"""
+    try:
+        payload = json.loads("".join(chr(z) for z in delta["payload"]))
+    except (KeyError, TypeError, ValueError):
+        return None
+    for d in payload.get("deltas", []):
+        for value in d.values():
+            if isinstance(value, dict) and value.get("threadKey"):
+                return _thread_id(value["threadKey"])
+    return None
+
+
+def thread_key(m):
+    """Returns the ID of the thread a pulled message is about, or `None`"""
+    delta = m.get("delta")
+    if delta is not None:
+        if delta.get("class") == "ClientPayload":
+            return _client_payload_thread_key(delta)
+        metadata = delta.get("messageMetadata") or {}
+        return _thread_id(metadata.get("threadKey") or delta.get("threadKey") or {})
+    if m.get("type") in ("typ", "ttyp"):
+        return str(m.get("thread_fbid") or m.get("from"))
+    return None
+
+
+class _Pull(object):
+    """The messages of a pull that are still queued, and the checkpoint state after it"""
+
+    def __init__(self):
+        self.remaining = 0
+        self.state = None
+
+
+class ThreadedListener(object):
+    """Listens on a dedicated thread, and handles the events on a pool of workers
+
+    With :func:`Client.listen`, a slow event handler delays the next pull, and so
+    every other event. Here, a puller thread only fetches the events, and queues them
+    for the workers. The events of a thread are always handled by the same worker, so
+    they're handled in order::
+
+        listener = ThreadedListener(client, workers=8)
+        listener.listen()
+
+    Note that the event handlers of the client are then called from several threads
+    at the same time.
+
+    When a worker's queue is full, `policy` decides whether pulling waits, or events
+    are dropped or coalesced. See :class:`EventBuffer`.
+
+    With a :any:`Client.checkpoint_store`, the state after a pull is saved once the
+    events of that pull, and of the pulls before it, have been handled or dropped.
+    """
+
+    def __init__(
+        self, client, workers=4, queue_size=1000, policy=BufferPolicy.BLOCK, **kwargs
+    ):
+        """
+        :param client: The client to listen with
+        :param workers: Number of threads handling events
+        :param queue_size: Max. number of events waiting for each worker
+        :param policy: What to do with an event when its worker's queue is full
+        :param kwargs: Passed to each worker's :class:`EventBuffer`, e.g. `droppable`
+        :type workers: int
+        :type queue_size: int
+        :type policy: BufferPolicy
+        """
+        self.client = client
+        self._queues = [
+            EventBuffer(queue_size, policy, on_drop=self._done, **kwargs)
+            for _ in range(workers)
+        ]
+        self._lags = [0.0] * workers
+        self._threads = []
+        self._puller = None
+        self._error = None
+        self._pull_of = {}
+        self._current = _Pull()
+        self._pulls = deque()
+        #: Number of events handled
+        self.dispatched = 0
+        self._lock = threading.Lock()
+
+    @property
+    def queue_depth(self):
+        """Number of events waiting to be handled"""
+        return sum(len(q) for q in self._queues)
+
+    @property
+    def enqueued(self):
+        """Number of events queued"""
+        return sum(q.enqueued for q in self._queues)
+
+    @property
+    def dropped(self):
+        """Number of events dropped because a queue was full"""
+        return sum(q.dropped for q in self._queues)
+
+    @property
+    def coalesced(self):
+        """Number of events that replaced a queued event"""
+        return sum(q.coalesced for q in self._queues)
+
+    @property
+    def lag(self):
+        """The most seconds the last handled events of the workers have waited in the queue"""
+        return max(self._lags)
+
+    def put(self, m):
+        """Queues a pulled message for the worker of its thread"""
+        key = thread_key(m)
+        shard = hash(key) % len(self._queues) if key is not None else 0
+        with self._lock:
+            self._current.remaining += 1
+            self._pull_of[id(m)] = (m, self._current)
+        if not self._queues[shard].put(m):
+            self._done(m)
+
+    def checkpoint(self, state):
+        """Saves the checkpoint state once the messages queued so far are handled
+
+        Called by the client after each pull, instead of saving the state right away
+        """
+        with self._lock:
+            self._current.state = state
+            self._pulls.append(self._current)
+            self._current = _Pull()
+            self._saveCheckpoints()
+
+    def _done(self, m):
+        """Marks a queued message as handled or dropped"""
+        with self._lock:
+            _, pull = self._pull_of.pop(id(m))
+            pull.remaining -= 1
+            self._saveCheckpoints()
+
+    def _saveCheckpoints(self):
+        state = None
+        while self._pulls and self._pulls[0].remaining == 0:
+            state = self._pulls.popleft().state
+        if state is not None:
+            self.client.checkpoint_store.save(state)
+
+    def _work(self, index):
+        q = self._queues[index]
+        while True:
+            item = q.get()
+            if item is None:
+                return
+            queued_at, m = item
+            self._lags[index] = time.time() - queued_at
+            self.client._parseMessageItem(m)
+            self._done(m)
+            with self._lock:
+                self.dispatched += 1
+
+    def _pull(self, markAlive):
+        client = self.client
+        if markAlive is not None:
+            client.setActiveStatus(markAlive)
+        client.startListening()
+        client.onListening()
+        try:
+            while client.listening and client.doOneListen():
+                pass
+        except Exception as e:
+            # Raised again from `join`, on the thread that's waiting for the listener
+            self._error = e
+        finally:
+            client.stopListening()
+            for q in self._queues:
+                q.close()
+
+    def start(self, markAlive=None):
+        """Starts the puller and the workers
+
+        :param markAlive: Whether to show the client as active while listening
+        :type markAlive: bool
+        """
+        self.client._dispatcher = self
+        self._error = None
+        self._pull_of.clear()
+        self._current = _Pull()
+        self._pulls.clear()
+        self._threads = [
+            threading.Thread(target=self._work, args=(i,))
+            for i in range(len(self._queues))
+        ]
+        self._puller = threading.Thread(target=self._pull, args=(markAlive,))
+        for thread in self._threads + [self._puller]:
+            thread.daemon = True
+            thread.start()
+
+    def stop(self):
+        """Stops pulling. The queued events are still handled, see :func:`join`"""
+        self.client.listening = False
+
+    def join(self, timeout=None):
+        """Waits for the puller to stop, and the workers to handle the queued events
+
+        :raises: The exception that stopped the puller, if any
+        """
+        for thread in [self._puller] + self._threads:
+            thread.join(timeout)
+        if not any(thread.is_alive() for thread in [self._puller] + self._threads):
+            self.client._dispatcher = None
+            error, self._error = self._error, None
+            if error is not None:
+                raise error
+
+    def listen(self, markAlive=None):
+        """Listens until :func:`stop` is called or an error stops the loop
+
+        :param markAlive: Whether to show the client as active while listening
+        :type markAlive: bool
+        :raises: The exception that stopped pulling, like :func:`Client.listen`
+        """
+        self.start(markAlive)
+        try:
+            while self._puller.is_alive():
+                self._puller.join(1)
+        except KeyboardInterrupt:
+            self.stop()
+        self.join()
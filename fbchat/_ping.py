@@ -0,0 +1,82 @@
+# -*- coding: UTF-8 -*-
+
+from __future__ import unicode_literals
+
+import threading
+
+from ._util import *
+import time
+
+
+class PingScheduler(object):
+    """Sends presence pings on an interval while listening, on a background thread
+
+    A pull made while the client is marked as active also keeps it active, so a ping
+    is skipped while a pull is running, or when one ended less than `interval`
+    seconds ago.
+    """
+
+    def __init__(self, client, interval=60):
+        """
+        :param client: The client to ping with
+        :param interval: Seconds between pings
+        :type interval: float
+        """
+        self.client = client
+        self.interval = interval
+        #: Number of pings sent
+        self.sent = 0
+        #: Number of pings skipped, because pulls kept the client active
+        self.skipped = 0
+        self._lock = threading.Lock()
+        self._pulling = 0
+        self._last_pull = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def pull_started(self):
+        with self._lock:
+            self._pulling += 1
+
+    def pull_ended(self):
+        with self._lock:
+            self._pulling -= 1
+            self._last_pull = time.time()
+
+    def _is_active(self):
+        with self._lock:
+            if self._pulling > 0:
+                return True
+            return (
+                self._last_pull is not None
+                and time.time() - self._last_pull < self.interval
+            )
+
+    def tick(self):
+        """Sends a ping, unless the client isn't marked as active or a pull made it so"""
+        if not self.client._markAlive:
+            return
+        if self._is_active():
+            self.skipped += 1
+            return
+        try:
+            self.client._ping()
+            self.sent += 1
+        except Exception:
+            log.exception("Failed sending a presence ping")
+
+    def _run(self):
+        self.tick()
+        while not self._stop.wait(self.interval):
+            self.tick()
+
+    def start(self):
+        """Starts the background thread. The first ping is sent right away"""
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run)
+        self._thread.daemon = True
+        self._thread.start()
+
+    def stop(self):
+        """Stops the background thread"""
+        self._stop.set()
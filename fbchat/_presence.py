@@ -0,0 +1,181 @@
+# -*- coding: UTF-8 -*-
+
+from __future__ import unicode_literals
+
+import bisect
+import threading
+from array import array
+from collections import deque
+
+from ._util import *
+from ._user import ActiveStatus
+import time
+
+_ACTIVE = 1
+_IN_GAME = 2
+_HAS_LAST_ACTIVE = 4
+
+
+class PresenceStore(object):
+    """The active status of users, as received while listening
+
+    The statuses are kept in arrays, one row per user, with an index of the active
+    users, and one of the users sorted by when they were last active. So the active
+    users, and those active in the last seconds, are found without looking at every
+    user::
+
+        client.presence = PresenceStore(history=10)
+        ...
+        client.presence.recently_active(300)
+    """
+
+    def __init__(self, history=0):
+        """
+        :param history: Number of previous statuses remembered for each user. See :func:`history`
+        :type history: int
+        """
+        self.history_size = history
+        self._rows = {}
+        self._flags = bytearray()
+        self._last_active = array("d")
+        self._active = set()
+        self._by_last_active = []
+        self._history = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._rows)
+
+    def __contains__(self, user_id):
+        return str(user_id) in self._rows
+
+    def _row(self, user_id):
+        row = self._rows.get(user_id)
+        if row is None:
+            row = self._rows[user_id] = len(self._flags)
+            self._flags.append(0)
+            self._last_active.append(0)
+        return row
+
+    def _status(self, row):
+        active, last_active, in_game = self._status_tuple(
+            self._flags[row], self._last_active[row]
+        )
+        return ActiveStatus(active=active, last_active=last_active, in_game=in_game)
+
+    def _update(self, user_id, active, last_active, in_game):
+        known = user_id in self._rows
+        row = self._row(user_id)
+        old_flags = flags = self._flags[row]
+        if in_game is not None:
+            flags = flags | _IN_GAME if in_game else flags & ~_IN_GAME
+        if active:
+            flags |= _ACTIVE
+            self._active.add(user_id)
+        else:
+            flags &= ~_ACTIVE
+            self._active.discard(user_id)
+
+        old_last_active = self._last_active[row]
+        if last_active is not None:
+            if old_flags & _HAS_LAST_ACTIVE:
+                index = bisect.bisect_left(
+                    self._by_last_active, (old_last_active, user_id)
+                )
+                del self._by_last_active[index]
+            bisect.insort(self._by_last_active, (float(last_active), user_id))
+            self._last_active[row] = last_active
+            flags |= _HAS_LAST_ACTIVE
+
+        self._flags[row] = flags
+        changed = flags != old_flags or self._last_active[row] != old_last_active
+        if self.history_size and known and changed:
+            ring = self._history.get(user_id)
+            if ring is None:
+                ring = self._history[user_id] = deque(maxlen=self.history_size)
+            ring.append(self._status_tuple(old_flags, old_last_active))
+
+    @staticmethod
+    def _status_tuple(flags, last_active):
+        return (
+            bool(flags & _ACTIVE),
+            int(last_active) if flags & _HAS_LAST_ACTIVE else None,
+            bool(flags & _IN_GAME),
+        )
+
+    def update(self, statuses):
+        """Updates the statuses of several users
+
+        :param statuses: Tuples of a user ID, whether the user is active, when they were last active and whether they're playing a game. `None` leaves a value unchanged, except for `active`
+        """
+        with self._lock:
+            for user_id, active, last_active, in_game in statuses:
+                self._update(str(user_id), active, last_active, in_game)
+
+    def update_from_buddylist(self, m):
+        """Updates the statuses from a `chatproxy-presence` message
+
+        :return: A dict of the user IDs and when they were last active
+        """
+        gamers = m.get("gamers", {})
+        buddylist = m.get("buddyList", {})
+        self.update(
+            (
+                _id,
+                payload.get("p") in [2, 3],
+                payload.get("lat"),
+                int(_id) in gamers,
+            )
+            for _id, payload in buddylist.items()
+        )
+        return dict((_id, payload.get("lat")) for _id, payload in buddylist.items())
+
+    def update_from_overlay(self, m):
+        """Updates the statuses from a `buddylist_overlay` message
+
+        :return: A dict of the user IDs and their :class:`models.ActiveStatus`
+        """
+        overlay = m.get("overlay", {})
+        self.update(
+            (_id, payload.get("a") in [2, 3], payload.get("la"), None)
+            for _id, payload in overlay.items()
+        )
+        return dict((_id, self.get(_id)) for _id in overlay)
+
+    def get(self, user_id):
+        """
+        :return: The status of the user, or `None` if it isn't known
+        :rtype: models.ActiveStatus
+        """
+        with self._lock:
+            row = self._rows.get(str(user_id))
+            return None if row is None else self._status(row)
+
+    def active_users(self):
+        """
+        :return: The IDs of the active users
+        :rtype: set
+        """
+        with self._lock:
+            return set(self._active)
+
+    def recently_active(self, seconds, now=None):
+        """
+        :param seconds: How many seconds back to look
+        :param now: The current timestamp. Defaults to the current time
+        :return: The IDs of the users last active in the last `seconds`, most recent first
+        :rtype: list
+        """
+        if now is None:
+            now = time.time()
+        with self._lock:
+            index = bisect.bisect_left(self._by_last_active, (now - seconds,))
+            return [user_id for _, user_id in reversed(self._by_last_active[index:])]
+
+    def history(self, user_id):
+        """
+        :return: The previous statuses of the user, oldest first, as tuples of `active`, `last_active` and `in_game`
+        :rtype: list
+        """
+        with self._lock:
+            return list(self._history.get(str(user_id), ()))
@@ -0,0 +1,141 @@
+# -*- coding: UTF-8 -*-
+
+from __future__ import unicode_literals
+
+import threading
+
+from ._util import *
+from ._retry import endpoint
+import time
+
+#: Requests per second, and burst size, of the endpoints limited by default
+DEFAULT_RATE_LIMITS = {
+    ReqUrl.SEND: (1, 5),
+    ReqUrl.GRAPHQL: (2, 10),
+    ReqUrl.UPLOAD: (0.5, 3),
+}
+
+
+class TokenBucket(object):
+    """Allows `rate` requests per second on average, and `burst` at once
+
+    Starts full. Each request takes a token, and tokens are added back continuously
+    """
+
+    def __init__(self, rate, burst=1):
+        """
+        :param rate: Tokens added per second
+        :param burst: Max. number of tokens
+        :type rate: float
+        :type burst: int
+        """
+        if rate <= 0 or burst < 1:
+            raise FBchatUserError("A token bucket needs a positive rate and burst")
+        self.rate = float(rate)
+        self.burst = burst
+        #: Number of requests that had to wait for a token
+        self.waited = 0
+        #: Number of requests refused, because no token was left
+        self.rejected = 0
+        self._tokens = float(burst)
+        self._updated = time.time()
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        elapsed = max(0, now - self._updated)
+        self._tokens = min(self.burst, self._tokens + elapsed * self.rate)
+        self._updated = now
+
+    @property
+    def tokens(self):
+        """The number of tokens left. Negative if requests are waiting for tokens"""
+        with self._lock:
+            self._refill(time.time())
+            return self._tokens
+
+    def reserve(self, block=True):
+        """Takes a token
+
+        When blocking and no token is left, the next token is reserved, so waiting
+        requests are let through in order, exactly as fast as the rate allows
+
+        :param block: Whether to reserve a token that isn't there yet
+        :return: The seconds to wait before sending the request, or `None` if not blocking and no token is left
+        :rtype: float
+        """
+        with self._lock:
+            self._refill(time.time())
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return 0
+            if not block:
+                self.rejected += 1
+                return None
+            self._tokens -= 1
+            self.waited += 1
+            return -self._tokens / self.rate
+
+
+class RateLimiter(object):
+    """Paces the requests to some endpoints with a :class:`TokenBucket` per endpoint
+
+    Set it on the client, which is then shared by all threads using the client::
+
+        client.rate_limiter = RateLimiter({ReqUrl.SEND: (2, 10)})
+
+    Requests to other endpoints aren't limited. Retries take a token too.
+    """
+
+    def __init__(self, limits=None, block=True):
+        """
+        :param limits: Tuples of the requests per second, and the burst size, by url. Defaults to :any:`DEFAULT_RATE_LIMITS`
+        :param block: Whether to wait for a token, or raise :class:`FBchatRateLimitError` if none is left
+        :type limits: dict
+        :type block: bool
+        """
+        if limits is None:
+            limits = DEFAULT_RATE_LIMITS
+        self.block = block
+        #: The :class:`TokenBucket` of each endpoint
+        self.buckets = dict(
+            (endpoint(url), TokenBucket(rate, burst))
+            for url, (rate, burst) in limits.items()
+        )
+
+    def bucket(self, url):
+        """
+        :return: The bucket of the url's endpoint, or `None` if it isn't limited
+        :rtype: TokenBucket
+        """
+        return self.buckets.get(endpoint(url))
+
+    def reserve(self, url, block=None):
+        """Takes a token for a request to the url, without waiting for it
+
+        :param block: Overrides `block` of the limiter
+        :return: The seconds to wait before sending the request
+        :rtype: float
+        :raises: FBchatRateLimitError if not blocking and no token is left
+        """
+        bucket = self.bucket(url)
+        if bucket is None:
+            return 0
+        delay = bucket.reserve(self.block if block is None else block)
+        if delay is None:
+            raise FBchatRateLimitError(
+                "Rate limit of {} reached".format(endpoint(url)), url=url
+            )
+        return delay
+
+    def acquire(self, url, block=None):
+        """Takes a token for a request to the url, waiting for it if needed
+
+        :param block: Overrides `block` of the limiter
+        :return: The seconds waited
+        :rtype: float
+        :raises: FBchatRateLimitError if not blocking and no token is left
+        """
+        delay = self.reserve(url, block)
+        if delay > 0:
+            time.sleep(delay)
+        return delay
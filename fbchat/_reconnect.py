@@ -0,0 +1,83 @@
+# -*- coding: UTF-8 -*-
+
+from __future__ import unicode_literals
+
+import threading
+
+from ._util import *
+import random
+
+
+class ReconnectPolicy(object):
+    """Decides how long to wait, and which pull channel to use, after a failed pull
+
+    Facebook serves pulls from several channels (`0-edge-chat` to `4-edge-chat`).
+    Each channel has a health score between 0 and 1, a moving average of its recent
+    pull results. After a failure, listening moves to the healthiest channel. The first
+    retry is immediate, and further consecutive failures wait exponentially longer::
+
+        client.reconnect_policy = ReconnectPolicy(max_delay=10)
+    """
+
+    def __init__(
+        self,
+        base_delay=1,
+        max_delay=30,
+        factor=2,
+        jitter=0.5,
+        channels=5,
+        smoothing=0.3,
+    ):
+        """
+        :param base_delay: Seconds to wait after the second consecutive failure
+        :param max_delay: Max. seconds to wait
+        :param factor: How much the delay grows with each consecutive failure
+        :param jitter: Fraction of the delay that is random, so clients don't retry in lockstep
+        :param channels: Number of pull channels
+        :param smoothing: Weight of the latest result in the health scores
+        """
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.factor = factor
+        self.jitter = jitter
+        self.smoothing = smoothing
+        #: Health score of each channel
+        self.health = [1.0] * channels
+        #: Number of failures since the last successful pull
+        self.failures = 0
+        self._lock = threading.Lock()
+
+    def _update(self, channel, result):
+        self.health[channel] += self.smoothing * (result - self.health[channel])
+
+    def success(self, channel):
+        """Records a successful pull on the channel"""
+        with self._lock:
+            self.failures = 0
+            self._update(channel, 1.0)
+
+    def failure(self, channel):
+        """Records a failed pull on the channel
+
+        :return: The seconds to wait before pulling again
+        :rtype: float
+        """
+        with self._lock:
+            self.failures += 1
+            self._update(channel, 0.0)
+            if self.failures == 1:
+                return 0
+            delay = min(
+                self.max_delay, self.base_delay * self.factor ** (self.failures - 2)
+            )
+        return delay * (1 - self.jitter * random.random())
+
+    def best_channel(self, current):
+        """
+        :return: The healthiest channel. Ties are broken by trying the channels after `current` first
+        :rtype: int
+        """
+        with self._lock:
+            count = len(self.health)
+            order = [(current + i) % count for i in range(1, count + 1)]
+            return max(order, key=lambda channel: self.health[channel])
@@ -0,0 +1,174 @@
+# -*- coding: UTF-8 -*-
+
+from __future__ import unicode_literals
+
+import functools
+import gzip
+import threading
+
+from ._util import *
+from ._checkpoint import DedupWindow
+import time
+
+
+class PullRecorder(object):
+    """Appends the pulls received while listening to a gzipped NDJSON file
+
+    Record with::
+
+        client.pull_recorder = PullRecorder("pulls.ndjson.gz")
+        client.listen()
+
+    Each line is a json object with the time of the pull, and the pulled json as
+    returned by Facebook. Replay the file with :class:`PullReplayer`.
+    """
+
+    def __init__(self, filename):
+        self.filename = filename
+        #: Number of pulls recorded
+        self.recorded = 0
+        self._lock = threading.Lock()
+        self._file = gzip.open(filename, "ab")
+
+    def record(self, content):
+        line = json.dumps({"time": time.time(), "pull": content}) + "\n"
+        with self._lock:
+            self._file.write(line.encode("utf-8"))
+            self._file.flush()
+            self.recorded += 1
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+
+
+def iter_pulls(filename):
+    """Yields the `(time, pull)` tuples recorded by a :class:`PullRecorder`"""
+    with gzip.open(filename, "rb") as f:
+        for line in f:
+            if line.strip():
+                entry = json.loads(line.decode("utf-8"))
+                yield entry["time"], entry["pull"]
+
+
+def count_events(content):
+    """Number of messages in a pull, including the ones in its batches"""
+    return len(content.get("ms", ())) + sum(
+        count_events(batch) for batch in content.get("batches", ())
+    )
+
+
+class ReplayStats(object):
+    """The results of :func:`PullReplayer.run`"""
+
+    def __init__(self):
+        #: Number of pulls replayed
+        self.pulls = 0
+        #: Number of messages in the pulls
+        self.events = 0
+        #: Seconds spent parsing and handling, excluding the pacing
+        self.seconds = 0.0
+        #: Number of calls of each event method
+        self.handler_calls = {}
+        #: Seconds spent in each event method
+        self.handler_seconds = {}
+
+    @property
+    def events_per_second(self):
+        return self.events / self.seconds if self.seconds else 0.0
+
+    def __repr__(self):
+        return "<ReplayStats: {} events in {:.3f}s, {:.0f} events/s>".format(
+            self.events, self.seconds, self.events_per_second
+        )
+
+
+class PullReplayer(object):
+    """Feeds pulls recorded by a :class:`PullRecorder` through a client's parser
+
+    Useful to profile event handlers, or as a benchmark of the parser::
+
+        stats = PullReplayer(client, "pulls.ndjson.gz").run()
+        print(stats.events_per_second, stats.handler_seconds)
+
+    Note that pulls are parsed like live ones, so e.g. `ForcedFetch` deltas still do
+    requests. Use a :class:`CassetteTransport` to avoid that.
+    """
+
+    def __init__(self, client, filename, realtime=False, speed=1.0):
+        """
+        :param client: The client whose parser and event methods are used
+        :param filename: The recorded file
+        :param realtime: Whether to wait between the pulls as long as when they were recorded, instead of running at full speed
+        :param speed: With `realtime`, how many times faster than recorded to replay
+        :type realtime: bool
+        :type speed: float
+        """
+        self.client = client
+        self.filename = filename
+        self.realtime = realtime
+        self.speed = speed
+
+    def _timed(self, stats, name, method):
+        @functools.wraps(method)
+        def timed(*args, **kwargs):
+            start = time.time()
+            try:
+                return method(*args, **kwargs)
+            finally:
+                stats.handler_calls[name] = stats.handler_calls.get(name, 0) + 1
+                stats.handler_seconds[name] = (
+                    stats.handler_seconds.get(name, 0.0) + time.time() - start
+                )
+
+        return timed
+
+    def run(self):
+        """Replays the file
+
+        :rtype: ReplayStats
+        """
+        client = self.client
+        stats = ReplayStats()
+        # Only the handled events are timed, so the events that listening skips are
+        # skipped here too
+        handled = set(client._handled_events)
+        names = [
+            name
+            for name in dir(client)
+            if name.startswith("on")
+            and callable(getattr(client, name))
+            and (name in handled or not client.skip_unhandled_events)
+        ]
+        assigned = vars(client)
+        overridden = dict((name, assigned[name]) for name in names if name in assigned)
+        for name in names:
+            setattr(client, name, self._timed(stats, name, getattr(client, name)))
+        sticky, pool, seen_mids = client.sticky, client.pool, client._seen_mids
+        client._seen_mids = DedupWindow(client.dedup_window_size)
+
+        try:
+            first_recorded = started = None
+            for recorded, content in iter_pulls(self.filename):
+                if self.realtime:
+                    if first_recorded is None:
+                        first_recorded, started = recorded, time.time()
+                    delay = (recorded - first_recorded) / self.speed - (
+                        time.time() - started
+                    )
+                    if delay > 0:
+                        time.sleep(delay)
+                start = time.time()
+                client._parseMessage(content)
+                stats.seconds += time.time() - start
+                stats.pulls += 1
+                stats.events += count_events(content)
+        finally:
+            for name in names:
+                if name in overridden:
+                    setattr(client, name, overridden[name])
+                else:
+                    delattr(client, name)
+            client.sticky, client.pool, client._seen_mids = sticky, pool, seen_mids
+
+        return stats
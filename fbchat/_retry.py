@@ -0,0 +1,182 @@
+# -*- coding: UTF-8 -*-
+
+from __future__ import unicode_literals
+
+import re
+import threading
+
+import requests
+
+from ._util import *
+import random
+
+#: Status codes retried by default
+RETRY_STATUS_CODES = frozenset([429, 500, 502, 503, 504])
+
+#: The urls that only read, so a request that may have been handled can be sent again.
+#: The default policy of a client retries network errors only on these
+IDEMPOTENT_URLS = (
+    ReqUrl.GRAPHQL,
+    ReqUrl.THREADS,
+    ReqUrl.MESSAGES,
+    ReqUrl.UNREAD_THREADS,
+    ReqUrl.UNSEEN_THREADS,
+    ReqUrl.INFO,
+    ReqUrl.ALL_USERS,
+    ReqUrl.SEARCH,
+    ReqUrl.SEARCH_MESSAGES,
+    ReqUrl.GET_POLL_OPTIONS,
+    ReqUrl.PLAN_INFO,
+    ReqUrl.ATTACHMENT_PHOTO,
+)
+
+_EDGE_CHAT = re.compile(r"^https://\d+-edge-chat\.")
+
+
+def endpoint(url):
+    """The endpoint of a url: The url without the query, and with the pull channel `0`
+
+    So e.g. all pull urls have the endpoint :attr:`ReqUrl.STICKY`
+    """
+    return _EDGE_CHAT.sub("https://0-edge-chat.", url.split("?", 1)[0])
+
+
+class RetryPolicy(object):
+    """Decides which failed requests are retried, and how long to wait before retrying
+
+    Used by every request of a client, except those done to log in::
+
+        client.retry_policy = RetryPolicy(
+            attempts=5, endpoints={ReqUrl.SEND: RetryPolicy(attempts=2)}
+        )
+
+    Responses with one of `status_codes` and Facebook errors with one of `error_codes`
+    are retried, waiting exponentially longer after each attempt. Network errors are
+    only retried with `retry_network_errors`, since the request may have been handled.
+    The expired session error (#1357004) is always handled, by renewing the session.
+    """
+
+    def __init__(
+        self,
+        attempts=3,
+        base_delay=0.5,
+        max_delay=8,
+        factor=2,
+        jitter=0.5,
+        status_codes=RETRY_STATUS_CODES,
+        error_codes=(),
+        retry_network_errors=False,
+        endpoints=None,
+    ):
+        """
+        :param attempts: Max. number of times a request is sent
+        :param base_delay: Seconds to wait before the first retry
+        :param max_delay: Max. seconds to wait before a retry
+        :param factor: How much the delay grows with each retry
+        :param jitter: Fraction of the delay that is random, so clients don't retry in lockstep
+        :param status_codes: HTTP status codes to retry
+        :param error_codes: Facebook error codes to retry
+        :param retry_network_errors: Whether to retry timeouts and connection errors. Note that a request may have been handled even though its response timed out
+        :param endpoints: :class:`RetryPolicy` objects used instead of this for some urls, e.g. `{ReqUrl.GRAPHQL: RetryPolicy(retry_network_errors=True)}`
+        :type attempts: int
+        :type endpoints: dict
+        """
+        self.attempts = attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.factor = factor
+        self.jitter = jitter
+        self.status_codes = frozenset(status_codes)
+        self.error_codes = frozenset(str(code) for code in error_codes)
+        self.retry_network_errors = retry_network_errors
+        self.endpoints = dict(
+            (endpoint(url), policy) for url, policy in (endpoints or {}).items()
+        )
+        #: Number of retries of each endpoint
+        self.retries = {}
+        self._lock = threading.Lock()
+
+    def for_endpoint(self, url):
+        """
+        :return: The policy used for requests to the url
+        :rtype: RetryPolicy
+        """
+        return self.endpoints.get(endpoint(url), self)
+
+    def is_retryable(self, exception):
+        """Whether a request that failed with the exception may be retried"""
+        if isinstance(exception, (requests.Timeout, requests.ConnectionError)):
+            return self.retry_network_errors
+        if isinstance(exception, FBchatFacebookError):
+            return exception.request_status_code in self.status_codes or (
+                str(exception.fb_error_code) in self.error_codes
+            )
+        return False
+
+    def delay(self, retry):
+        """
+        :param retry: The number of the retry, starting at 1
+        :return: The seconds to wait before the retry
+        :rtype: float
+        """
+        delay = min(self.max_delay, self.base_delay * self.factor ** (retry - 1))
+        return delay * (1 - self.jitter * random.random())
+
+    def record(self, url):
+        """Counts a retry of the url's endpoint"""
+        key = endpoint(url)
+        with self._lock:
+            self.retries[key] = self.retries.get(key, 0) + 1
+
+
+class RetryState(object):
+    """Decides what to do after each attempt of one request
+
+    Shared by :func:`Client._request` and :func:`AsyncClient._request`, which only
+    send the request, and renew the session, themselves
+    """
+
+    def __init__(self, retry_policy, url, error_retries=3):
+        """
+        :param retry_policy: The :class:`RetryPolicy` of the client
+        :param url: The url of the request
+        :param error_retries: How many times to renew the session, if it has expired
+        """
+        self.retry_policy = retry_policy
+        self.url = url
+        self.policy = retry_policy.for_endpoint(url)
+        self.error_retries = error_retries
+        #: The number of the attempt being made, starting at 1
+        self.attempt = 1
+
+    def retries_status(self, status_code):
+        """Whether a response that isn't checked for errors is retried"""
+        return (
+            status_code in self.policy.status_codes
+            and self.attempt < self.policy.attempts
+        )
+
+    def renews_session(self, exception):
+        """Whether the session must be renewed, and the request sent again right away"""
+        if self.error_retries > 0 and isinstance(exception, FBchatFacebookError):
+            if exception.fb_error_code == "1357004":
+                self.error_retries -= 1
+                return True
+        return False
+
+    def retries(self, exception):
+        """Whether a request that failed with the exception is retried"""
+        if self.attempt >= self.policy.attempts:
+            return False
+        return self.policy.is_retryable(exception)
+
+    def next(self):
+        """Counts a retry
+
+        :return: The seconds to wait before sending the request again
+        :rtype: float
+        """
+        self.retry_policy.record(self.url)
+        delay = self.policy.delay(self.attempt)
+        self.attempt += 1
+        return delay
@@ -857,7 +857,7 @@ def _do_send_request(client, data, get_thread_id=False):
     # update JS token if received in response
     fb_dtsg = get_jsmods_require(j, 2)
     if fb_dtsg is not None:
-        client.payloadDefault["fb_dtsg"] = fb_dtsg
+        client._updatePayloadDefault(fb_dtsg=fb_dtsg)
 
     try:
         message_ids = [
@@ -0,0 +1,173 @@
+# -*- coding: UTF-8 -*-
+
+from __future__ import unicode_literals
+
+import json
+import threading
+from os import path
+
+from ._util import *
+
+
+class SyncStore(object):
+    """Stores the watermarks of a :class:`ThreadSync`
+
+    Subclass this to keep them e.g. in a database. A watermark is the timestamp (in
+    ms) and the ID of the newest message that has been synced in a thread.
+    """
+
+    def get(self, thread_id):
+        """
+        :return: The `(timestamp, message_id)` watermark of the thread, or `None` if it was never synced
+        :rtype: tuple
+        """
+        raise NotImplementedError
+
+    def set(self, thread_id, timestamp, message_id):
+        """Stores the watermark of the thread"""
+        raise NotImplementedError
+
+    def cursor(self):
+        """
+        :return: The timestamp of the newest thread seen by the last complete :func:`ThreadSync.sync`, or `None` if no sync has completed
+        :rtype: int
+        """
+        raise NotImplementedError
+
+    def set_cursor(self, timestamp):
+        """Stores the cursor, once a :func:`ThreadSync.sync` has completed"""
+        raise NotImplementedError
+
+    def flush(self):
+        """Called at the end of every :func:`ThreadSync.sync`"""
+
+
+class MemorySyncStore(SyncStore):
+    """Keeps the watermarks in memory"""
+
+    def __init__(self, watermarks=None, cursor=None):
+        self._lock = threading.Lock()
+        self._watermarks = dict(watermarks or {})
+        self._cursor = cursor
+
+    def get(self, thread_id):
+        return self._watermarks.get(thread_id)
+
+    def set(self, thread_id, timestamp, message_id):
+        with self._lock:
+            self._watermarks[thread_id] = (timestamp, message_id)
+
+    def cursor(self):
+        return self._cursor
+
+    def set_cursor(self, timestamp):
+        self._cursor = timestamp
+
+
+class JSONSyncStore(MemorySyncStore):
+    """Keeps the watermarks in a JSON file, which is written on :func:`flush`"""
+
+    def __init__(self, filename):
+        self.filename = filename
+        watermarks, cursor = {}, None
+        if path.exists(filename):
+            with open(filename) as f:
+                j = json.load(f)
+            watermarks = {k: tuple(v) for k, v in j["watermarks"].items()}
+            cursor = j.get("cursor")
+        super(JSONSyncStore, self).__init__(watermarks, cursor)
+
+    def flush(self):
+        with self._lock:
+            j = {"watermarks": dict(self._watermarks), "cursor": self._cursor}
+        with open(self.filename, "w") as f:
+            json.dump(j, f)
+
+
+class ThreadSync(object):
+    """Fetches the messages sent since the last sync
+
+    Only the threads whose last message is newer than their watermark are fetched,
+    and only the messages newer than the watermark::
+
+        sync = ThreadSync(client, JSONSyncStore("watermarks.json"))
+        for thread, messages in sync.sync():
+            ...  # `messages` are the new messages in `thread`, newest first
+    """
+
+    def __init__(self, client, store=None, since=None, page_size=100):
+        """
+        :param client: The client to fetch the messages with
+        :param store: Where the watermarks are kept. Defaults to a :class:`MemorySyncStore`
+        :param since: Epoch (in ms) from which threads without a watermark are synced (default all messages)
+        :param page_size: Number of messages fetched per page
+        :type store: SyncStore
+        :type page_size: int
+        """
+        self.client = client
+        self.store = store or MemorySyncStore()
+        self.since = since
+        self.page_size = page_size
+
+    def _changed_threads(self, thread_location):
+        """
+        :return: The changed threads and their watermarks, and the newest timestamp of the threads scanned
+        """
+        after = self.store.cursor()
+        if after is None:
+            after = self.since
+        changed = []
+        newest = after
+        for thread in self.client.iterThreads(thread_location, after=after):
+            watermark = self.store.get(thread.uid)
+            timestamp = int(thread.last_message_timestamp)
+            newest = timestamp if newest is None else max(newest, timestamp)
+            if watermark is None:
+                if self.since is None or timestamp >= self.since:
+                    changed.append((thread, None))
+            elif timestamp > watermark[0]:
+                changed.append((thread, watermark))
+        return changed, newest
+
+    def _new_messages(self, thread_id, watermark):
+        if watermark is None:
+            after, last_id = self.since, None
+        else:
+            after, last_id = watermark
+        messages = self.client.iterThreadMessages(
+            thread_id, after=after, page_size=self.page_size
+        )
+        return [m for m in messages if m.uid != last_id]
+
+    def sync(self, thread_location=ThreadLocation.INBOX):
+        """Fetches the new messages, and moves the watermarks forward
+
+        The watermark of a thread is moved once its messages have been consumed, so
+        threads that weren't consumed are synced again next time. Only threads newer
+        than the store's cursor are scanned, and the cursor is only moved once every
+        changed thread has been consumed.
+
+        :param thread_location: models.ThreadLocation: INBOX, PENDING, ARCHIVED or OTHER
+        :return: Tuples of :class:`models.Thread` objects and lists of their new :class:`models.Message` objects
+        :rtype: generator
+        :raises: FBchatException if request failed
+        """
+        try:
+            changed, newest = self._changed_threads(thread_location)
+            for thread, watermark in changed:
+                messages = self._new_messages(thread.uid, watermark)
+                yield thread, messages
+                if messages:
+                    self.store.set(
+                        thread.uid, int(messages[0].timestamp), messages[0].uid
+                    )
+                else:
+                    self.store.set(
+                        thread.uid,
+                        int(thread.last_message_timestamp),
+                        watermark[1] if watermark else None,
+                    )
+            if newest is not None:
+                self.store.set_cursor(newest)
+        finally:
+            self.store.flush()
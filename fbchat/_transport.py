@@ -0,0 +1,425 @@
+# -*- coding: UTF-8 -*-
+
+from __future__ import unicode_literals
+
+import base64
+import json
+import threading
+from collections import deque
+
+import requests
+
+from ._util import *
+import time
+
+
+def make_response(status_code, content, url=None, headers=None, reason=None):
+    """Builds a `requests.Response`, for transports that don't use `requests`"""
+    r = requests.Response()
+    r.status_code = status_code
+    r.headers = requests.structures.CaseInsensitiveDict(headers or {})
+    r.url = url
+    r.reason = reason
+    r._content = content
+    r.encoding = requests.utils.get_encoding_from_headers(r.headers)
+    return r
+
+
+class Transport(object):
+    """Sends the HTTP requests of a :class:`Client`
+
+    Subclass this to change how requests are done. `get` and `post` take the same
+    arguments as `requests.Session.get` and `requests.Session.post`, and must return
+    `requests.Response` objects.
+    """
+
+    def get(self, url, **kwargs):
+        raise NotImplementedError
+
+    def post(self, url, **kwargs):
+        raise NotImplementedError
+
+    @property
+    def cookies(self):
+        """The session cookies, as a `requests.cookies.RequestsCookieJar`"""
+        raise NotImplementedError
+
+    @cookies.setter
+    def cookies(self, jar):
+        raise NotImplementedError
+
+    def reset(self):
+        """Forgets all session state. Called when the client logs out"""
+
+    def close(self):
+        """Releases the connections held by the transport"""
+
+
+class ConnectionStats(object):
+    """Counts the connections of a :class:`RequestsTransport`"""
+
+    def __init__(self):
+        #: Number of connections opened, including reconnections of dropped ones
+        self.created = 0
+        #: Number of requests sent on an already open connection
+        self.reused = 0
+        #: Number of connections closed as their pool was full or evicted, or dropped by the server
+        self.dropped = 0
+        self._lock = threading.Lock()
+
+    def _add(self, counter):
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def __repr__(self):
+        return "<ConnectionStats: {} created, {} reused, {} dropped>".format(
+            self.created, self.reused, self.dropped
+        )
+
+
+def _counting_pool(base, transport):
+    """Returns a subclass of a `urllib3` connection pool that updates the transport's stats"""
+
+    class CountingPool(base):
+        def _count(self, counter):
+            transport.stats._add(counter)
+            transport._host_stats(self.host)._add(counter)
+
+        def _new_conn(self):
+            self._count("created")
+            conn = super(CountingPool, self)._new_conn()
+            conn._fbchat_pooled = False
+            return conn
+
+        def _get_conn(self, timeout=None):
+            conn = super(CountingPool, self)._get_conn(timeout=timeout)
+            if getattr(conn, "_fbchat_pooled", False):
+                if getattr(conn, "sock", None) is None:
+                    # Closed after the server dropped it, and reopened when used
+                    self._count("dropped")
+                    self._count("created")
+                else:
+                    self._count("reused")
+            conn._fbchat_pooled = True
+            return conn
+
+        def _put_conn(self, conn):
+            if conn is not None and (self.pool is None or self.pool.full()):
+                self._count("dropped")
+            super(CountingPool, self)._put_conn(conn)
+
+        def _evict(self):
+            # Connections in use are counted when they're put back in the closed pool
+            for conn in list(self.pool.queue) if self.pool is not None else []:
+                if conn is not None and getattr(conn, "sock", None) is not None:
+                    self._count("dropped")
+            self.close()
+
+    CountingPool.__name__ = str("Counting" + base.__name__)
+    return CountingPool
+
+
+class _PoolAdapter(requests.adapters.HTTPAdapter):
+    def __init__(self, transport, pool_size, block, max_hosts):
+        self._transport = transport
+        super(_PoolAdapter, self).__init__(
+            pool_connections=max_hosts, pool_maxsize=pool_size, pool_block=block
+        )
+
+    def init_poolmanager(self, *args, **kwargs):
+        super(_PoolAdapter, self).init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = dict(
+            (scheme, _counting_pool(pool, self._transport))
+            for scheme, pool in self.poolmanager.pool_classes_by_scheme.items()
+        )
+        # Called when the pool of the least recently used host is evicted
+        self.poolmanager.pools.dispose_func = self._dispose
+
+    def _dispose(self, pool):
+        if self._closing:
+            pool.close()
+        else:
+            pool._evict()
+
+    def close(self):
+        self._closing = True
+        try:
+            super(_PoolAdapter, self).close()
+        finally:
+            self._closing = False
+
+    _closing = False
+
+
+class RequestsTransport(Transport):
+    """The default transport, which uses a `requests.Session`
+
+    Each host has its own pool of connections, which are kept open between requests.
+    Size the pools for the number of threads doing requests at the same time, or
+    connections are closed and opened again, see :attr:`stats`::
+
+        transport = RequestsTransport(
+            pool_size=20, host_pool_sizes={"upload.facebook.com": 4}
+        )
+        client = Client("<email>", "<password>", transport=transport)
+    """
+
+    def __init__(
+        self,
+        pool_size=10,
+        host_pool_sizes=None,
+        keep_alive=True,
+        block=False,
+        max_hosts=32,
+    ):
+        """
+        :param pool_size: Max. number of open connections kept for each host
+        :param host_pool_sizes: Pool sizes of specific hosts, e.g. `{"0-edge-chat.facebook.com": 1}`
+        :param keep_alive: Whether to keep connections open. If `False`, each request opens a new connection
+        :param block: Whether requests wait for a connection when a host's pool is used up, instead of opening another one
+        :param max_hosts: Max. number of hosts whose pools are kept. The client uses several hosts, e.g. `www`, `upload`, the pull channels and the CDN. When there are more, the pool of the least recently used host is closed
+        :type pool_size: int
+        :type host_pool_sizes: dict
+        :type keep_alive: bool
+        :type block: bool
+        :type max_hosts: int
+        """
+        self.pool_size = pool_size
+        self.host_pool_sizes = dict(host_pool_sizes or {})
+        self.keep_alive = keep_alive
+        self.block = block
+        self.max_hosts = max_hosts
+        #: The :class:`ConnectionStats` of all hosts
+        self.stats = ConnectionStats()
+        #: The :class:`ConnectionStats` of each host
+        self.host_stats = {}
+        self._stats_lock = threading.Lock()
+        self._session = self._new_session()
+
+    def _new_session(self):
+        session = requests.session()
+        for scheme in ("https://", "http://"):
+            adapter = _PoolAdapter(self, self.pool_size, self.block, self.max_hosts)
+            session.mount(scheme, adapter)
+        for host, size in self.host_pool_sizes.items():
+            adapter = _PoolAdapter(self, size, self.block, self.max_hosts)
+            session.mount("https://{}".format(host), adapter)
+        return session
+
+    def _host_stats(self, host):
+        with self._stats_lock:
+            if host not in self.host_stats:
+                self.host_stats[host] = ConnectionStats()
+            return self.host_stats[host]
+
+    def _headers(self, kwargs):
+        if not self.keep_alive:
+            kwargs["headers"] = dict(kwargs.get("headers") or {}, Connection="close")
+        return kwargs
+
+    def get(self, url, **kwargs):
+        return self._session.get(url, **self._headers(kwargs))
+
+    def post(self, url, **kwargs):
+        return self._session.post(url, **self._headers(kwargs))
+
+    @property
+    def cookies(self):
+        return self._session.cookies
+
+    @cookies.setter
+    def cookies(self, jar):
+        self._session.cookies = jar
+
+    def reset(self):
+        self._session.close()
+        self._session = self._new_session()
+
+    def close(self):
+        self._session.close()
+
+
+#: Payload keys that change between otherwise identical requests
+VOLATILE_PARAMS = frozenset(
+    [
+        "__req",
+        "__rev",
+        "__user",
+        "__a",
+        "ttstamp",
+        "fb_dtsg",
+        "clientid",
+        "timestamp",
+        "offline_threading_id",
+        "message_id",
+        "threading_id",
+        "watermarkTimestamp",
+        "seen_timestamp",
+        "last_action_timestamp",
+    ]
+)
+
+
+def _request_key(method, url, params=None, data=None, files=None, **kwargs):
+    fields = []
+    for values in (params, data):
+        if isinstance(values, dict):
+            fields.extend(
+                (str(k), str(v)) for k, v in values.items() if k not in VOLATILE_PARAMS
+            )
+    if files:
+        fields.extend((str(k), str(v[0])) for k, v in files.items())
+    return json.dumps([method, url, sorted(fields)])
+
+
+def _dump_response(r):
+    rtn = {
+        "status_code": r.status_code,
+        "reason": r.reason,
+        "url": r.url,
+        "headers": dict(r.headers),
+        "elapsed": r.elapsed.total_seconds(),
+    }
+    try:
+        rtn["text"] = r.content.decode("utf-8")
+    except UnicodeDecodeError:
+        rtn["base64"] = base64.b64encode(r.content).decode("ascii")
+    return rtn
+
+
+def _load_response(d):
+    if "text" in d:
+        content = d["text"].encode("utf-8")
+    else:
+        content = base64.b64decode(d["base64"])
+    return make_response(
+        d["status_code"],
+        content,
+        url=d["url"],
+        headers=d["headers"],
+        reason=d["reason"],
+    )
+
+
+class CassetteTransport(Transport):
+    """Records responses to a file, and replays them without touching the network
+
+    Record a session with::
+
+        transport = CassetteTransport("session.json", record=True)
+        client = Client("<email>", "<password>", transport=transport)
+        client.fetchThreadList()
+        transport.save()
+
+    And replay it offline, e.g. to benchmark::
+
+        transport = CassetteTransport("session.json", latency=0.05)
+        client = Client("<email>", "<password>", session_cookies=transport.cookies.get_dict(), transport=transport)
+        client.fetchThreadList()
+
+    Requests are matched on their method, url and parameters, ignoring values that
+    change every time (see :any:`VOLATILE_PARAMS`). Identical requests are answered in
+    the order they were recorded, and the last answer is repeated once they run out.
+    """
+
+    def __init__(self, path, record=False, latency=None, transport=None):
+        """
+        :param path: Path of the cassette file
+        :param record: Whether to do real requests and record them, instead of replaying
+        :param latency: Seconds to wait before each replayed response. If `None`, the recorded time is used
+        :param transport: The :class:`Transport` used while recording. Defaults to :class:`RequestsTransport`
+        :type latency: float
+        """
+        self.path = path
+        self.record = record
+        self.latency = latency
+        self._lock = threading.Lock()
+        if record:
+            self._transport = transport or RequestsTransport()
+            self._interactions = []
+        else:
+            self._load()
+
+    def _load(self):
+        with open(self.path) as f:
+            cassette = json.load(f)
+        self._cookies = requests.cookies.RequestsCookieJar()
+        for cookie in cassette["cookies"]:
+            self._cookies.set(**cookie)
+        self._responses = {}
+        for interaction in cassette["interactions"]:
+            self._responses.setdefault(interaction["request"], deque()).append(
+                interaction["response"]
+            )
+
+    def save(self):
+        """Writes the recorded requests and the current cookies to the cassette file"""
+        with self._lock:
+            cassette = {
+                "cookies": [
+                    {
+                        "name": c.name,
+                        "value": c.value,
+                        "domain": c.domain,
+                        "path": c.path,
+                    }
+                    for c in self.cookies
+                ],
+                "interactions": list(self._interactions),
+            }
+        with open(self.path, "w") as f:
+            json.dump(cassette, f, indent=1)
+
+    def _request(self, method, url, **kwargs):
+        key = _request_key(method, url, **kwargs)
+        if self.record:
+            if method == "GET":
+                r = self._transport.get(url, **kwargs)
+            else:
+                r = self._transport.post(url, **kwargs)
+            with self._lock:
+                self._interactions.append(
+                    {"request": key, "response": _dump_response(r)}
+                )
+            return r
+
+        with self._lock:
+            responses = self._responses.get(key)
+            if not responses:
+                raise FBchatException(
+                    "No recorded response for {} {}".format(method, url)
+                )
+            response = responses.popleft() if len(responses) > 1 else responses[0]
+        latency = self.latency
+        if latency is None:
+            latency = response["elapsed"]
+        if latency > 0:
+            time.sleep(latency)
+        return _load_response(response)
+
+    def get(self, url, **kwargs):
+        return self._request("GET", url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self._request("POST", url, **kwargs)
+
+    @property
+    def cookies(self):
+        if self.record:
+            return self._transport.cookies
+        return self._cookies
+
+    @cookies.setter
+    def cookies(self, jar):
+        if self.record:
+            self._transport.cookies = jar
+        else:
+            self._cookies = jar
+
+    def reset(self):
+        if self.record:
+            self._transport.reset()
+
+    def close(self):
+        if self.record:
+            self._transport.close()
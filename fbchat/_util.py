@@ -10,10 +10,16 @@ from mimetypes import guess_type
 from os.path import basename
 import warnings
 import logging
+import threading
 import requests
 import aenum
 from .models import *
 
+try:
+    import queue
+except ImportError:
+    import Queue as queue
+
 try:
     from urllib.parse import urlencode, parse_qs, urlparse
 
@@ -375,3 +381,46 @@ def get_url_parameters(url, *args):
 
 def get_url_parameter(url, param):
     return get_url_parameters(url, param)[0]
+
+
+def iter_prefetched(iterable, depth=1):
+    """Iterates over `iterable` in a background thread, staying up to `depth` items ahead
+
+    Exceptions raised by `iterable` are re-raised in the consumer. Closing the returned
+    generator stops the background thread after the item it's currently producing.
+    """
+    items = queue.Queue(maxsize=depth)
+    stop = threading.Event()
+
+    def put(item):
+        while not stop.is_set():
+            try:
+                items.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def produce():
+        try:
+            for item in iterable:
+                if not put((item, None)):
+                    return
+        except Exception as e:
+            put((None, e))
+        else:
+            put((None, StopIteration()))
+
+    thread = threading.Thread(target=produce)
+    thread.daemon = True
+    thread.start()
+    try:
+        while True:
+            item, error = items.get()
+            if isinstance(error, StopIteration):
+                return
+            if error is not None:
+                raise error
+            yield item
+    finally:
+        stop.set()
@@ -8,7 +8,12 @@ transitioning to a better code structure.
 from __future__ import unicode_literals
 
 from ._core import Enum
-from ._exception import FBchatException, FBchatFacebookError, FBchatUserError
+from ._exception import (
+    FBchatException,
+    FBchatFacebookError,
+    FBchatUserError,
+    FBchatRateLimitError,
+)
 from ._thread import ThreadType, ThreadLocation, ThreadColor, Thread
 from ._user import TypingStatus, User, ActiveStatus
 from ._group import Group, Room
@@ -0,0 +1,195 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import unicode_literals
+
+import pytest
+
+aiohttp = pytest.importorskip("aiohttp")
+
+import asyncio
+import json
+from aiohttp import web
+from utils import FakeTransport, FakeMessenger
+from fbchat import AsyncClient
+from fbchat._async import _LoopTransport
+from fbchat._util import ReqUrl
+
+
+async def echo(request):
+    data = await request.post()
+    response = web.json_response(
+        {
+            "method": request.method,
+            "query": dict(request.query),
+            "data": {
+                k: v if isinstance(v, str) else v.filename for k, v in data.items()
+            },
+            "cookie": request.cookies.get("c_user"),
+        }
+    )
+    response.set_cookie("c_user", "1234")
+    return response
+
+
+@pytest.fixture
+def server():
+    loop = asyncio.new_event_loop()
+    app = web.Application()
+    app.router.add_route("*", "/", echo)
+    runner = web.AppRunner(app)
+    loop.run_until_complete(runner.setup())
+    site = web.TCPSite(runner, "localhost", 0)
+    loop.run_until_complete(site.start())
+    port = site._server.sockets[0].getsockname()[1]
+    yield loop, "http://localhost:{}/".format(port)
+    loop.run_until_complete(runner.cleanup())
+    loop.close()
+
+
+@pytest.mark.offline
+def test_loop_session(server):
+    loop, url = server
+    session = _LoopTransport(loop)
+
+    def requests():
+        r1 = session.get(url, params={"a": 1, "b": None})
+        r2 = session.post(
+            url,
+            headers={"Content-Type": "application/x-www-form-urlencoded"},
+            data={"x": "y"},
+        )
+        r3 = session.post(url, data={"x": "y"}, files={"upload_0": ("f.txt", b"hi")})
+        return r1, r2, r3, session.cookies.get_dict()
+
+    r1, r2, r3, cookies = loop.run_until_complete(loop.run_in_executor(None, requests))
+    assert r1.ok and r1.json() == {
+        "method": "GET",
+        "query": {"a": "1"},
+        "data": {},
+        "cookie": None,
+    }
+    assert r2.json()["data"] == {"x": "y"}
+    assert r2.json()["cookie"] == "1234"
+    assert r3.json()["data"] == {"x": "y", "upload_0": "f.txt"}
+    assert cookies == {"c_user": "1234"}
+    loop.run_until_complete(session._close())
+
+
+class FakeLoopTransport(_LoopTransport):
+    """Answers like :class:`FakeTransport`, after a delay on the loop"""
+
+    def __init__(self, loop, routes):
+        super(FakeLoopTransport, self).__init__(loop)
+        self.fake = FakeTransport(routes)
+        self.in_flight = 0
+        self.peak = 0
+
+    async def _answer(self, method, url, **kwargs):
+        self.in_flight += 1
+        self.peak = max(self.peak, self.in_flight)
+        try:
+            await asyncio.sleep(0.01)
+            return self.fake._request(method, url, **kwargs)
+        finally:
+            self.in_flight -= 1
+
+    async def get_async(self, url, **kwargs):
+        return await self._answer("GET", url, **kwargs)
+
+    async def post_async(self, url, **kwargs):
+        return await self._answer("POST", url, **kwargs)
+
+    @property
+    def cookies(self):
+        return self.fake.cookies
+
+    @cookies.setter
+    def cookies(self, jar):
+        self.fake.cookies = jar
+
+
+def create(client_class=AsyncClient, transport=None, routes=None, **kwargs):
+    return client_class.create(
+        "<email>",
+        "<password>",
+        session_cookies={"c_user": "1234"},
+        transport=transport or FakeTransport(routes),
+        **kwargs
+    )
+
+
+def run(coro):
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(coro)
+    finally:
+        loop.close()
+
+
+@pytest.mark.offline
+def test_create():
+    async def main():
+        messenger = FakeMessenger({"1": [1, 2], "2": [3]})
+        fbids = {"thread_fbids": ["2"], "other_user_fbids": []}
+        body = json.dumps({"payload": {"unread_thread_fbids": [fbids]}})
+        routes = {ReqUrl.GRAPHQL: messenger, ReqUrl.UNREAD_THREADS: lambda **k: body}
+        client = await create(routes=routes)
+        assert client.uid == "1234"
+        threads = await client.fetchThreadList()
+        messages = await client.fetchThreadMessages("1")
+        # Not in `LOOP_METHODS`, so run on a worker thread
+        unread = await client.fetchUnread()
+        await client.close()
+        return threads, messages, unread
+
+    threads, messages, unread = run(main())
+    assert [thread.uid for thread in threads] == ["2", "1"]
+    assert [message.uid for message in messages] == ["1.2", "1.1"]
+    assert unread == ["2"]
+
+
+@pytest.mark.offline
+def test_requests_stay_on_loop():
+    async def main():
+        loop = asyncio.get_event_loop()
+        messenger = FakeMessenger({"1": [1]})
+        transport = FakeLoopTransport(loop, {ReqUrl.GRAPHQL: messenger})
+        client = await create(transport=transport, max_workers=2)
+        results = await asyncio.gather(*[client.fetchThreadList() for _ in range(200)])
+        client._executor.shutdown(wait=False)
+        return transport, results
+
+    transport, results = run(main())
+    assert len(results) == 200
+    # Far more requests are in flight than there are worker threads
+    assert transport.peak > 100
+
+
+class Echo(AsyncClient):
+    async def onMessage(self, mid=None, message_object=None, **kwargs):
+        await asyncio.sleep(0)
+        self.received.append((mid, message_object.text))
+
+
+@pytest.mark.offline
+def test_coroutine_event_handlers():
+    metadata = {
+        "messageId": "mid.1",
+        "actorFbId": 4321,
+        "timestamp": "1500",
+        "threadKey": {"otherUserFbId": 4321},
+    }
+    delta = {"class": "NewMessage", "body": "Hi", "messageMetadata": metadata}
+    pull = json.dumps({"seq": 1, "ms": [{"type": "delta", "delta": delta}]})
+
+    async def main():
+        client = await create(Echo, routes={ReqUrl.STICKY: lambda **kwargs: pull})
+        client.received = []
+        client.setActiveStatus(False)
+        client.startListening()
+        await client.doOneListen()
+        client.stopListening()
+        await client.close()
+        return client.received
+
+    assert run(main()) == [("mid.1", "Hi")]
@@ -0,0 +1,84 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import unicode_literals
+
+import json
+import pytest
+
+from concurrent.futures import ThreadPoolExecutor
+from utils import offline_client, graphql_response
+from fbchat import GraphQLBatcher
+from fbchat.graphql import GraphQL
+from fbchat.models import FBchatFacebookError
+from fbchat._util import ReqUrl
+
+
+def echo(data, **kwargs):
+    queries = json.loads(data["queries"])
+    return graphql_response(
+        *[queries["q{}".format(i)]["query_params"] for i in range(len(queries))]
+    )
+
+
+@pytest.fixture
+def client():
+    client = offline_client({ReqUrl.GRAPHQL: echo})
+    client.graphql_batcher = GraphQLBatcher(client, window=0.1)
+    return client
+
+
+def graphql_posts(client):
+    return [r for r in client._transport.requests if r[1] == ReqUrl.GRAPHQL]
+
+
+@pytest.mark.offline
+def test_batch_from_threads(client):
+    with ThreadPoolExecutor(10) as executor:
+        results = list(
+            executor.map(
+                lambda i: client.graphql_request(GraphQL(doc_id="1", params={"i": i})),
+                range(10),
+            )
+        )
+    assert results == [{"i": i} for i in range(10)]
+    assert len(graphql_posts(client)) == 1
+    assert client.graphql_batcher.batches_sent == 1
+    assert client.graphql_batcher.queries_sent == 10
+
+
+@pytest.mark.offline
+def test_batch_max_size(client):
+    client.graphql_batcher.max_size = 2
+    queries = [GraphQL(doc_id="1", params={"i": i}) for i in range(3)]
+    assert client.graphql_requests(*queries) == tuple({"i": i} for i in range(3))
+    assert len(graphql_posts(client)) == 2
+
+
+def echo_or_fail(data, **kwargs):
+    queries = json.loads(data["queries"])
+    results = []
+    for i in range(len(queries)):
+        params = queries["q{}".format(i)]["query_params"]
+        if params.get("fail"):
+            error = {"code": 1675004, "debug_info": "Invalid query"}
+            results.append({"q{}".format(i): {"error": error}})
+        else:
+            results.append({"q{}".format(i): {"data": params}})
+    body = "".join(json.dumps(r) for r in results)
+    return body + json.dumps({"successful_results": 1, "error_results": 1})
+
+
+@pytest.mark.offline
+def test_batch_query_error():
+    client = offline_client({ReqUrl.GRAPHQL: echo_or_fail})
+    client.graphql_batcher = GraphQLBatcher(client, window=0.1)
+    queries = [
+        GraphQL(doc_id="1", params={"i": 1}),
+        GraphQL(doc_id="1", params={"fail": True}),
+    ]
+    with ThreadPoolExecutor(2) as executor:
+        futures = [executor.submit(client.graphql_request, q) for q in queries]
+    assert futures[0].result() == {"i": 1}
+    with pytest.raises(FBchatFacebookError):
+        futures[1].result()
+    assert len(graphql_posts(client)) == 1
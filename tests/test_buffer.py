@@ -0,0 +1,85 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import unicode_literals
+
+import threading
+import pytest
+
+from utils import offline_client
+from fbchat import BufferPolicy, EventBuffer, ThreadedListener
+
+
+def typing(thread_id, st=1):
+    return {"type": "ttyp", "thread_fbid": thread_id, "from": "1", "st": st}
+
+
+def message(mid):
+    metadata = {"messageId": mid, "threadKey": {"otherUserFbId": 1}}
+    delta = {"class": "NewMessage", "messageMetadata": metadata}
+    return {"type": "delta", "delta": delta}
+
+
+def drain(buffer):
+    buffer.close()
+    return list(iter(buffer.get, None))
+
+
+@pytest.mark.offline
+def test_drop_oldest():
+    buffer = EventBuffer(2, BufferPolicy.DROP_OLDEST)
+    for mid in ("1", "2", "3"):
+        assert buffer.put(message(mid))
+    mids = [m["delta"]["messageMetadata"]["messageId"] for _, m in drain(buffer)]
+    assert mids == ["2", "3"]
+    assert (buffer.enqueued, buffer.dropped) == (3, 1)
+
+
+@pytest.mark.offline
+def test_drop_by_type():
+    buffer = EventBuffer(2, BufferPolicy.DROP_BY_TYPE)
+    buffer.put(typing("1"))
+    buffer.put(message("1"))
+    # The typing event is dropped to make room
+    assert buffer.put(message("2"))
+    # The new typing event is dropped, since no other is queued
+    assert not buffer.put(typing("2"))
+    assert [m["type"] for _, m in drain(buffer)] == ["delta", "delta"]
+    assert (buffer.enqueued, buffer.dropped) == (3, 2)
+
+
+@pytest.mark.offline
+def test_coalesce():
+    buffer = EventBuffer(10, BufferPolicy.COALESCE)
+    buffer.put(typing("1", st=1))
+    buffer.put(message("1"))
+    buffer.put(typing("1", st=0))
+    buffer.put(typing("2"))
+    items = [m for _, m in drain(buffer)]
+    assert items == [typing("1", st=0), message("1"), typing("2")]
+    assert (buffer.enqueued, buffer.coalesced) == (3, 1)
+
+
+@pytest.mark.offline
+def test_block():
+    buffer = EventBuffer(1)
+    buffer.put(message("1"))
+    put = threading.Thread(target=buffer.put, args=(message("2"),))
+    put.start()
+    put.join(0.05)
+    assert put.is_alive()
+    buffer.get()
+    put.join(1)
+    assert not put.is_alive()
+    assert len(buffer) == 1
+
+
+@pytest.mark.offline
+def test_threaded_listener_counters():
+    client = offline_client()
+    listener = ThreadedListener(
+        client, workers=1, queue_size=1, policy=BufferPolicy.DROP_OLDEST
+    )
+    for thread_id in ("1", "2", "3"):
+        listener.put(typing(thread_id))
+    assert (listener.enqueued, listener.dropped, listener.coalesced) == (3, 2, 0)
+    assert listener.queue_depth == 1
@@ -0,0 +1,75 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import unicode_literals
+
+import json
+import pytest
+
+from utils import offline_client, graphql_response, thread_node
+from fbchat import EntityCache
+from fbchat._util import ReqUrl
+
+
+def thread_info(data, **kwargs):
+    queries = json.loads(data["queries"])
+    ids = [queries["q{}".format(i)]["query_params"]["id"] for i in range(len(queries))]
+    return graphql_response(*[{"message_thread": thread_node(i, 1)} for i in ids])
+
+
+def delta(**kwargs):
+    metadata = {
+        "messageId": "mid.1",
+        "actorFbId": "1234",
+        "timestamp": "1",
+        "threadKey": {"threadFbId": "1"},
+    }
+    return {"delta": dict(messageMetadata=metadata, **kwargs)}
+
+
+@pytest.fixture
+def client():
+    client = offline_client({ReqUrl.GRAPHQL: thread_info})
+    client.entity_cache = EntityCache(max_size=2)
+    return client
+
+
+def graphql_posts(client):
+    return [r for r in client._transport.requests if r[1] == ReqUrl.GRAPHQL]
+
+
+@pytest.mark.offline
+def test_cache_hit(client):
+    assert list(client.fetchGroupInfo("1", "2")) == ["1", "2"]
+    assert list(client.fetchGroupInfo("1")) == ["1"]
+    assert len(graphql_posts(client)) == 1
+    assert client.entity_cache.hits == 1
+
+
+@pytest.mark.offline
+def test_cache_lru(client):
+    client.fetchGroupInfo("1", "2")
+    client.fetchGroupInfo("1")
+    client.fetchGroupInfo("3")
+    assert client.entity_cache.get("2") is None
+    assert client.entity_cache.get("1") is not None
+
+
+@pytest.mark.offline
+def test_cache_ttl(client):
+    client.entity_cache.ttl = 0
+    client.fetchGroupInfo("1")
+    client.fetchGroupInfo("1")
+    assert len(graphql_posts(client)) == 2
+
+
+@pytest.mark.offline
+def test_cache_events(client):
+    client.fetchGroupInfo("1")
+    client._parseDelta(delta(**{"class": "ThreadName", "name": "New title"}))
+    assert client.fetchGroupInfo("1")["1"].name == "New title"
+
+    added = [{"userFbId": "5"}]
+    client._parseDelta(
+        delta(**{"class": "ParticipantsAddedToGroupThread", "addedParticipants": added})
+    )
+    assert client.entity_cache.get("1") is None
@@ -0,0 +1,75 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import unicode_literals
+
+import json
+import pytest
+
+from utils import offline_client
+from fbchat import Client, JSONCheckpointStore
+from fbchat._checkpoint import DedupWindow
+
+
+class RecordingClient(Client):
+    def onMessage(self, mid=None, **kwargs):
+        self.mids.append(mid)
+
+
+def new_message(mid):
+    metadata = {
+        "messageId": mid,
+        "actorFbId": 1234,
+        "timestamp": "1500",
+        "threadKey": {"otherUserFbId": 4321},
+    }
+    return {
+        "type": "delta",
+        "delta": {"class": "NewMessage", "messageMetadata": metadata},
+    }
+
+
+def listening_client(filename, pulls):
+    client = offline_client(client_class=RecordingClient)
+    client.mids = []
+    client.checkpoint_store = JSONCheckpointStore(filename)
+    client.setActiveStatus(False)
+    client._transport.routes[client.req_url.STICKY] = lambda **kwargs: json.dumps(
+        pulls.pop(0)
+    )
+    return client
+
+
+@pytest.mark.offline
+def test_dedup_window():
+    window = DedupWindow(size=2)
+    assert window.add("a") and window.add("b")
+    assert not window.add("a")
+    assert window.add("c")
+    assert "a" not in window
+    assert list(window) == ["b", "c"]
+
+
+@pytest.mark.offline
+def test_resume(tmpdir):
+    filename = str(tmpdir.join("checkpoint.json"))
+    lb_info = {"sticky": "token", "pool": "pool"}
+    first = listening_client(
+        filename, [{"seq": 5, "lb_info": lb_info, "ms": [new_message("mid.1")]}]
+    )
+    first.startListening()
+    first.doOneListen()
+    first.stopListening()
+    assert first.mids == ["mid.1"]
+
+    # The restarted client gets mid.1 again
+    pull = {"seq": 6, "ms": [new_message("mid.1"), new_message("mid.2")]}
+    second = listening_client(filename, [pull])
+    second.startListening()
+    assert (second.seq, second.sticky, second.pool) == (5, "token", "pool")
+    second.doOneListen()
+    second.stopListening()
+    assert second.mids == ["mid.2"]
+
+    method, url, kwargs = second._transport.requests[-1]
+    assert kwargs["params"]["seq"] == 5
+    assert kwargs["params"]["sticky_token"] == "token"
@@ -0,0 +1,75 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import unicode_literals
+
+import json
+import threading
+import pytest
+
+from utils import offline_client
+from fbchat._util import ReqUrl
+
+URL = "https://www.facebook.com/test"
+
+
+def run_threads(target, count):
+    threads = [threading.Thread(target=target) for _ in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+
+@pytest.mark.offline
+def test_request_counter():
+    client = offline_client({URL: lambda **kwargs: "{}"})
+    start = client.req_counter
+
+    def post():
+        for _ in range(50):
+            client._post(URL)
+
+    run_threads(post, 8)
+    requests = client._transport.requests
+    counters = [kwargs["data"]["__req"] for _, url, kwargs in requests if url == URL]
+    assert len(set(counters)) == 400
+    assert client.req_counter == start + 400
+
+
+@pytest.mark.offline
+def test_session_renewed_once():
+    failed = set()
+    barrier = threading.Barrier(8)
+
+    def route(**kwargs):
+        name = threading.current_thread().name
+        if name not in failed:
+            failed.add(name)
+            barrier.wait()
+            return json.dumps({"error": "1357004", "errorDescription": "Expired"})
+        return json.dumps({"payload": "ok"})
+
+    client = offline_client({URL: route})
+    payload_default = client.payloadDefault
+    results = []
+
+    def post():
+        results.append(client._post(URL, fix_request=True, as_json=True))
+
+    run_threads(post, 8)
+    assert results == [{"payload": "ok"}] * 8
+    requests = client._transport.requests
+    base_requests = [url for _, url, _ in requests if url == ReqUrl.BASE]
+    # Once when the client was created, and once to renew the session
+    assert len(base_requests) == 2
+    assert client.payloadDefault is not payload_default
+    assert client.payloadDefault == payload_default
+
+
+@pytest.mark.offline
+def test_update_payload_default():
+    client = offline_client()
+    payload_default = client.payloadDefault
+    client._updatePayloadDefault(fb_dtsg="new")
+    assert client.payloadDefault["fb_dtsg"] == "new"
+    assert payload_default["fb_dtsg"] == "AQH0"
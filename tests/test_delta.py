@@ -0,0 +1,130 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import unicode_literals
+
+import pytest
+
+from utils import offline_client
+from fbchat import Client, DeltaRegistry
+from fbchat.models import ThreadType, ThreadColor, FBchatUserError
+
+
+class RecordingClient(Client):
+    def onMessage(self, **kwargs):
+        self.received.append(("onMessage", kwargs))
+
+    def onColorChange(self, **kwargs):
+        self.received.append(("onColorChange", kwargs))
+
+    def onUnknownMesssageType(self, **kwargs):
+        self.received.append(("onUnknownMesssageType", kwargs))
+
+
+def delta(**kwargs):
+    metadata = {
+        "messageId": "mid.1",
+        "actorFbId": 1234,
+        "timestamp": "1500",
+        "threadKey": {"otherUserFbId": 4321},
+    }
+    return {"type": "delta", "delta": dict(messageMetadata=metadata, **kwargs)}
+
+
+@pytest.fixture
+def client():
+    client = offline_client(client_class=RecordingClient)
+    client.received = []
+    return client
+
+
+@pytest.mark.offline
+def test_new_message(client):
+    client._parseDelta(delta(**{"class": "NewMessage", "body": "Hi"}))
+    ((name, kwargs),) = client.received
+    assert name == "onMessage"
+    assert kwargs["message_object"].text == "Hi"
+    assert kwargs["message_object"].emoji_size is None
+    assert kwargs["thread_id"] == "4321"
+    assert kwargs["thread_type"] == ThreadType.USER
+    assert kwargs["ts"] == 1500
+
+
+@pytest.mark.offline
+def test_lookup_by_type(client):
+    untyped = {"theme_color": "FF44BEC7"}
+    m = delta(**{"class": "AdminTextMessage", "type": "change_thread_theme"})
+    m["delta"]["untypedData"] = untyped
+    client._parseDelta(m)
+    ((name, kwargs),) = client.received
+    assert name == "onColorChange"
+    assert kwargs["new_color"] == ThreadColor.VIKING
+
+
+@pytest.mark.offline
+def test_unknown(client):
+    client._parseDelta(delta(**{"class": "Unknown"}))
+    assert client.received[0][0] == "onUnknownMesssageType"
+
+
+@pytest.mark.offline
+def test_custom_parser(client):
+    def parse_custom(client, m, delta):
+        client.received.append(("custom", delta["type"]))
+
+    client.delta_parsers.register(parse_custom, delta_class="NewMessage")
+    client._parseDelta(delta(**{"class": "NewMessage", "type": "custom"}))
+    assert client.received == [("custom", "custom")]
+    # Other clients are unaffected
+    assert (
+        offline_client().delta_parsers.lookup({"class": "NewMessage"})
+        is not parse_custom
+    )
+
+
+@pytest.mark.offline
+def test_register_needs_key():
+    with pytest.raises(FBchatUserError):
+        DeltaRegistry().register(lambda client, m, delta: None)
+
+
+@pytest.mark.offline
+def test_skip_unhandled():
+    client = offline_client()
+    parsed = []
+    spy = lambda client, m, delta: parsed.append(delta)
+    client.delta_parsers.register(spy, delta_class="NewMessage", handlers=["onMessage"])
+
+    client._parseDelta(delta(**{"class": "NewMessage"}))
+    assert parsed == []
+
+    client.subscribe("onMessage")
+    client._parseDelta(delta(**{"class": "NewMessage"}))
+    assert len(parsed) == 1
+
+    client.unsubscribe("onMessage")
+    client._parseDelta(delta(**{"class": "NewMessage"}))
+    assert len(parsed) == 1
+
+    client.skip_unhandled_events = False
+    client._parseDelta(delta(**{"class": "NewMessage"}))
+    assert len(parsed) == 2
+
+
+@pytest.mark.offline
+def test_handled_events(client):
+    assert {"onMessage", "onColorChange"} <= client._handled_events
+    assert "onTyping" not in client._handled_events
+
+
+@pytest.mark.offline
+def test_instance_handler():
+    client = offline_client()
+    received = []
+    client.onMessage = lambda **kwargs: received.append(kwargs["mid"])
+    client._parseMessageItem(delta(**{"class": "NewMessage", "body": "Hi"}))
+    assert received == ["mid.1"]
+
+    del client.onMessage
+    client._parseMessageItem(delta(**{"class": "NewMessage", "body": "Hi"}))
+    assert received == ["mid.1"]
+    assert "onMessage" not in client._handled_events
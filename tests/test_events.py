@@ -0,0 +1,99 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import unicode_literals
+
+import json
+import pytest
+
+from utils import offline_client
+from fbchat import Client, Event, MessageEvent, TypingEvent
+from fbchat._events import EventStream
+from fbchat.models import ThreadType, TypingStatus
+
+
+def typing(thread_id):
+    return {"type": "ttyp", "thread_fbid": thread_id, "from": "1", "st": 1}
+
+
+def message(mid, body):
+    metadata = {
+        "messageId": mid,
+        "actorFbId": 1234,
+        "timestamp": "1500",
+        "threadKey": {"otherUserFbId": 4321},
+    }
+    delta = {"class": "NewMessage", "body": body, "messageMetadata": metadata}
+    return {"type": "delta", "delta": delta}
+
+
+def listening_client(pulls, client_class=Client):
+    client = offline_client(client_class=client_class)
+    client.setActiveStatus(False)
+
+    def pull(**kwargs):
+        if not pulls:
+            client.listening = False
+            return json.dumps({"seq": 1})
+        return json.dumps({"seq": 1, "ms": pulls.pop(0)})
+
+    client._transport.routes[client.req_url.STICKY] = pull
+    return client
+
+
+@pytest.mark.offline
+def test_events():
+    pulls = [[typing("1"), message("mid.1", "Hi")], [{"type": "qprimer", "made": 1}]]
+    client = listening_client(pulls)
+    events = list(client.events())
+    assert [event.name for event in events] == ["onTyping", "onMessage", "onQprimer"]
+    typing_event, message_event, qprimer = events
+
+    assert isinstance(typing_event, TypingEvent)
+    assert typing_event.thread_id == "1"
+    assert typing_event.thread_type == ThreadType.GROUP
+    assert typing_event.status == TypingStatus.TYPING
+
+    assert isinstance(message_event, MessageEvent)
+    assert message_event.message_object.text == "Hi"
+    assert (message_event.mid, message_event.thread_id) == ("mid.1", "4321")
+    assert message_event.msg is None
+    with pytest.raises(AttributeError):
+        message_event.metadata
+
+    assert type(qprimer) is Event
+    assert qprimer.ts == 1
+    assert qprimer.data == {"ts": 1}
+
+    # Listening stopped, and the event methods are restored
+    assert not client.listening
+    assert not [name for name in vars(client) if name.startswith("on")]
+    assert "onTyping" not in client._handled_events
+
+
+@pytest.mark.offline
+def test_events_filter_and_keep_raw():
+    class TypingClient(Client):
+        def onTyping(self, **kwargs):
+            self.typing += 1
+
+    pulls = [[typing("1"), message("mid.1", "Hi"), typing("2")]]
+    client = listening_client(pulls, client_class=TypingClient)
+    client.typing = 0
+    events = list(client.events(types=[TypingEvent, "onQprimer"], keep_raw=True))
+    assert [event.thread_id for event in events] == ["1", "2"]
+    assert events[0].msg == typing("1")
+    # The overridden methods are still called
+    assert client.typing == 2
+
+
+@pytest.mark.offline
+def test_event_stream_buffer():
+    client = offline_client()
+    stream = EventStream(client, buffer_size=2)
+    for thread_id in ("1", "2", "3"):
+        client._parseMessageItem(typing(thread_id))
+    assert (len(stream), stream.dropped) == (2, 1)
+    assert stream.pop().thread_id == "2"
+    assert stream.pop().thread_id == "3"
+    assert stream.pop() is None
+    stream.close()
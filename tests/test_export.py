@@ -0,0 +1,49 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import unicode_literals
+
+import time
+import pytest
+
+from utils import offline_client, FakeMessenger
+from fbchat import HistoryExporter
+from fbchat._util import ReqUrl
+
+
+@pytest.fixture
+def messenger():
+    return FakeMessenger({str(i): list(range(i * 10)) for i in range(1, 9)})
+
+
+@pytest.mark.offline
+def test_export(messenger):
+    client = offline_client({ReqUrl.GRAPHQL: messenger})
+    pages = {}
+    batchers = set()
+
+    def sink(thread_id, messages):
+        pages.setdefault(thread_id, []).extend(m.uid for m in messages)
+        batchers.add(client.graphql_batcher)
+
+    counts = HistoryExporter(client, workers=8, page_size=20).export(sink)
+
+    assert counts == {str(i): i * 10 for i in range(1, 9)}
+    for thread_id, timestamps in messenger.threads.items():
+        expected = ["{}.{}".format(thread_id, t) for t in reversed(timestamps)]
+        assert pages[thread_id] == expected
+    # One thread list request, and the pages of the threads are batched together
+    batch_sizes = [len(batch) for batch in messenger.batches]
+    assert len(batch_sizes) < sum(batch_sizes)
+    # The other requests of the client aren't batched meanwhile
+    assert batchers == {None}
+    assert client.graphql_batcher is None
+
+
+@pytest.mark.offline
+def test_export_max_rate(messenger):
+    client = offline_client({ReqUrl.GRAPHQL: messenger})
+    exporter = HistoryExporter(client, workers=4, max_rate=50, page_size=100)
+    start = time.time()
+    exporter.export(lambda thread_id, messages: None, thread_ids=["1", "2", "3"])
+    # 3 pages, spaced by 1/50 second
+    assert time.time() - start >= 0.04
@@ -6,7 +6,8 @@ import pytest
 
 from os import path
 from fbchat.models import ThreadType, Message, Mention, EmojiSize, Sticker
-from utils import subset, STICKER_LIST, EMOJI_LIST
+from fbchat._util import ReqUrl
+from utils import subset, STICKER_LIST, EMOJI_LIST, FakeMessenger, offline_client
 
 
 def test_fetch_all_users(client1):
@@ -24,6 +25,51 @@ def test_fetch_threads(client1):
     assert len(threads) == 2
 
 
+@pytest.fixture
+def messenger():
+    # 45 threads, where every 5 threads share the same timestamp
+    return FakeMessenger({str(i): [1000 - i // 5] for i in range(45)})
+
+
+@pytest.mark.offline
+def test_iter_threads(messenger):
+    client = offline_client({ReqUrl.GRAPHQL: messenger})
+    threads = list(client.iterThreads(prefetch=2))
+    assert [t.uid for t in threads] == [str(i) for i in range(45)]
+
+
+@pytest.mark.offline
+def test_iter_threads_window(messenger):
+    client = offline_client({ReqUrl.GRAPHQL: messenger})
+    threads = list(client.iterThreads(before=998, after=996))
+    assert [t.uid for t in threads] == [str(i) for i in range(10, 25)]
+
+
+@pytest.mark.offline
+def test_fetch_threads_limit(messenger):
+    client = offline_client({ReqUrl.GRAPHQL: messenger})
+    threads = client.fetchThreads(limit=21)
+    assert [t.uid for t in threads] == [str(i) for i in range(21)]
+
+
+@pytest.mark.offline
+def test_iter_thread_messages():
+    messenger = FakeMessenger({"1": list(range(250))})
+    client = offline_client({ReqUrl.GRAPHQL: messenger})
+    messages = list(client.iterThreadMessages("1", page_size=100, prefetch=2))
+    assert [m.uid for m in messages] == ["1.{}".format(t) for t in reversed(range(250))]
+    assert len(messenger.batches) == 3
+
+
+@pytest.mark.offline
+def test_iter_thread_messages_after():
+    messenger = FakeMessenger({"1": list(range(250))})
+    client = offline_client({ReqUrl.GRAPHQL: messenger})
+    messages = list(client.iterThreadMessages("1", after=180, page_size=50))
+    assert [m.uid for m in messages] == ["1.{}".format(t) for t in range(249, 179, -1)]
+    assert len(messenger.batches) == 2
+
+
 @pytest.mark.parametrize("emoji, emoji_size", EMOJI_LIST)
 def test_fetch_message_emoji(client, emoji, emoji_size):
     mid = client.sendEmoji(emoji, emoji_size)
@@ -0,0 +1,103 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import unicode_literals
+
+import json
+import threading
+import time
+import pytest
+
+from utils import offline_client, graphql_response, thread_node
+from fbchat import SingleFlight
+from fbchat.models import FBchatException
+from fbchat._util import ReqUrl
+
+
+def run_together(n, target, *args):
+    """Runs `target` in `n` threads, and returns what each returned or raised"""
+    results = []
+
+    def run():
+        try:
+            results.append(target(*args))
+        except Exception as e:
+            results.append(e)
+
+    threads = [threading.Thread(target=run) for _ in range(n)]
+    for thread in threads:
+        thread.start()
+    return threads, results
+
+
+def wait_for_waiters(flight, n):
+    while flight.shared < n:
+        time.sleep(0.001)
+
+
+@pytest.mark.offline
+def test_shares_result():
+    flight = SingleFlight()
+    release = threading.Event()
+    calls = []
+
+    def slow(x):
+        calls.append(x)
+        release.wait(5)
+        return [x]
+
+    threads, results = run_together(4, flight.do, ("key",), slow, 1)
+    wait_for_waiters(flight, 3)
+    assert len(flight) == 1
+    release.set()
+    for thread in threads:
+        thread.join()
+    assert calls == [1]
+    assert results == [[1]] * 4
+    assert (flight.calls, flight.shared, len(flight)) == (1, 3, 0)
+    # Nothing is kept, so the next call runs again
+    assert flight.do(("key",), slow, 2) == [2]
+
+
+@pytest.mark.offline
+def test_shares_exception():
+    flight = SingleFlight()
+    release = threading.Event()
+
+    def fail():
+        release.wait(5)
+        raise FBchatException("Failed")
+
+    threads, results = run_together(3, flight.do, "key", fail)
+    wait_for_waiters(flight, 2)
+    release.set()
+    for thread in threads:
+        thread.join()
+    assert all(isinstance(result, FBchatException) for result in results)
+    assert flight.calls == 1
+
+
+@pytest.mark.offline
+def test_fetch_thread_info():
+    release = threading.Event()
+
+    def thread_info(data, **kwargs):
+        release.wait(5)
+        queries = json.loads(data["queries"])
+        ids = [queries[q]["query_params"]["id"] for q in sorted(queries)]
+        return graphql_response(*[{"message_thread": thread_node(i, 1)} for i in ids])
+
+    client = offline_client({ReqUrl.GRAPHQL: thread_info})
+    threads, results = run_together(3, client.fetchThreadInfo, "2", 1, "1")
+    wait_for_waiters(client.single_flight, 2)
+    release.set()
+    for thread in threads:
+        thread.join()
+    posts = [r for r in client._transport.requests if r[1] == ReqUrl.GRAPHQL]
+    assert len(posts) == 1
+    assert all(sorted(result) == ["1", "2"] for result in results)
+    # Each caller gets its own dict
+    assert results[0] is not results[1]
+
+    client.single_flight = None
+    release.set()
+    assert sorted(client.fetchThreadInfo("1")) == ["1"]
@@ -0,0 +1,110 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import unicode_literals
+
+import json
+import threading
+import pytest
+
+from utils import offline_client, graphql_response
+from fbchat import Client
+from fbchat._util import ReqUrl
+
+
+IMAGE_MESSAGE = {
+    "message": {
+        "__typename": "ThreadImageMessage",
+        "message_sender": {"id": "1234"},
+        "timestamp_precise": "1500",
+        "image_with_metadata": {"legacy_attachment_id": "99"},
+    }
+}
+
+
+def image_messages(data, **kwargs):
+    queries = json.loads(data["queries"])
+    return graphql_response(*[IMAGE_MESSAGE for _ in range(len(queries))])
+
+
+def image_messages_or_error(data, **kwargs):
+    """Like `image_messages`, but fails the queries of `mid.bad`"""
+    queries = json.loads(data["queries"])
+    body = ""
+    for i in range(len(queries)):
+        key = "q{}".format(i)
+        params = queries[key]["query_params"]["thread_and_message_id"]
+        if params["message_id"] == "mid.bad":
+            error = {"code": 1675004, "debug_info": "Message not found"}
+            body += json.dumps({key: {"error": error}})
+        else:
+            body += json.dumps({key: {"data": IMAGE_MESSAGE}})
+    return body + json.dumps({"successful_results": 2, "error_results": 1})
+
+
+class ImageClient(Client):
+    def onImageChange(self, **kwargs):
+        self.images.append(kwargs)
+        if len(self.images) == 3:
+            self.done.set()
+
+    def onMessageError(self, exception=None, msg=None):
+        self.errors.append(msg["delta"]["messageId"])
+
+
+def forced_fetch(thread_id, mid):
+    return {
+        "type": "delta",
+        "delta": {
+            "class": "ForcedFetch",
+            "messageId": mid,
+            "threadKey": {"threadFbId": thread_id},
+        },
+    }
+
+
+@pytest.mark.offline
+def test_forced_fetch_in_background():
+    client = offline_client({ReqUrl.GRAPHQL: image_messages}, client_class=ImageClient)
+    client.images = []
+    client.errors = []
+    client.done = threading.Event()
+    client.startListening()
+    requests_before = len(client._transport.requests)
+    for i in range(3):
+        client._parseDelta(forced_fetch(str(i), "mid.{}".format(i)))
+    client.done.wait(3)
+    client.stopListening()
+
+    assert sorted(image["thread_id"] for image in client.images) == ["0", "1", "2"]
+    assert all(image["new_image"] == 99 for image in client.images)
+    # The three fetches were sent in one request
+    assert len(client._transport.requests) - requests_before == 1
+
+
+@pytest.mark.offline
+def test_forced_fetch_without_listening():
+    client = offline_client({ReqUrl.GRAPHQL: image_messages}, client_class=ImageClient)
+    client.images = []
+    client.errors = []
+    client.done = threading.Event()
+    client._parseDelta(forced_fetch("1", "mid.1"))
+    assert client.images[0]["mid"] == "mid.1"
+
+
+@pytest.mark.offline
+def test_forced_fetch_error():
+    routes = {ReqUrl.GRAPHQL: image_messages_or_error}
+    client = offline_client(routes, client_class=ImageClient)
+    client.images = []
+    client.errors = []
+    client.done = threading.Event()
+    client.startListening()
+    for i, mid in enumerate(["mid.0", "mid.bad", "mid.2"]):
+        client._parseDelta(forced_fetch(str(i), mid))
+    resolver = client._forced_fetch_resolver
+    client.stopListening()
+    resolver._thread.join(3)
+
+    assert sorted(image["thread_id"] for image in client.images) == ["0", "2"]
+    assert client.errors == ["mid.bad"]
+    assert resolver.resolved == 2
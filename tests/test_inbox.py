@@ -0,0 +1,108 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import unicode_literals
+
+import json
+import pytest
+
+from utils import offline_client, FakeMessenger
+from fbchat import Inbox
+from fbchat.models import ThreadLocation
+from fbchat._util import ReqUrl
+
+
+def unread_threads(**kwargs):
+    fbids = {"thread_fbids": ["2"], "other_user_fbids": []}
+    return json.dumps({"payload": {"unread_thread_fbids": [fbids]}})
+
+
+def delta(**kwargs):
+    metadata = {
+        "messageId": "mid.{}".format(kwargs.get("body")),
+        "actorFbId": kwargs.pop("author", 4321),
+        "timestamp": str(kwargs.pop("ts", 500)),
+        "threadKey": {"threadFbId": kwargs.pop("thread_id")},
+    }
+    return {"type": "delta", "delta": dict(messageMetadata=metadata, **kwargs)}
+
+
+@pytest.fixture
+def client():
+    messenger = FakeMessenger({str(i): [i * 10] for i in range(5)})
+    client = offline_client(
+        {
+            ReqUrl.GRAPHQL: messenger,
+            ReqUrl.UNREAD_THREADS: unread_threads,
+            ReqUrl.READ_STATUS: lambda **kwargs: "{}",
+            ReqUrl.PINNED_STATUS: lambda **kwargs: "{}",
+            ReqUrl.DELETE_THREAD: lambda **kwargs: "{}",
+            ReqUrl.ARCHIVED_STATUS: lambda **kwargs: "{}",
+            ReqUrl.MOVE_THREAD: lambda **kwargs: "{}",
+        }
+    )
+    client.inbox = Inbox()
+    client.inbox.seed(client, limit=10)
+    return client
+
+
+def uids(threads):
+    return [thread.uid for thread in threads]
+
+
+@pytest.mark.offline
+def test_seed(client):
+    assert uids(client.inbox.top(3)) == ["4", "3", "2"]
+    assert uids(client.inbox.unread()) == ["2"]
+
+
+@pytest.mark.offline
+def test_events(client):
+    inbox = client.inbox
+    # The default event methods aren't overridden, but the inbox is still updated
+    client._parseMessageItem(
+        delta(**{"class": "NewMessage", "body": "a", "thread_id": 1})
+    )
+    own = {"class": "NewMessage", "body": "b", "thread_id": 9, "author": 1234}
+    client._parseMessageItem(delta(ts=600, **own))
+    assert uids(inbox.top(3)) == ["9", "1", "4"]
+    assert inbox.get("1").last_message_timestamp == "500"
+    assert uids(inbox.unread()) == ["1", "2"]
+
+    client._parseMessageItem(
+        delta(**{"class": "ThreadName", "name": "New", "thread_id": 1})
+    )
+    assert inbox.get(1).name == "New"
+
+    mark_read = {"class": "MarkRead", "actionTimestamp": 1, "watermarkTimestamp": 1}
+    mark_read["threadKeys"] = [{"threadFbId": 1}]
+    client._parseMessageItem({"type": "delta", "delta": mark_read})
+    assert uids(inbox.unread()) == ["2"]
+
+    counts = {"unseen": 1, "unread": 2, "recent_unread": 0}
+    client._parseMessageItem(dict(type="inbox", **counts))
+    assert (inbox.unseen, inbox.unread_count) == (1, 2)
+
+
+@pytest.mark.offline
+def test_client_methods(client):
+    client.markAsRead(["2"])
+    assert client.inbox.unread() == []
+    client.markAsUnread(["3"])
+    assert uids(client.inbox.unread()) == ["3"]
+    client.deleteThreads(["3", "4"])
+    assert uids(client.inbox.top()) == ["2", "1", "0"]
+
+
+@pytest.mark.offline
+def test_move_threads(client):
+    client.moveThreads(ThreadLocation.ARCHIVED, ["2", "3"])
+    assert uids(client.inbox.top()) == ["4", "1", "0"]
+    client.moveThreads(ThreadLocation.INBOX, ["2"])
+    assert uids(client.inbox.top()) == ["4", "2", "1", "0"]
+
+    # Pending threads are moved to `OTHER`, but stay in an inbox of pending threads
+    client.inbox.location = ThreadLocation.PENDING
+    client.moveThreads(ThreadLocation.PENDING, ["4"])
+    assert uids(client.inbox.top(1)) == ["4"]
+    client.moveThreads(ThreadLocation.OTHER, ["4"])
+    assert "4" not in client.inbox
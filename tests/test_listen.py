@@ -0,0 +1,152 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import unicode_literals
+
+import json
+import threading
+import time
+import pytest
+
+from utils import offline_client
+from fbchat import BufferPolicy, Client, MemoryCheckpointStore, ThreadedListener
+from fbchat._listen import thread_key
+from fbchat.models import FBchatFacebookError, FBchatUserError
+from fbchat._util import ReqUrl
+
+
+def typing(thread_id, st):
+    return {"type": "ttyp", "thread_fbid": thread_id, "from": "1", "st": st}
+
+
+class SlowClient(Client):
+    def onTyping(self, thread_id=None, status=None, **kwargs):
+        if thread_id == "slow":
+            time.sleep(0.05)
+        with self.received_lock:
+            self.received.append((thread_id, status.value))
+
+
+@pytest.mark.offline
+def test_thread_key():
+    assert thread_key(typing("1", 0)) == "1"
+    metadata = {"threadKey": {"otherUserFbId": 2}}
+    assert thread_key({"type": "delta", "delta": {"messageMetadata": metadata}}) == "2"
+    assert thread_key({"type": "inbox"}) is None
+    reaction = {"deltaMessageReaction": {"threadKey": {"threadFbId": 3}}}
+    payload = [ord(c) for c in json.dumps({"deltas": [reaction]})]
+    delta = {"class": "ClientPayload", "payload": payload}
+    assert thread_key({"type": "delta", "delta": delta}) == "3"
+
+
+@pytest.mark.offline
+def test_threaded_listener():
+    pulls = []
+
+    def pull(**kwargs):
+        pulls.append(time.time())
+        if len(pulls) == 3:
+            client.listening = False
+        ms = [typing(thread_id, len(pulls) % 2) for thread_id in ("slow", "fast")]
+        return json.dumps({"ms": ms, "seq": len(pulls)})
+
+    client = offline_client({ReqUrl.STICKY: pull}, client_class=SlowClient)
+    client.received = []
+    client.received_lock = threading.Lock()
+    listener = ThreadedListener(client, workers=4)
+    listener.listen(markAlive=False)
+
+    # The slow handler doesn't delay pulling
+    assert pulls[-1] - pulls[0] < 0.05
+    assert listener.dispatched == 6
+    assert listener.queue_depth == 0
+    assert listener.lag > 0
+    for thread_id in ("slow", "fast"):
+        statuses = [s for t, s in client.received if t == thread_id]
+        assert statuses == [1, 0, 1]
+    assert client._dispatcher is None
+
+
+@pytest.mark.offline
+def test_unhandled_messages_not_queued():
+    metadata = {"messageId": "mid.1", "threadKey": {"otherUserFbId": 2}}
+    new_message = {"class": "NewMessage", "messageMetadata": metadata}
+    presence = {"type": "chatproxy-presence", "buddyList": {"2": {"p": 2, "lat": 1}}}
+
+    def pull(**kwargs):
+        client.listening = False
+        ms = [typing("1", 1), {"type": "delta", "delta": new_message}, presence]
+        return json.dumps({"ms": ms, "seq": 1})
+
+    client = offline_client({ReqUrl.STICKY: pull}, client_class=SlowClient)
+    client.received = []
+    client.received_lock = threading.Lock()
+    listener = ThreadedListener(client, workers=2)
+    listener.listen(markAlive=False)
+
+    # Only the typing event is handled, but the presence is still kept
+    assert (listener.enqueued, listener.dispatched) == (1, 1)
+    assert client.received == [("1", 1)]
+    assert client.presence.get("2").active
+
+
+@pytest.mark.offline
+def test_checkpoint_after_handled():
+    handling = threading.Event()
+    saved_early = []
+
+    class BlockingClient(Client):
+        def onTyping(self, **kwargs):
+            handling.wait(5)
+
+    def pull(**kwargs):
+        if client.seq == "0":
+            return json.dumps({"ms": [typing("1", 1)], "seq": 1})
+        # The typing event of the first pull is still being handled
+        saved_early.append(client.checkpoint_store.load())
+        client.listening = False
+        handling.set()
+        return json.dumps({"ms": [], "seq": 2})
+
+    client = offline_client({ReqUrl.STICKY: pull}, client_class=BlockingClient)
+    client.checkpoint_store = MemoryCheckpointStore()
+    ThreadedListener(client, workers=2).listen(markAlive=False)
+
+    assert saved_early == [None]
+    assert client.checkpoint_store.load()["seq"] == 2
+
+
+@pytest.mark.offline
+def test_pull_error():
+    def pull(**kwargs):
+        raise FBchatFacebookError("Pull failed", request_status_code=400)
+
+    client = offline_client({ReqUrl.STICKY: pull})
+    with pytest.raises(FBchatFacebookError):
+        ThreadedListener(client, workers=2).listen(markAlive=False)
+    with pytest.raises(FBchatFacebookError):
+        client.listen(markAlive=False, workers=2)
+
+
+@pytest.mark.offline
+def test_listen_buffer_options():
+    buffers = []
+
+    def pull(**kwargs):
+        buffers.extend(client._dispatcher._queues)
+        client.listening = False
+        return json.dumps({"ms": [], "seq": 1})
+
+    client = offline_client({ReqUrl.STICKY: pull})
+    client.listen(
+        markAlive=False,
+        workers=2,
+        queue_size=10,
+        policy=BufferPolicy.DROP_BY_TYPE,
+        droppable=["ttyp"],
+    )
+    assert len(buffers) == 2
+    for buffer in buffers:
+        assert (buffer.max_size, buffer.policy) == (10, BufferPolicy.DROP_BY_TYPE)
+        assert buffer.droppable == ("ttyp",)
+    with pytest.raises(FBchatUserError):
+        client.listen(markAlive=False, droppable=["ttyp"])
@@ -0,0 +1,60 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import unicode_literals
+
+import json
+import pytest
+
+from utils import offline_client
+from fbchat import PingScheduler
+
+
+@pytest.fixture
+def client():
+    client = offline_client()
+    client._transport.routes[client.req_url.PING] = lambda **kwargs: "{}"
+    client._transport.routes[client.req_url.STICKY] = lambda **kwargs: json.dumps(
+        {"seq": 1}
+    )
+    return client
+
+
+def pings(client):
+    return [r for r in client._transport.requests if r[1] == client.req_url.PING]
+
+
+@pytest.mark.offline
+def test_ping_skipped_while_pulling(client):
+    scheduler = PingScheduler(client, interval=60)
+    scheduler.tick()
+    scheduler.pull_started()
+    scheduler.tick()
+    scheduler.pull_ended()
+    scheduler.tick()
+    assert (scheduler.sent, scheduler.skipped) == (1, 2)
+    assert len(pings(client)) == 1
+
+    scheduler.interval = 0
+    scheduler.tick()
+    assert scheduler.sent == 2
+
+
+@pytest.mark.offline
+def test_ping_inactive(client):
+    client.setActiveStatus(False)
+    scheduler = PingScheduler(client)
+    scheduler.tick()
+    assert (scheduler.sent, scheduler.skipped) == (0, 0)
+
+
+@pytest.mark.offline
+def test_no_ping_per_pull(client):
+    client.ping_interval = 60
+    client.startListening()
+    for _ in range(5):
+        client.doOneListen()
+    scheduler = client._ping_scheduler
+    client.stopListening()
+    scheduler._thread.join()
+    # At most the first ping, depending on whether it was sent before the pulls
+    assert len(pings(client)) == scheduler.sent <= 1
@@ -0,0 +1,61 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import unicode_literals
+
+import pytest
+
+from utils import offline_client
+from fbchat import Client, PresenceStore
+
+
+def status(active_status):
+    return active_status.active, active_status.last_active, active_status.in_game
+
+
+@pytest.mark.offline
+def test_presence_store():
+    presence = PresenceStore(history=2)
+    presence.update(
+        [("1", True, 100, False), ("2", False, 50, None), (3, True, 90, True)]
+    )
+    assert len(presence) == 3 and 3 in presence
+    assert status(presence.get(1)) == (True, 100, False)
+    assert presence.get("4") is None
+    assert presence.active_users() == {"1", "3"}
+    assert presence.recently_active(15, now=105) == ["1", "3"]
+
+    presence.update([("2", True, 110, None)])
+    presence.update([("2", False, None, None)])
+    presence.update([("2", True, 120, None)])
+    assert presence.recently_active(15, now=125) == ["2"]
+    assert presence.get("2").last_active == 120
+    assert presence.history("2") == [(True, 110, False), (False, 110, False)]
+    assert presence.history("1") == []
+
+
+class PresenceClient(Client):
+    def onChatTimestamp(self, buddylist=None, msg=None):
+        self.buddylist = buddylist
+
+    def onBuddylistOverlay(self, statuses=None, msg=None):
+        self.statuses = statuses
+
+
+@pytest.mark.offline
+def test_presence_events():
+    client = offline_client(client_class=PresenceClient)
+    client._parseMessageItem(
+        {
+            "type": "chatproxy-presence",
+            "buddyList": {"1": {"p": 2, "lat": 100}, "2": {"p": 0, "lat": 50}},
+            "gamers": [1],
+        }
+    )
+    assert client.buddylist == {"1": 100, "2": 50}
+    assert status(client.getUserActiveStatus(1)) == (True, 100, True)
+
+    overlay = {"1": {"a": 0, "la": 110}}
+    client._parseMessageItem({"type": "buddylist_overlay", "overlay": overlay})
+    assert list(client.statuses) == ["1"]
+    assert status(client.statuses["1"]) == (False, 110, True)
+    assert client.presence.active_users() == set()
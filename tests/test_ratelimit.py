@@ -0,0 +1,84 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import unicode_literals
+
+import threading
+import pytest
+
+from utils import offline_client
+from fbchat import RateLimiter, TokenBucket
+from fbchat.models import FBchatRateLimitError, FBchatUserError
+from fbchat._util import ReqUrl
+
+URL = "https://www.facebook.com/test"
+
+
+class FakeTime(object):
+    def __init__(self, now=1000.0):
+        self.now = now
+        self.slept = []
+
+    def time(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.slept.append(seconds)
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeTime()
+    monkeypatch.setattr("fbchat._ratelimit.time", clock)
+    return clock
+
+
+@pytest.mark.offline
+def test_token_bucket(clock):
+    bucket = TokenBucket(rate=2, burst=3)
+    assert [bucket.reserve(block=False) for _ in range(4)] == [0, 0, 0, None]
+    assert bucket.rejected == 1
+    # Waiting requests reserve the next tokens, in order
+    assert [bucket.reserve() for _ in range(2)] == [0.5, 1]
+    assert bucket.waited == 2
+    clock.now += 2
+    assert bucket.tokens == 2
+    clock.now += 10
+    assert bucket.tokens == 3
+
+    with pytest.raises(FBchatUserError):
+        TokenBucket(rate=0)
+
+
+@pytest.mark.offline
+def test_rate_limiter(clock):
+    limiter = RateLimiter({URL: (1, 2)})
+    assert [limiter.acquire(URL + "?x=1") for _ in range(3)] == [0, 0, 1]
+    assert clock.slept == [1]
+    assert limiter.acquire("https://www.facebook.com/other") == 0
+    with pytest.raises(FBchatRateLimitError) as e:
+        limiter.acquire(URL, block=False)
+    assert e.value.url == URL
+
+    assert RateLimiter().bucket(ReqUrl.SEND) is not None
+
+
+@pytest.mark.offline
+def test_client_rate_limiter(clock):
+    client = offline_client({URL: lambda **kwargs: "{}"})
+    client.rate_limiter = RateLimiter({URL: (10, 2)}, block=False)
+    client._post(URL)
+    client._post(URL)
+    with pytest.raises(FBchatRateLimitError):
+        client._post(URL)
+    assert len([r for r in client._transport.requests if r[1] == URL]) == 2
+
+
+@pytest.mark.offline
+def test_shared_between_threads(clock):
+    limiter = RateLimiter({URL: (4, 4)})
+    threads = [threading.Thread(target=limiter.acquire, args=(URL,)) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert sorted(clock.slept) == [0.25, 0.5, 0.75, 1]
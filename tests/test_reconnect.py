@@ -0,0 +1,61 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import unicode_literals
+
+import json
+import pytest
+import requests
+
+from utils import offline_client
+from fbchat import ReconnectPolicy
+
+
+@pytest.mark.offline
+def test_backoff():
+    policy = ReconnectPolicy(base_delay=1, max_delay=5, factor=2, jitter=0)
+    delays = [policy.failure(0) for _ in range(6)]
+    assert delays == [0, 1, 2, 4, 5, 5]
+    policy.success(0)
+    assert policy.failure(0) == 0
+
+
+@pytest.mark.offline
+def test_jitter():
+    policy = ReconnectPolicy(base_delay=4, jitter=0.5)
+    policy.failure(0)
+    assert 2 <= policy.failure(0) <= 4
+
+
+@pytest.mark.offline
+def test_best_channel():
+    policy = ReconnectPolicy()
+    policy.failure(0)
+    assert policy.best_channel(0) == 1
+    policy.failure(1)
+    policy.failure(2)
+    policy.success(0)
+    assert policy.best_channel(2) == 3
+    for _ in range(3):
+        policy.failure(3)
+        policy.failure(4)
+    assert policy.best_channel(4) == 0
+
+
+@pytest.mark.offline
+def test_failover():
+    def pull(**kwargs):
+        raise requests.ConnectionError()
+
+    client = offline_client()
+    client.reconnect_policy = ReconnectPolicy(max_delay=0)
+    healthy = "https://3-edge-chat.facebook.com/pull"
+    for channel in range(5):
+        url = "https://{}-edge-chat.facebook.com/pull".format(channel)
+        client._transport.routes[url] = pull
+    client._transport.routes[healthy] = lambda **kwargs: json.dumps({"seq": 1})
+    client.setActiveStatus(False)
+
+    for _ in range(10):
+        client.doOneListen()
+    assert client.req_url.pull_channel == 3
+    assert client.reconnect_policy.failures == 0
@@ -0,0 +1,58 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import unicode_literals
+
+import json
+import pytest
+
+from utils import offline_client
+from fbchat import Client, PullRecorder, PullReplayer
+from fbchat._replay import iter_pulls
+
+
+class RecordingClient(Client):
+    def onTyping(self, thread_id=None, **kwargs):
+        self.typing.append(thread_id)
+
+
+def pull(seq):
+    ms = [
+        {"type": "ttyp", "thread_fbid": str(i), "from": "1", "st": 1} for i in range(3)
+    ]
+    metadata = {
+        "messageId": "mid.{}".format(seq),
+        "actorFbId": 1234,
+        "timestamp": "1500",
+        "threadKey": {"otherUserFbId": 4321},
+    }
+    delta = {"class": "NewMessage", "body": "Hi", "messageMetadata": metadata}
+    ms.append({"type": "delta", "delta": delta})
+    return {"seq": seq, "ms": ms, "batches": [{"ms": [{"type": "deltaflow"}]}]}
+
+
+@pytest.mark.offline
+def test_record_and_replay(tmpdir):
+    filename = str(tmpdir.join("pulls.ndjson.gz"))
+    pulls = [pull(1), pull(2)]
+    client = offline_client(client_class=RecordingClient)
+    client.typing = []
+    client.setActiveStatus(False)
+    client._transport.routes[client.req_url.STICKY] = lambda **kwargs: json.dumps(
+        pulls.pop(0)
+    )
+    client.pull_recorder = PullRecorder(filename)
+    client.doOneListen()
+    client.doOneListen()
+    client.pull_recorder.close()
+    assert [content["seq"] for _, content in iter_pulls(filename)] == [1, 2]
+
+    client.typing = []
+    stats = PullReplayer(client, filename).run()
+    assert client.typing == ["0", "1", "2"] * 2
+    assert (stats.pulls, stats.events) == (2, 10)
+    # onMessage isn't overridden, so the messages are skipped, like while listening
+    assert stats.handler_calls == {"onTyping": 6}
+    assert "onMessage" not in client._handled_events
+    assert stats.events_per_second > 0
+    # The event methods are restored
+    assert "onTyping" not in vars(client)
@@ -0,0 +1,119 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import unicode_literals
+
+import json
+import pytest
+import requests
+
+from utils import FakeTransport, offline_client
+from fbchat import RetryPolicy
+from fbchat.models import FBchatFacebookError
+from fbchat._retry import RetryState, endpoint
+from fbchat._transport import make_response
+from fbchat._util import ReqUrl
+
+URL = "https://www.facebook.com/test"
+
+
+class FlakyTransport(FakeTransport):
+    """Answers requests to `URL` with the statuses in `statuses`, then with 200"""
+
+    def __init__(self, statuses):
+        super(FlakyTransport, self).__init__({URL: lambda **kwargs: '{"ok": 1}'})
+        self.statuses = statuses
+
+    def _request(self, method, url, **kwargs):
+        if url == URL and self.statuses:
+            self.requests.append((method, url, kwargs))
+            status = self.statuses.pop(0)
+            if isinstance(status, Exception):
+                raise status
+            return make_response(status, b"", url=url)
+        return super(FlakyTransport, self)._request(method, url, **kwargs)
+
+
+def flaky_client(statuses, **kwargs):
+    client = offline_client(transport=FlakyTransport(statuses))
+    client.retry_policy = RetryPolicy(base_delay=0, **kwargs)
+    return client
+
+
+@pytest.mark.offline
+def test_endpoint():
+    assert endpoint("https://3-edge-chat.facebook.com/pull?x=1") == ReqUrl.STICKY
+    assert endpoint(ReqUrl.DELETE_THREAD) == endpoint(ReqUrl.DELETE_THREAD + "&x=1")
+
+
+@pytest.mark.offline
+def test_retry_status_and_network_errors():
+    client = flaky_client([503, requests.ConnectionError()], retry_network_errors=True)
+    assert client._post(URL, fix_request=True, as_json=True) == {"ok": 1}
+    assert client.retry_policy.retries == {URL: 2}
+    # The payload is generated again for every attempt
+    requests_ = client._transport.requests
+    counters = [kwargs["data"]["__req"] for _, url, kwargs in requests_ if url == URL]
+    assert len(set(counters)) == len(counters)
+
+
+@pytest.mark.offline
+def test_retry_gives_up():
+    client = flaky_client([503, 503, 503], attempts=2)
+    with pytest.raises(FBchatFacebookError) as e:
+        client._get(URL, fix_request=True)
+    assert e.value.request_status_code == 503
+    # Without `fix_request`, the last response is returned
+    client = flaky_client([502, 502], attempts=2)
+    assert client._get(URL).status_code == 502
+
+    client = flaky_client([404])
+    with pytest.raises(FBchatFacebookError):
+        client._get(URL, fix_request=True)
+    assert client.retry_policy.retries == {}
+
+
+@pytest.mark.offline
+def test_retry_error_codes_and_endpoints():
+    responses = [json.dumps({"error": 1545012, "errorDescription": "Temporary"})]
+    responses.append('{"ok": 1}')
+    client = offline_client({URL: lambda **kwargs: responses.pop(0)})
+    client.retry_policy = RetryPolicy(base_delay=0, error_codes=[1545012])
+    assert client._post(URL, fix_request=True, as_json=True) == {"ok": 1}
+
+    client = flaky_client(
+        [requests.Timeout()], endpoints={URL: RetryPolicy(retry_network_errors=False)}
+    )
+    with pytest.raises(requests.Timeout):
+        client._post(URL)
+
+    # Network errors aren't retried by default
+    client = flaky_client([requests.Timeout()])
+    with pytest.raises(requests.Timeout):
+        client._post(URL)
+
+
+@pytest.mark.offline
+def test_default_policy():
+    policy = offline_client().retry_policy
+    assert policy.for_endpoint("https://2-edge-chat.facebook.com/pull").attempts == 1
+    assert policy.for_endpoint(ReqUrl.SEND) is policy
+    assert not policy.retry_network_errors
+    assert policy.for_endpoint(ReqUrl.GRAPHQL).retry_network_errors
+    assert policy.for_endpoint(ReqUrl.ATTACHMENT_PHOTO + "?x=1").retry_network_errors
+    delays = [policy.delay(i) for i in range(1, 10)]
+    assert all(0 < d <= policy.max_delay for d in delays)
+
+
+@pytest.mark.offline
+def test_retry_state():
+    policy = RetryPolicy(attempts=2, base_delay=0)
+    retry = RetryState(policy, URL, error_retries=1)
+    expired = FBchatFacebookError("Expired", fb_error_code="1357004")
+    assert retry.renews_session(expired)
+    assert not retry.renews_session(expired)
+    assert retry.retries_status(503) and not retry.retries_status(404)
+    assert retry.retries(FBchatFacebookError("Error", request_status_code=502))
+    assert not retry.retries(requests.Timeout())
+    assert retry.next() == 0
+    assert not retry.retries_status(503)
+    assert policy.retries == {URL: 1}
@@ -0,0 +1,55 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import unicode_literals
+
+import pytest
+
+from utils import offline_client, FakeMessenger
+from fbchat import ThreadSync, JSONSyncStore
+from fbchat._util import ReqUrl
+
+
+def synced(sync):
+    return {thread.uid: [m.uid for m in messages] for thread, messages in sync.sync()}
+
+
+@pytest.mark.offline
+def test_sync(tmpdir):
+    messenger = FakeMessenger({str(i): [i * 10, i * 10 + 1] for i in range(30)})
+    client = offline_client({ReqUrl.GRAPHQL: messenger})
+    filename = str(tmpdir.join("watermarks.json"))
+    result = synced(ThreadSync(client, JSONSyncStore(filename), since=255))
+    assert result == {
+        str(i): ["{}.{}".format(i, i * 10 + 1), "{}.{}".format(i, i * 10)]
+        for i in range(26, 30)
+    }
+
+    messenger.threads["3"].append(500)
+    messenger.threads["27"].extend([501, 502])
+    del messenger.batches[:]
+
+    result = synced(ThreadSync(client, JSONSyncStore(filename), since=255))
+    assert result == {"27": ["27.502", "27.501"], "3": ["3.500"]}
+    # One thread list page, and one message page per changed thread
+    assert len(messenger.batches) == 3
+
+    assert synced(ThreadSync(client, JSONSyncStore(filename))) == {}
+
+
+@pytest.mark.offline
+def test_interrupted_sync():
+    messenger = FakeMessenger({"a": [10], "b": [20]})
+    client = offline_client({ReqUrl.GRAPHQL: messenger})
+    sync = ThreadSync(client)
+    assert sorted(synced(sync)) == ["a", "b"]
+
+    messenger.threads["a"].append(40)
+    messenger.threads["b"].append(30)
+    syncing = sync.sync()
+    thread, messages = next(syncing)
+    assert thread.uid == "a"
+    next(syncing)  # "a" is consumed
+    syncing.close()  # "b" isn't
+
+    assert synced(sync) == {"b": ["b.30"]}
+    assert synced(sync) == {}
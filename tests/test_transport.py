@@ -0,0 +1,122 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import unicode_literals
+
+import threading
+import pytest
+
+from utils import FakeTransport, offline_client, graphql_response
+from fbchat import CassetteTransport, RequestsTransport
+from fbchat.models import FBchatException
+from fbchat._util import ReqUrl
+
+try:
+    from http.server import BaseHTTPRequestHandler, HTTPServer
+    from socketserver import ThreadingMixIn
+except ImportError:
+    from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+    from SocketServer import ThreadingMixIn
+
+
+def thread_list(**kwargs):
+    return graphql_response({"viewer": {"message_threads": {"nodes": []}}})
+
+
+@pytest.mark.offline
+def test_offline_client():
+    client = offline_client({ReqUrl.GRAPHQL: thread_list})
+    assert client.uid == "1234"
+    assert client.fetchThreadList() == []
+    method, url, kwargs = client._transport.requests[-1]
+    assert (method, url) == ("POST", ReqUrl.GRAPHQL)
+    assert kwargs["data"]["fb_dtsg"] == "AQH0"
+
+
+@pytest.mark.offline
+def test_cassette_record_and_replay(tmpdir):
+    path = str(tmpdir.join("cassette.json"))
+    recorder = CassetteTransport(
+        path, record=True, transport=FakeTransport({ReqUrl.GRAPHQL: thread_list})
+    )
+    offline_client(transport=recorder).fetchThreadList()
+    recorder.save()
+
+    replayer = CassetteTransport(path, latency=0)
+    client = offline_client(transport=replayer)
+    assert client.fetchThreadList() == []
+    # The last answer is repeated
+    assert client.fetchThreadList() == []
+
+    with pytest.raises(FBchatException):
+        client.fetchThreadList(before=1)
+
+
+@pytest.fixture
+def http_server():
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_GET(self):
+            self.send_response(200)
+            self.send_header("Content-Length", "2")
+            self.end_headers()
+            self.wfile.write(b"ok")
+
+        def log_message(self, *args):
+            pass
+
+    class Server(ThreadingMixIn, HTTPServer):
+        daemon_threads = True
+
+    server = Server(("127.0.0.1", 0), Handler)
+    thread = threading.Thread(target=server.serve_forever)
+    thread.daemon = True
+    thread.start()
+    yield "http://127.0.0.1:{}/".format(server.server_address[1])
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.mark.offline
+def test_requests_transport_stats(http_server):
+    transport = RequestsTransport()
+    for _ in range(3):
+        assert transport.get(http_server).text == "ok"
+    assert (transport.stats.created, transport.stats.reused) == (1, 2)
+    assert transport.host_stats["127.0.0.1"].reused == 2
+    transport.close()
+
+    transport = RequestsTransport(keep_alive=False)
+    for _ in range(2):
+        transport.get(http_server)
+    assert (transport.stats.created, transport.stats.reused) == (2, 0)
+    transport.close()
+
+
+@pytest.mark.offline
+def test_requests_transport_host_pool_sizes():
+    transport = RequestsTransport(
+        pool_size=4, host_pool_sizes={"upload.facebook.com": 2}
+    )
+    adapter = transport._session.get_adapter("https://upload.facebook.com/x")
+    assert adapter._pool_maxsize == 2
+    adapter = transport._session.get_adapter("https://www.facebook.com/x")
+    assert adapter._pool_maxsize == 4
+
+
+@pytest.mark.offline
+def test_requests_transport_max_hosts(http_server):
+    other_host = http_server.replace("127.0.0.1", "localhost")
+    transport = RequestsTransport(max_hosts=1)
+    for url in (http_server, other_host, http_server):
+        assert transport.get(url).text == "ok"
+    # Each request evicts the pool of the other host, and closes its connection
+    assert (transport.stats.created, transport.stats.dropped) == (3, 2)
+    assert transport.host_stats["127.0.0.1"].dropped == 1
+    transport.close()
+    assert transport.stats.dropped == 2
+
+    transport = RequestsTransport()
+    adapter = transport._session.get_adapter(http_server)
+    assert adapter._pool_connections == 32
+    transport.close()
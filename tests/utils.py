@@ -4,6 +4,8 @@ from __future__ import unicode_literals
 
 import threading
 import logging
+import json
+import requests
 import six
 import pytest
 
@@ -11,8 +13,10 @@ from os import environ
 from random import randrange
 from contextlib import contextmanager
 from six import viewitems
-from fbchat import Client
+from fbchat import Client, Transport
 from fbchat.models import ThreadType, EmojiSize, FBchatFacebookError, Sticker
+from fbchat._transport import make_response
+from fbchat._util import ReqUrl
 
 log = logging.getLogger("fbchat.tests").addHandler(logging.NullHandler())
 
@@ -45,6 +49,138 @@ TEXT_LIST = [
 ]
 
 
+class FakeTransport(Transport):
+    """Answers requests without touching the network, so tests can run offline
+
+    `routes` maps urls to functions, which are called with the request arguments, and
+    return the response body. Enough is answered by default to log in with cookies.
+    """
+
+    def __init__(self, routes=None):
+        self.routes = routes or {}
+        self.requests = []
+        self._cookies = requests.cookies.RequestsCookieJar()
+
+    def _request(self, method, url, **kwargs):
+        self.requests.append((method, url, kwargs))
+        if url == ReqUrl.BASE:
+            body = '<input name="fb_dtsg" value="AQH0"/>"client_revision":1234,'
+        elif url == ReqUrl.LOGIN:
+            location = "https://m.facebook.com/home.php"
+            return make_response(302, b"", url=url, headers={"Location": location})
+        else:
+            body = self.routes[url](**kwargs)
+        return make_response(200, body.encode("utf-8"), url=url)
+
+    def get(self, url, **kwargs):
+        return self._request("GET", url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self._request("POST", url, **kwargs)
+
+    @property
+    def cookies(self):
+        return self._cookies
+
+    @cookies.setter
+    def cookies(self, jar):
+        self._cookies = jar
+
+
+def graphql_response(*data):
+    """Formats `data` like a response from `ReqUrl.GRAPHQL`"""
+    body = "".join(
+        json.dumps({"q{}".format(i): {"data": d}}) for i, d in enumerate(data)
+    )
+    return body + json.dumps({"successful_results": len(data), "error_results": 0})
+
+
+def thread_node(uid, timestamp):
+    """A group thread, as returned by GraphQL"""
+    return {
+        "thread_type": "GROUP",
+        "thread_key": {"thread_fbid": uid},
+        "all_participants": {"nodes": []},
+        "thread_admins": [],
+        "joinable_mode": {},
+        "last_message": {"nodes": [{"timestamp_precise": str(timestamp)}]},
+    }
+
+
+def message_node(uid, timestamp, author="1234"):
+    """A message, as returned by GraphQL"""
+    return {
+        "message_id": uid,
+        "timestamp_precise": str(timestamp),
+        "message_sender": {"id": author},
+        "message": {"text": uid},
+        "message_reactions": [],
+    }
+
+
+class FakeMessenger(object):
+    """Answers thread list, thread info and thread message queries on `ReqUrl.GRAPHQL`
+
+    `threads` maps thread IDs to the timestamps of their messages. Message IDs are
+    "<thread ID>.<timestamp>", and `before` is inclusive, like on Facebook.
+    """
+
+    def __init__(self, threads):
+        self.threads = threads
+        self.batches = []
+
+    def last_timestamp(self, thread_id):
+        return max(self.threads[thread_id])
+
+    def thread_list(self, limit, before, **kwargs):
+        ids = sorted(self.threads, key=self.last_timestamp, reverse=True)
+        if before is not None:
+            ids = [i for i in ids if self.last_timestamp(i) <= before]
+        nodes = [thread_node(i, self.last_timestamp(i)) for i in ids[:limit]]
+        return {"viewer": {"message_threads": {"nodes": nodes}}}
+
+    def thread_info(self, id, **kwargs):
+        return {"message_thread": thread_node(id, self.last_timestamp(id))}
+
+    def thread_messages(self, id, message_limit, before, **kwargs):
+        timestamps = sorted(self.threads[id])
+        if before is not None:
+            timestamps = [t for t in timestamps if t <= before]
+        nodes = [
+            message_node("{}.{}".format(id, t), t)
+            for t in timestamps[-message_limit:]
+        ]
+        return {
+            "message_thread": {
+                "messages": {"nodes": nodes},
+                "read_receipts": {"nodes": []},
+            }
+        }
+
+    def __call__(self, data, **kwargs):
+        queries = json.loads(data["queries"])
+        queries = [queries["q{}".format(i)] for i in range(len(queries))]
+        self.batches.append(queries)
+        handlers = {
+            "1349387578499440": self.thread_list,
+            "1386147188135407": self.thread_messages,
+            "2147762685294928": self.thread_info,
+        }
+        return graphql_response(
+            *[handlers[q["doc_id"]](**q["query_params"]) for q in queries]
+        )
+
+
+def offline_client(routes=None, transport=None, client_class=Client):
+    """Returns a client logged in with a :class:`FakeTransport`"""
+    return client_class(
+        "<email>",
+        "<password>",
+        session_cookies={"c_user": "1234"},
+        transport=transport or FakeTransport(routes),
+    )
+
+
 class ClientThread(threading.Thread):
     def __init__(self, client, *args, **kwargs):
         self.client = client